@@ -1,6 +1,28 @@
 from django.contrib import admin
 
-from .models import Guide
+from . import revisions
+from .models import Guide, GuideRevision, Tag, WebhookMessage
 
 
-admin.site.register(Guide)
+@admin.register(Guide)
+class GuideAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        revisions.record_revision(obj, editor=request.user)
+
+
+@admin.register(GuideRevision)
+class GuideRevisionAdmin(admin.ModelAdmin):
+    list_display = ('guide', 'number', 'editor', 'is_snapshot', 'created_datetime')
+    exclude = ('data',)
+    raw_id_fields = ('guide', 'editor')
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'guide_count')
+    readonly_fields = ('guide_count',)
+    search_fields = ('name',)
+
+
+admin.site.register(WebhookMessage)
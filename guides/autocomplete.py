@@ -0,0 +1,179 @@
+"""
+Completion of guide titles for the search box.
+
+Every worker process keeps a sorted array of the words of all guide
+titles in memory, so completing a search term is a binary search
+without any database query. The signal handlers in `guides.signals`
+update the array of the process saving or deleting a guide in place,
+and replace a version in the Django cache. Other processes notice the
+new version on their next lookup and reload their titles once.
+"""
+
+import bisect
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Guide
+from .search import TOKEN_PATTERN, tokenize
+
+
+# The maximum number of titles returned for a search term.
+AUTOCOMPLETE_LIMIT = 8
+
+TITLE_INDEX_VERSION_KEY = 'guides:titles:version'
+
+
+def title_words(title: str) -> tuple:
+    return tuple(sorted(set(TOKEN_PATTERN.findall(title.lower()))))
+
+
+class TitleIndex:
+    """
+    A thread-safe prefix index of guide titles.
+
+    `entries` is a sorted list of `(word, guide_id)` pairs for every word
+    in every title. All titles containing a word starting with a prefix
+    are found by bisecting to the first pair not less than `(prefix,)`.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.Lock()
+        self._entries = []
+        self._titles = {}
+        self._words = {}
+
+    def __len__(self):
+        return len(self._titles)
+
+    def load(self, guides):
+        """Replace the indexed titles with the given `(guide_id, title)` pairs."""
+
+        titles = dict(guides)
+        words = {guide_id: title_words(title) for guide_id, title in titles.items()}
+        entries = sorted(
+            (word, guide_id) for guide_id, guide_words in words.items() for word in guide_words
+        )
+        with self._lock:
+            self._entries, self._titles, self._words = entries, titles, words
+
+    def add(self, guide_id: int, title: str):
+        """Add the title of a guide to the index, or update it."""
+
+        with self._lock:
+            self._remove(guide_id)
+            self._titles[guide_id] = title
+            self._words[guide_id] = title_words(title)
+            for word in self._words[guide_id]:
+                bisect.insort(self._entries, (word, guide_id))
+
+    def remove(self, guide_id: int):
+        """Remove the title of a guide from the index, if it is indexed."""
+
+        with self._lock:
+            self._remove(guide_id)
+
+    def _remove(self, guide_id):
+        for word in self._words.pop(guide_id, ()):
+            index = bisect.bisect_left(self._entries, (word, guide_id))
+            del self._entries[index]
+        self._titles.pop(guide_id, None)
+
+    def complete(self, term: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+        """
+        Return up to `limit` `(guide_id, title)` pairs whose titles
+        contain a word starting with each word of `term`.
+
+        Titles starting with the term come first, the rest is sorted by title.
+        """
+
+        tokens = tokenize(term)
+        if not tokens or limit <= 0:
+            return []
+
+        # The last word is usually the one being typed, and every
+        # other word has to be somewhere in the title as well.
+        *complete_words, prefix = tokens
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (prefix,))
+            candidates = set()
+            for word, guide_id in self._entries[start:]:
+                if not word.startswith(prefix):
+                    break
+                candidates.add(guide_id)
+
+            matches = [
+                (guide_id, self._titles[guide_id]) for guide_id in candidates
+                if all(
+                    any(word.startswith(token) for word in self._words[guide_id])
+                    for token in complete_words
+                )
+            ]
+
+        lowered = term.strip().lower()
+        matches.sort(key=lambda match: (
+            not match[1].lower().startswith(lowered), match[1].lower()
+        ))
+        return matches[:limit]
+
+
+title_index = TitleIndex()
+
+
+def current_index() -> TitleIndex:
+    """Return the title index, reloading it if another process changed any guide."""
+
+    version = cache.get(TITLE_INDEX_VERSION_KEY)
+    if version is None or version != title_index.version:
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(TITLE_INDEX_VERSION_KEY, version, None)
+        title_index.load(Guide.objects.values_list('id', 'title'))
+        title_index.version = version
+    return title_index
+
+
+def update_title(guide_id: int, title: str = None, using='default'):
+    """
+    Add, update or, without a `title`, remove the title of a guide.
+
+    The change is applied once the transaction saving the guide commits,
+    as another process reloading the titles before that would miss it,
+    and then keep them as current. The index of this process is updated
+    in place if it was up to date, otherwise it is reloaded on the next
+    lookup like in every other process.
+    """
+
+    transaction.on_commit(lambda: apply_title(guide_id, title), using=using)
+
+
+def apply_title(guide_id: int, title: str = None):
+    was_current = (
+        title_index.version is not None
+        and title_index.version == cache.get(TITLE_INDEX_VERSION_KEY)
+    )
+    version = uuid.uuid4().hex
+    cache.set(TITLE_INDEX_VERSION_KEY, version, None)
+    if not was_current:
+        return
+
+    if title is None:
+        title_index.remove(guide_id)
+    else:
+        title_index.add(guide_id, title)
+    title_index.version = version
+
+
+def invalidate_titles():
+    """Make every process reload its titles on its next lookup."""
+
+    cache.set(TITLE_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def complete(term: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+    """Return up to `limit` `(guide_id, title)` pairs of guides matching `term`."""
+
+    return current_index().complete(term, limit)
@@ -0,0 +1,316 @@
+"""
+Bulk export and import of guides as newline-delimited JSON.
+
+Every line holds one guide with its `title`, `overview`, raw markdown
+`content`, the `author`'s username, the optional `pub_datetime` and
+`edit_datetime` in ISO 8601 format, and the names of its `tags`. Both
+directions stream the guides in batches, so memory use does not depend
+on the number of guides.
+
+Imported guides are inserted with `bulk_create`, which skips the
+signal handlers in `guides.signals`. Their work is done per batch
+instead: the markdown of a batch is rendered before it is inserted,
+and the author permissions, first revisions, outlines, tags and search
+index entries of a batch are each written with a single statement.
+Related guides, and the number of guides with every tag, are recomputed
+once after all guides were imported.
+"""
+
+import itertools
+import json
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from guardian.models import UserObjectPermission
+
+from website import sitemaps
+from website.converters import RENDER_CACHE_SIZE, RenderError, render_document
+from . import (
+    autocomplete, feeds, httpcache, outline, pagecache, related, revisions, search, tags
+)
+from .models import Guide, GuideOutline, GuideRevision, GuideTag, Tag
+from .pagination import encode_value
+
+
+# The number of guides read or written at once.
+BATCH_SIZE = 200
+
+# The permissions the author of a guide is given on it.
+AUTHOR_PERMISSIONS = ('change_guide', 'delete_guide')
+
+RECORD_FIELDS = {
+    'title': 'title',
+    'overview': 'overview',
+    'content': 'content',
+    'author': 'author__username',
+    'pub_datetime': 'pub_datetime',
+    'edit_datetime': 'edit_datetime',
+}
+
+
+class GuideImportError(ValueError):
+    def __init__(self, line_number, message):
+        super().__init__(f"Line {line_number}: {message}")
+
+
+def export_guides(stream, using='default', batch_size=BATCH_SIZE) -> int:
+    """Write all guides to `stream`, one JSON object per line, and return their number."""
+
+    rows = (
+        Guide.objects.using(using)
+        .order_by('id')
+        .values_list('id', *RECORD_FIELDS.values())
+        .iterator(chunk_size=batch_size)
+    )
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        tag_names = defaultdict(list)
+        guide_tags = (
+            GuideTag.objects.using(using)
+            .filter(guide_id__in=[row[0] for row in batch])
+            .order_by('tag__name')
+            .values_list('guide_id', 'tag__name')
+        )
+        for guide_id, name in guide_tags:
+            tag_names[guide_id].append(name)
+
+        for guide_id, *values in batch:
+            record = dict(zip(RECORD_FIELDS, values), tags=tag_names[guide_id])
+            stream.write(json.dumps(record, default=encode_value, ensure_ascii=False) + '\n')
+        count += len(batch)
+    return count
+
+
+def parse_datetime_field(line_number, record, name):
+    value = record.get(name)
+    if value is None:
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise GuideImportError(line_number, f"`{name}` is not an ISO 8601 date and time.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def parse_record(line_number, line) -> dict:
+    """Parse and validate a single line of an export."""
+
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise GuideImportError(line_number, f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise GuideImportError(line_number, "Expected a JSON object.")
+
+    for name in ('title', 'overview', 'content', 'author'):
+        if not isinstance(record.get(name), str) or not record[name]:
+            raise GuideImportError(line_number, f"`{name}` must be a non-empty string.")
+    for name in ('title', 'overview'):
+        max_length = Guide._meta.get_field(name).max_length
+        if len(record[name]) > max_length:
+            raise GuideImportError(
+                line_number, f"`{name}` is longer than {max_length} characters."
+            )
+
+    record['pub_datetime'] = parse_datetime_field(line_number, record, 'pub_datetime')
+    record['edit_datetime'] = parse_datetime_field(line_number, record, 'edit_datetime')
+    record['tags'] = parse_tags_field(line_number, record)
+    return record
+
+
+def parse_tags_field(line_number, record) -> list:
+    names = record.get('tags', [])
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise GuideImportError(line_number, "`tags` must be a list of strings.")
+    names = tags.parse_tags(','.join(names))
+    if len(names) > tags.MAX_TAGS:
+        raise GuideImportError(line_number, f"A guide can have at most {tags.MAX_TAGS} tags.")
+    max_length = Tag._meta.get_field('name').max_length
+    max_slug_length = Tag._meta.get_field('slug').max_length
+    for name in names:
+        if len(name) > max_length:
+            raise GuideImportError(
+                line_number, f'The tag "{name}" is longer than {max_length} characters.'
+            )
+        if len(tags.tag_slug(name)) > max_slug_length:
+            raise GuideImportError(
+                line_number, f'The tag "{name}" has too many special characters.'
+            )
+    return names
+
+
+def parse_records(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield line_number, parse_record(line_number, line)
+
+
+def import_guides(lines, using='default', batch_size=BATCH_SIZE) -> int:
+    """
+    Create guides from lines written by `export_guides` and return their number.
+
+    All guides are imported in a single transaction. If any line is invalid,
+    names an unknown author or has content which could not be rendered,
+    a `GuideImportError` is raised and no guide is imported.
+    """
+
+    # Rendering a batch fills the render cache, from which saving the
+    # guides takes their rendered content. Larger batches would evict it.
+    batch_size = min(batch_size, RENDER_CACHE_SIZE)
+    records = parse_records(lines)
+    content_type = ContentType.objects.db_manager(using).get_for_model(Guide)
+    permissions = list(
+        Permission.objects.using(using).filter(
+            content_type=content_type, codename__in=AUTHOR_PERMISSIONS
+        )
+    )
+
+    count = 0
+    tag_ids = set()
+    with transaction.atomic(using=using):
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            tag_ids |= import_batch(batch, using, content_type, permissions)
+            count += len(batch)
+        if tag_ids:
+            tags.recount_guides(tag_ids, using)
+
+    if count:
+        # Finding related guides compares all guides with each other,
+        # which is done once for all imported guides instead of per batch.
+        related.rebuild(using=using)
+        feeds.invalidate_feeds()
+        pagecache.invalidate_all()
+        sitemaps.invalidate_sitemaps()
+        httpcache.purge([httpcache.ALL_GUIDES_KEY])
+        autocomplete.invalidate_titles()
+        tags.invalidate_facets()
+    return count
+
+
+def import_batch(batch, using, content_type, permissions) -> set:
+    """Create the guides of a batch, and return the IDs of their tags."""
+
+    usernames = {record['author'] for _, record in batch}
+    authors = dict(
+        get_user_model().objects.using(using)
+        .filter(username__in=usernames)
+        .values_list('username', 'id')
+    )
+    for line_number, record in batch:
+        if record['author'] not in authors:
+            raise GuideImportError(line_number, f"Unknown author \"{record['author']}\".")
+
+    guides = [
+        Guide(
+            title=record['title'],
+            overview=record['overview'],
+            content=record['content'],
+            author_id=authors[record['author']]
+        )
+        for _, record in batch
+    ]
+    documents = []
+    for (line_number, _), guide in zip(batch, guides):
+        try:
+            documents.append(render_document(guide.content.raw, strict=True))
+        except RenderError as e:
+            raise GuideImportError(line_number, str(e))
+
+    # Only some databases return the IDs of created rows. Elsewhere, the
+    # IDs are assigned in order, after the highest ID that existed before.
+    last_id = Guide.objects.using(using).aggregate(last_id=Max('id'))['last_id'] or 0
+    Guide.objects.using(using).bulk_create(guides)
+    if guides[0].pk is None:
+        ids = Guide.objects.using(using).filter(id__gt=last_id).order_by('id')
+        for guide, guide_id in zip(guides, ids.values_list('id', flat=True)):
+            guide.pk = guide_id
+
+    restore_dates(guides, [record for _, record in batch], using)
+    UserObjectPermission.objects.using(using).bulk_create(
+        UserObjectPermission(
+            user_id=guide.author_id,
+            permission=permission,
+            content_type=content_type,
+            object_pk=str(guide.pk)
+        )
+        for guide in guides for permission in permissions
+    )
+    GuideRevision.objects.using(using).bulk_create(
+        GuideRevision(
+            guide_id=guide.pk,
+            number=1,
+            editor_id=guide.author_id,
+            title=guide.title,
+            overview=guide.overview,
+            is_snapshot=True,
+            data=revisions.compress_snapshot(guide.content.raw)
+        )
+        for guide in guides
+    )
+    GuideOutline.objects.using(using).bulk_create(
+        outline.build_outline(guide, document) for guide, document in zip(guides, documents)
+    )
+    search.index_new_guides(guides, using=using)
+    return import_tags(guides, [record for _, record in batch], using)
+
+
+def import_tags(guides, records, using) -> set:
+    """Tag the imported guides, and return the IDs of their tags."""
+
+    names = sorted({name for record in records for name in record['tags']})
+    if not names:
+        return set()
+    tags_by_slug = {tag.slug: tag for tag in tags.get_or_create_tags(names, using)}
+    guide_tags = [
+        GuideTag(
+            guide_id=guide.pk,
+            tag_id=tags_by_slug[tags.tag_slug(name)].id,
+            pub_datetime=guide.pub_datetime
+        )
+        for guide, record in zip(guides, records) for name in record['tags']
+    ]
+    GuideTag.objects.using(using).bulk_create(guide_tags)
+    return {guide_tag.tag_id for guide_tag in guide_tags}
+
+
+def restore_dates(guides, records, using):
+    """Set the imported dates, which `bulk_create` replaced with the current time."""
+
+    connection = connections[using]
+    pub_field = Guide._meta.get_field('pub_datetime')
+    edit_field = Guide._meta.get_field('edit_datetime')
+
+    params = []
+    for guide, record in zip(guides, records):
+        if record['pub_datetime'] is None and record['edit_datetime'] is None:
+            continue
+        guide.pub_datetime = record['pub_datetime'] or guide.pub_datetime
+        guide.edit_datetime = record['edit_datetime'] or guide.edit_datetime
+        params.append((
+            pub_field.get_db_prep_value(guide.pub_datetime, connection),
+            edit_field.get_db_prep_value(guide.edit_datetime, connection),
+            guide.pk,
+        ))
+
+    if params:
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {quote(Guide._meta.db_table)} "
+                f"SET {quote(pub_field.column)} = %s, {quote(edit_field.column)} = %s "
+                "WHERE id = %s",
+                params
+            )
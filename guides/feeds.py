@@ -1,18 +1,135 @@
+import hashlib
+import io
+import uuid
+from urllib.parse import urlsplit
+
+from allauth.socialaccount.models import SocialAccount
+from django.conf import settings
 from django.contrib.syndication.views import Feed
-from django.shortcuts import reverse
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, reverse
 from django.urls import reverse_lazy
-from django.utils.feedgenerator import Atom1Feed
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import parse_http_date, quote_etag
+from django.utils.xmlutils import SimplerXMLGenerator
 
+from . import pagecache
 from .models import Guide
 
 
-class LatestGuidesRSSFeed(Feed):
+# Serialized feeds are cached under a key containing this version,
+# which is replaced with a new random one whenever a guide changes.
+FEED_CACHE_VERSION_KEY = 'guides:feed:version'
+
+# Seconds after which a cached feed is rendered again regardless.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def invalidate_feeds():
+    """Discard all cached feeds."""
+
+    cache.set(FEED_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+class CachedFeedMixin:
+    """
+    Caches the serialized feed until the next change to any guide,
+    and answers conditional requests with `304 Not Modified`.
+
+    The `ETag` is derived from the serialized feed, and the
+    `Last-Modified` date is the latest date of any feed item.
+    """
+
+    def __call__(self, request, *args, **kwargs):
+        version = cache.get_or_set(FEED_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+        key = f'guides:feed:{version}:{request.scheme}:{request.path}'
+
+        cached = cache.get(key)
+        if cached is None:
+            response = super().__call__(request, *args, **kwargs)
+            cached = (
+                response.content,
+                response['Content-Type'],
+                response['Last-Modified'],
+                quote_etag(hashlib.md5(response.content).hexdigest())
+            )
+            cache.set(key, cached, FEED_CACHE_TIMEOUT)
+
+        content, content_type, last_modified, etag = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['Last-Modified'] = last_modified
+        response['ETag'] = etag
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=parse_http_date(last_modified),
+            response=response
+        )
+
+
+class CachedItemsMixin:
+    """
+    Caches the serialized element of every feed item, to be reused by all feeds listing it.
+
+    Items are passed a `revision` identifying their content, which
+    is part of the cache key along with the feed format and the site
+    the links point to.
+    """
+
+    item_element = None
+
+    def item_key(self, item) -> str:
+        site = urlsplit(self.feed['link'])
+        return (
+            f'guides:feed:item:{type(self).__name__}:'
+            f'{site.scheme}://{site.netloc}:{item["revision"]}'
+        )
+
+    def serialize_item(self, item) -> str:
+        stream = io.StringIO()
+        handler = SimplerXMLGenerator(stream, 'utf-8')
+        handler.startElement(self.item_element, self.item_attributes(item))
+        self.add_item_elements(handler, item)
+        handler.endElement(self.item_element)
+        return stream.getvalue()
+
+    def write_items(self, handler):
+        keys = [self.item_key(item) for item in self.items]
+        cached = cache.get_many(keys)
+        serialized = {}
+        for key, item in zip(keys, self.items):
+            if key not in cached:
+                serialized[key] = cached[key] = self.serialize_item(item)
+            # Writes the serialized element as it is.
+            handler.ignorableWhitespace(cached[key])
+        cache.set_many(serialized, FEED_CACHE_TIMEOUT)
+
+
+class CachedRssFeed(CachedItemsMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+
+class CachedAtomFeed(CachedItemsMixin, Atom1Feed):
+    item_element = 'entry'
+
+
+class LatestGuidesRSSFeed(CachedFeedMixin, Feed):
+    feed_type = CachedRssFeed
     title = "Latest Programming Guides"
     description = "Newest programming guides created by our Members."
     link = reverse_lazy("guides:feed_rss")
 
+    def guides(self):
+        return Guide.objects.with_author().with_outline().prefetch_related('tags')
+
     def items(self):
-        return Guide.objects.all()
+        return self.guides()[:settings.GUIDE_FEED_LIMIT]
+
+    def item_extra_kwargs(self, item):
+        # The cache version of a guide changes along with its content, tags and author.
+        return {'revision': f'{item.id}:{pagecache.cache_version(item.id)}'}
 
     def item_title(self, item):
         return item.title
@@ -29,14 +146,57 @@ class LatestGuidesRSSFeed(Feed):
     def item_updateddate(self, item):
         return item.edit_datetime
 
+    def item_categories(self, item):
+        outline = getattr(item, 'outline', None)
+        languages = outline.languages if outline is not None else []
+        return [*languages, *(tag.name for tag in item.tags.all() if tag.name not in languages)]
+
     def item_author_name(self, item):
         return item.author.first_name
 
     def item_author_link(self, item):
-        return reverse("home:profile", kwargs={"pk": item.author.id})
+        if item.author.discord_accounts:
+            return reverse("profiles:detail", kwargs={"pk": item.author.discord_accounts[0].uid})
+        return None
 
 
 class LatestGuidesAtomFeed(LatestGuidesRSSFeed):
-    feed_type = Atom1Feed
+    feed_type = CachedAtomFeed
     subtitle = LatestGuidesRSSFeed.description
     link = reverse_lazy("guides:feed_atom")
+
+
+class AuthorGuidesRSSFeed(LatestGuidesRSSFeed):
+    """The latest guides of the author with the Discord account of the given `uid`."""
+
+    def get_object(self, request, uid):
+        # Users restricting the processing of their data have no public profile.
+        return get_object_or_404(
+            SocialAccount.objects.select_related('user').exclude(
+                user__restrictprocessing__restrict_processing=True
+            ),
+            provider='discoauth',
+            uid=uid
+        )
+
+    def title(self, obj):
+        return f"Programming Guides by {obj.user.first_name}"
+
+    def description(self, obj):
+        return f"Newest programming guides written by {obj.user.first_name}."
+
+    def link(self, obj):
+        return reverse("guides:feed_author_rss", kwargs={"uid": obj.uid})
+
+    def items(self, obj):
+        return self.guides().filter(author=obj.user)[:settings.GUIDE_FEED_LIMIT]
+
+
+class AuthorGuidesAtomFeed(AuthorGuidesRSSFeed):
+    feed_type = CachedAtomFeed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+    def link(self, obj):
+        return reverse("guides:feed_author_atom", kwargs={"uid": obj.uid})
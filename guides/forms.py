@@ -0,0 +1,53 @@
+from django import forms
+
+from website.converters import RENDER_MAX_LENGTH
+from . import tags
+from .models import Guide, Tag
+
+
+class GuideForm(forms.ModelForm):
+    """Edits a guide along with its tags, which are entered separated by commas."""
+
+    tags = forms.CharField(
+        required=False,
+        help_text=f"Up to {tags.MAX_TAGS} topics of your guide, separated by commas."
+    )
+
+    class Meta:
+        model = Guide
+        fields = ('title', 'overview', 'content')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            self.initial.setdefault(
+                'tags', ', '.join(tag.name for tag in self.instance.tags.order_by('name'))
+            )
+
+    def clean_content(self):
+        content = self.cleaned_data['content']
+        if len(content) > RENDER_MAX_LENGTH:
+            raise forms.ValidationError(
+                f"A guide can be at most {RENDER_MAX_LENGTH} characters long."
+            )
+        return content
+
+    def clean_tags(self):
+        names = tags.parse_tags(self.cleaned_data['tags'])
+        if len(names) > tags.MAX_TAGS:
+            raise forms.ValidationError(f"A guide can have at most {tags.MAX_TAGS} tags.")
+        max_length = Tag._meta.get_field('name').max_length
+        max_slug_length = Tag._meta.get_field('slug').max_length
+        for name in names:
+            if len(name) > max_length:
+                raise forms.ValidationError(
+                    f'The tag "{name}" is longer than {max_length} characters.'
+                )
+            # Characters like `#` are spelled out in the slug.
+            if len(tags.tag_slug(name)) > max_slug_length:
+                raise forms.ValidationError(f'The tag "{name}" has too many special characters.')
+        return names
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        tags.set_tags(self.instance, self.cleaned_data['tags'])
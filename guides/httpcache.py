@@ -0,0 +1,117 @@
+"""
+HTTP caching of guide pages by browsers and reverse proxies.
+
+Pages shown to visitors without a session are the same for everyone,
+so they are marked public and carry an `ETag` and `Last-Modified`
+date derived from the guides they show. Browsers revalidate them on
+every visit and receive `304 Not Modified` while nothing changed. A
+reverse proxy may keep them for `SURROGATE_MAX_AGE` seconds, as every
+page names the guides it shows in a `Surrogate-Key` header, and the
+keys of changed guides are purged through `purge`. Pages of logged in
+users are private and never stored. Both depend on the cookies sent,
+so all pages vary on `Cookie`.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from . import webhooks
+
+
+# Seconds a reverse proxy may serve a page without revalidating it.
+SURROGATE_MAX_AGE = 60 * 60 * 24
+
+# Every guide page has this key, to purge all of them at once.
+ALL_GUIDES_KEY = 'guides'
+
+# Lists of guides have this key, to purge them when guides are added or removed.
+GUIDE_LIST_KEY = 'guide-list'
+
+# Sent with the `keys` to purge from reverse proxies whenever guide pages change.
+purge_requested = Signal(providing_args=['keys'])
+
+
+# Set in the WSGI environ of pages rendered by `website.snapshots`, which no header can set.
+SNAPSHOT_ENVIRON_KEY = 'website.snapshot'
+
+
+def guide_key(guide_id) -> str:
+    return f'guide-{guide_id}'
+
+
+def is_shareable_request(request) -> bool:
+    """
+    Check whether the request is guaranteed to come from a visitor
+    without a session or pending messages, without loading its session.
+    """
+
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def is_snapshot_request(request) -> bool:
+    """Check whether the page is rendered for a snapshot, instead of requested by a visitor."""
+
+    return request.META.get(SNAPSHOT_ENVIRON_KEY, False)
+
+
+def make_etag(*parts) -> str:
+    return quote_etag(hashlib.md5(':'.join(map(str, parts)).encode('utf-8')).hexdigest())
+
+
+def add_headers(request, response, etag: str, last_modified, keys=(), max_age=SURROGATE_MAX_AGE):
+    """
+    Add the caching headers for a page showing guides to `response`.
+
+    The validators and surrogate keys are only sent in public responses,
+    which reverse proxies may keep for `max_age` seconds.
+    """
+
+    patch_vary_headers(response, ('Cookie',))
+    if not is_shareable_request(request):
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    response['Surrogate-Control'] = f'max-age={max_age}'
+    response['Surrogate-Key'] = ' '.join((ALL_GUIDES_KEY,) + tuple(keys))
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_response(request, response):
+    """Return `304 Not Modified` instead of `response` if the client's copy is current."""
+
+    if not response.has_header('ETag'):
+        return response
+    return get_conditional_response(
+        request,
+        etag=response['ETag'],
+        last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        response=response
+    )
+
+
+def purge(keys):
+    """
+    Ask reverse proxies to discard the pages with any of the given surrogate keys.
+
+    Sends `purge_requested`, and if `SURROGATE_PURGE_URL` is set, queues
+    the keys for delivery to it as a webhook, see `guides.webhooks`.
+    """
+
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    purge_requested.send(sender=None, keys=keys)
+    if settings.SURROGATE_PURGE_URL is not None:
+        webhooks.enqueue(settings.SURROGATE_PURGE_URL, {'surrogate_keys': keys})
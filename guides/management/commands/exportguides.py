@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from guides import bulk
+
+
+class Command(BaseCommand):
+    help = "Export all guides as newline-delimited JSON, one guide per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help="The file to write the guides to. Defaults to the standard output."
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="The database to export the guides from."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=bulk.BATCH_SIZE,
+            help="The number of guides fetched from the database at once."
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            count = bulk.export_guides(
+                self.stdout, using=options['database'], batch_size=options['batch_size']
+            )
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                count = bulk.export_guides(
+                    output, using=options['database'], batch_size=options['batch_size']
+                )
+        # The standard output may hold the guides, so report on the standard error.
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} guides."))
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from guides import bulk
+from website import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Import guides from newline-delimited JSON as written by `exportguides`. "
+        "The authors must already exist, and are matched by username."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help="The file to read the guides from. Defaults to the standard input."
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="The database to import the guides into."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=bulk.BATCH_SIZE,
+            help="The number of guides inserted into the database at once."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['input'] == '-':
+                count = bulk.import_guides(
+                    sys.stdin, using=options['database'], batch_size=options['batch_size']
+                )
+            else:
+                with open(options['input'], encoding='utf-8') as lines:
+                    count = bulk.import_guides(
+                        lines, using=options['database'], batch_size=options['batch_size']
+                    )
+        except bulk.GuideImportError as e:
+            raise CommandError(f"No guides were imported. {e}")
+        # This process handles no requests, after which the changed pages are written.
+        if snapshots.is_enabled():
+            snapshots.regenerator.regenerate()
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} guides."))
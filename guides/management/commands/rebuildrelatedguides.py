@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from guides import related
+from website import snapshots
+
+
+class Command(BaseCommand):
+    help = "Recompute the related guides of all guides from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="The database whose related guides should be recomputed."
+        )
+
+    def handle(self, *args, **options):
+        count = related.rebuild(using=options['database'])
+        # This process handles no requests, after which the changed pages are written.
+        if snapshots.is_enabled():
+            snapshots.regenerator.regenerate()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed the related guides of {count} guides."))
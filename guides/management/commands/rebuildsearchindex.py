@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from guides import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of guides from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="The database whose search index should be rebuilt."
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            search.rebuild_index(using=using)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the guide search index."))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from guides.webhooks import BATCH_SIZE, OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued webhook messages, such as announcements of new guides."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Deliver all messages that are currently due, then exit."
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls of the outbox when it is empty."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help="How many messages to fetch from the outbox at once."
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(batch_size=options['batch_size'])
+
+        if options['once']:
+            processed = worker.drain()
+            self.stdout.write(f"Processed {processed} webhook message(s).")
+            return
+
+        while True:
+            if not worker.run_once():
+                time.sleep(options['interval'])
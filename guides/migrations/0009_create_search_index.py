@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The statements creating, filling and dropping the full-text search index of
+# every database vendor with a backend in `guides.search`, as of this migration.
+CREATE_SEARCH_INDEX = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS guides_guide_fts "
+        "USING fts5(title, overview, content, tokenize='porter unicode61')",
+        "DELETE FROM guides_guide_fts",
+        "INSERT INTO guides_guide_fts (rowid, title, overview, content) "
+        "SELECT id, title, overview, content FROM guides_guide",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS guides_guide_search ("
+        "guide_id integer PRIMARY KEY REFERENCES guides_guide (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS guides_guide_search_document_idx "
+        "ON guides_guide_search USING GIN (document)",
+        "DELETE FROM guides_guide_search",
+        "INSERT INTO guides_guide_search (guide_id, document) "
+        "SELECT id, "
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', overview), 'B') || "
+        "setweight(to_tsvector('english', content), 'C') "
+        "FROM guides_guide",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'sqlite': ["DROP TABLE IF EXISTS guides_guide_fts"],
+    'postgresql': ["DROP TABLE IF EXISTS guides_guide_search"],
+}
+
+
+def execute_statements(statements, schema_editor):
+    # Other databases search without an index.
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text search index and fill it with the existing guides."""
+
+    execute_statements(CREATE_SEARCH_INDEX, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    execute_statements(DROP_SEARCH_INDEX, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0008_remove_editable_false_on_guide_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
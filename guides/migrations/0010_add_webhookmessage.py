@@ -0,0 +1,29 @@
+# Generated by Django 2.0.7 on 2026-10-18 06:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0009_create_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('payload', models.TextField(help_text='The JSON encoded request body.')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_datetime', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_datetime', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['next_attempt_datetime', 'id'],
+            },
+        ),
+    ]
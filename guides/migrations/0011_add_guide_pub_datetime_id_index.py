@@ -0,0 +1,21 @@
+# Generated by Django 2.0.7 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0010_add_webhookmessage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='guide',
+            options={'ordering': ['-pub_datetime', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='guide',
+            index=models.Index(fields=['-pub_datetime', '-id'], name='guides_guide_pub_id_idx'),
+        ),
+    ]
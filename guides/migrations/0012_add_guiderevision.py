@@ -0,0 +1,37 @@
+# Generated by Django 2.0.7 on 2026-10-18 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('guides', '0011_add_guide_pub_datetime_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuideRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('overview', models.CharField(max_length=200)),
+                ('is_snapshot', models.BooleanField()),
+                ('data', models.BinaryField()),
+                ('created_datetime', models.DateTimeField(auto_now_add=True)),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('guide', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='guides.Guide')),
+            ],
+            options={
+                'ordering': ['guide', '-number'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='guiderevision',
+            unique_together={('guide', 'number')},
+        ),
+    ]
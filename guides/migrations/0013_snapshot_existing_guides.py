@@ -0,0 +1,43 @@
+import zlib
+
+from django.db import migrations
+
+
+def snapshot_existing_guides(apps, schema_editor):
+    """Record the current version of every existing guide as its first revision."""
+
+    Guide = apps.get_model('guides', 'Guide')
+    GuideRevision = apps.get_model('guides', 'GuideRevision')
+    db_alias = schema_editor.connection.alias
+
+    guides = Guide.objects.using(db_alias).values_list(
+        'id', 'title', 'overview', 'content', 'author_id'
+    )
+    GuideRevision.objects.using(db_alias).bulk_create(
+        GuideRevision(
+            guide_id=guide_id,
+            number=1,
+            editor_id=author_id,
+            title=title,
+            overview=overview,
+            is_snapshot=True,
+            data=zlib.compress(content.encode('utf-8')),
+        )
+        for guide_id, title, overview, content, author_id in guides.iterator()
+    )
+
+
+def delete_revisions(apps, schema_editor):
+    GuideRevision = apps.get_model('guides', 'GuideRevision')
+    GuideRevision.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0012_add_guiderevision'),
+    ]
+
+    operations = [
+        migrations.RunPython(snapshot_existing_guides, delete_revisions),
+    ]
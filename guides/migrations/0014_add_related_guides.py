@@ -0,0 +1,38 @@
+# Generated by Django 2.0.7 on 2026-10-18 07:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0013_snapshot_existing_guides'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuideTerms',
+            fields=[
+                ('guide', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='terms', serialize=False, to='guides.Guide')),
+                ('counts', models.TextField(help_text='The JSON encoded term counts.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedGuide',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('guide', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_guides', to='guides.Guide')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_by', to='guides.Guide')),
+            ],
+            options={
+                'ordering': ['guide', 'rank'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedguide',
+            unique_together={('guide', 'rank')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.0.7 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0014_add_related_guides'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuideOutline',
+            fields=[
+                ('guide', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='outline', serialize=False, to='guides.Guide')),
+                ('headings', models.TextField(default='[]', help_text='The JSON encoded `[level, anchor, name]` of every heading.')),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('code_languages', models.CharField(blank=True, help_text='The languages of all code blocks, space separated.', max_length=200)),
+            ],
+        ),
+    ]
@@ -0,0 +1,92 @@
+import json
+import re
+
+import markdown
+from django.db import migrations
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE
+
+HEADING_PATTERN = re.compile(r'^h[1-6]$')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def count_words(text):
+    if not text:
+        return 0
+    return len(WORD_PATTERN.findall(HTML_PLACEHOLDER_RE.sub('', text)))
+
+
+class OutlineTreeprocessor(Treeprocessor):
+    """Notes the headings and the words outside of code blocks, which are stashed."""
+
+    def run(self, root):
+        self.headings = []
+        self.word_count = 0
+        self.collect(root)
+
+    def collect(self, element):
+        if element.get('class') == 'toc':
+            return
+        if isinstance(element.tag, str) and HEADING_PATTERN.match(element.tag):
+            name = HTML_PLACEHOLDER_RE.sub('', ''.join(element.itertext())).strip()
+            self.headings.append((int(element.tag[1]), element.get('id', ''), name))
+
+        self.word_count += count_words(element.text)
+        for child in element:
+            self.collect(child)
+            self.word_count += count_words(child.tail)
+
+
+def outline_existing_guides(apps, schema_editor):
+    """Store the outline of every existing guide."""
+
+    Guide = apps.get_model('guides', 'Guide')
+    GuideOutline = apps.get_model('guides', 'GuideOutline')
+    db_alias = schema_editor.connection.alias
+    max_length = GuideOutline._meta.get_field('code_languages').max_length
+
+    # Code blocks are stashed without highlighting them, only the text around them is counted.
+    md = markdown.Markdown(
+        extensions=['markdown.extensions.codehilite', 'markdown.extensions.fenced_code',
+                    'markdown.extensions.toc'],
+        extension_configs={'markdown.extensions.codehilite': {'use_pygments': False}}
+    )
+    outline = OutlineTreeprocessor(md)
+    md.treeprocessors.add('outline', outline, '_end')
+
+    outlines = []
+    for guide_id, content in Guide.objects.using(db_alias).values_list('id', 'content'):
+        md.reset().convert(content)
+
+        # The languages of fenced code blocks, indented ones are noted when a guide is saved.
+        languages = ''
+        matches = FencedBlockPreprocessor.FENCED_BLOCK_RE.finditer(content)
+        for language in dict.fromkeys(m.group('lang').lower() for m in matches if m.group('lang')):
+            if len(languages) + len(language) + 1 > max_length:
+                break
+            languages = f'{languages} {language}'.lstrip()
+
+        outlines.append(GuideOutline(
+            guide_id=guide_id,
+            headings=json.dumps(outline.headings, ensure_ascii=False, separators=(',', ':')),
+            word_count=outline.word_count,
+            code_languages=languages,
+        ))
+    GuideOutline.objects.using(db_alias).bulk_create(outlines, batch_size=500)
+
+
+def delete_outlines(apps, schema_editor):
+    GuideOutline = apps.get_model('guides', 'GuideOutline')
+    GuideOutline.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0015_add_guideoutline'),
+    ]
+
+    operations = [
+        migrations.RunPython(outline_existing_guides, delete_outlines),
+    ]
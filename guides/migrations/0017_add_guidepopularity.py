@@ -0,0 +1,22 @@
+# Generated by Django 2.0.7 on 2026-10-18 14:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0016_outline_existing_guides'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuidePopularity',
+            fields=[
+                ('guide', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='guides.Guide')),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('trending_score', models.FloatField(db_index=True, help_text='The logarithm of the time-weighted views, comparable between all guides.')),
+            ],
+        ),
+    ]
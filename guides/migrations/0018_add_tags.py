@@ -0,0 +1,60 @@
+# Generated by Django 2.0.7 on 2026-10-18 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0017_add_guidepopularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuideTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_datetime', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('slug', models.SlugField(max_length=40, unique=True)),
+                ('guide_count', models.PositiveIntegerField(default=0, help_text='The number of guides with this tag, updated along with their tags.')),
+            ],
+            options={
+                'ordering': ['-guide_count', 'name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-guide_count', 'name'], name='guides_tag_count_name_idx'),
+        ),
+        migrations.AddField(
+            model_name='guidetag',
+            name='guide',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guide_tags', to='guides.Guide'),
+        ),
+        migrations.AddField(
+            model_name='guidetag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guide_tags', to='guides.Tag'),
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='guides', through='guides.GuideTag', to='guides.Tag'),
+        ),
+        migrations.AddIndex(
+            model_name='guidetag',
+            index=models.Index(fields=['tag', '-pub_datetime', '-guide'], name='guides_guidetag_listing_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='guidetag',
+            unique_together={('guide', 'tag')},
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.0.7 on 2026-10-18 07:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+from collections import Counter
+
+
+def index_existing_terms(apps, schema_editor):
+    """Store the postings and document frequencies of the terms of every guide."""
+
+    GuideTerms = apps.get_model('guides', 'GuideTerms')
+    TermPosting = apps.get_model('guides', 'TermPosting')
+    TermFrequency = apps.get_model('guides', 'TermFrequency')
+    db_alias = schema_editor.connection.alias
+
+    frequencies = Counter()
+    postings = []
+    for guide_id, counts in GuideTerms.objects.using(db_alias).values_list('guide_id', 'counts'):
+        terms = [term for term in json.loads(counts) if len(term) <= 50]
+        frequencies.update(terms)
+        postings.extend(TermPosting(term=term, guide_id=guide_id) for term in terms)
+    TermPosting.objects.using(db_alias).bulk_create(postings, batch_size=500)
+    TermFrequency.objects.using(db_alias).bulk_create(
+        (TermFrequency(term=term, guide_count=count) for term, count in frequencies.items()),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guides', '0018_add_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermFrequency',
+            fields=[
+                ('term', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('guide_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TermPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('guide', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='guides.Guide')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='termposting',
+            unique_together={('term', 'guide')},
+        ),
+        migrations.RunPython(index_existing_terms, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,51 @@
+import json
+
+from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from markupfield.fields import MarkupField
 
+from website.artifacts import reading_minutes
+
+
+# The fields required to show a guide in a list of guides.
+LISTING_FIELDS = (
+    'id', 'title', 'overview', 'pub_datetime', 'edit_datetime', 'author',
+    'outline__word_count', 'outline__code_languages',
+)
+
+
+class GuideQuerySet(models.QuerySet):
+    def with_author(self):
+        """Fetch the author along with their Discord account, if they connected one.
+
+        The account is fetched in a single query for all guides, and
+        stored as a list of at most one account in the author's
+        `discord_accounts` attribute.
+        """
+
+        return self.select_related('author').prefetch_related(
+            models.Prefetch(
+                'author__socialaccount_set',
+                queryset=SocialAccount.objects.filter(provider='discoauth'),
+                to_attr='discord_accounts'
+            )
+        )
+
+    def with_outline(self):
+        """Fetch the outline along with each guide, see `guides.outline`."""
+
+        return self.select_related('outline')
+
+    def for_listing(self):
+        """Prepare guides for a list of guides, which does not display their content."""
+
+        # The fields added by `MarkupField` share their creation counters
+        # with the fields declared after it, which makes Django's `defer`
+        # skip those as well. Naming the loaded fields is not affected.
+        return self.with_author().with_outline().only(*LISTING_FIELDS)
+
 
 class Guide(models.Model):
     title = models.CharField(
@@ -18,9 +62,201 @@ class Guide(models.Model):
     pub_datetime = models.DateTimeField(auto_now_add=True)
     edit_datetime = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    tags = models.ManyToManyField('Tag', through='GuideTag', blank=True, related_name="guides")
+
+    objects = GuideQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
     class Meta:
-        ordering = ["-pub_datetime"]
+        # The ID breaks ties between guides published at the same time,
+        # which keyset pagination relies on to seek to an exact position.
+        ordering = ["-pub_datetime", "-id"]
+        indexes = [
+            models.Index(fields=["-pub_datetime", "-id"], name="guides_guide_pub_id_idx"),
+        ]
+
+
+class WebhookMessage(models.Model):
+    """A webhook request waiting to be delivered by the `sendwebhooks` command."""
+
+    url = models.URLField(max_length=500)
+    payload = models.TextField(help_text="The JSON encoded request body.")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_datetime = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_datetime = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.url} ({self.attempts} attempts)"
+
+    class Meta:
+        ordering = ["next_attempt_datetime", "id"]
+
+
+class GuideRevision(models.Model):
+    """
+    A saved version of a guide, see `guides.revisions`.
+
+    The content is stored compressed in `data`, either in full if this
+    is a snapshot, or as the changes to the content of the previous revision.
+    """
+
+    guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name="revisions")
+    number = models.PositiveIntegerField()
+    editor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    title = models.CharField(max_length=100)
+    overview = models.CharField(max_length=200)
+    is_snapshot = models.BooleanField()
+    data = models.BinaryField()
+    created_datetime = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} (revision {self.number})"
+
+    class Meta:
+        ordering = ["guide", "-number"]
+        unique_together = ("guide", "number")
+
+
+class GuideTerms(models.Model):
+    """The weighted term counts of a guide, from which `guides.related` finds related guides."""
+
+    guide = models.OneToOneField(
+        Guide, on_delete=models.CASCADE, primary_key=True, related_name="terms"
+    )
+    counts = models.TextField(help_text="The JSON encoded term counts.")
+
+
+class TermPosting(models.Model):
+    """A term of a guide, to find the guides sharing terms, see `guides.related`."""
+
+    term = models.CharField(max_length=50)
+    guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        unique_together = ("term", "guide")
+
+
+class TermFrequency(models.Model):
+    """The number of guides with a term, see `guides.related`."""
+
+    term = models.CharField(max_length=50, primary_key=True)
+    guide_count = models.PositiveIntegerField(default=0)
+
+
+class RelatedGuide(models.Model):
+    """One of the guides most similar to a guide, see `guides.related`."""
+
+    guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name="related_guides")
+    related = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name="related_by")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    def __str__(self):
+        return f"{self.guide_id} -> {self.related_id} ({self.score:.3f})"
+
+    class Meta:
+        ordering = ["guide", "rank"]
+        unique_together = ("guide", "rank")
+
+
+class GuideOutline(models.Model):
+    """
+    The headings, length and code languages of the rendered content of a guide.
+
+    Collected while the content is rendered on save, see `guides.outline`.
+    """
+
+    guide = models.OneToOneField(
+        Guide, on_delete=models.CASCADE, primary_key=True, related_name="outline"
+    )
+    headings = models.TextField(
+        default="[]", help_text="The JSON encoded `[level, anchor, name]` of every heading."
+    )
+    word_count = models.PositiveIntegerField(default=0)
+    code_languages = models.CharField(
+        max_length=200, blank=True, help_text="The languages of all code blocks, space separated."
+    )
+
+    def __str__(self):
+        return f"Outline of {self.guide_id}"
+
+    @property
+    def reading_minutes(self):
+        return reading_minutes(self.word_count)
+
+    @property
+    def toc(self):
+        """The headings as a list of dictionaries with a `level`, `anchor` and `name` each."""
+
+        return [
+            {'level': level, 'anchor': anchor, 'name': name}
+            for level, anchor, name in json.loads(self.headings)
+        ]
+
+    @property
+    def languages(self):
+        return self.code_languages.split()
+
+
+class GuidePopularity(models.Model):
+    """The number of views of a guide, and how much it is trending, see `guides.viewcounts`."""
+
+    guide = models.OneToOneField(
+        Guide, on_delete=models.CASCADE, primary_key=True, related_name="popularity"
+    )
+    view_count = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(
+        db_index=True,
+        help_text="The logarithm of the time-weighted views, comparable between all guides."
+    )
+
+    def __str__(self):
+        return f"Popularity of {self.guide_id}"
+
+
+class Tag(models.Model):
+    """A topic of guides, see `guides.tags`."""
+
+    name = models.CharField(max_length=30, unique=True)
+    slug = models.SlugField(max_length=40, unique=True)
+    guide_count = models.PositiveIntegerField(
+        default=0, help_text="The number of guides with this tag, updated along with their tags."
+    )
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ["-guide_count", "name"]
+        indexes = [
+            models.Index(fields=["-guide_count", "name"], name="guides_tag_count_name_idx"),
+        ]
+
+
+class GuideTag(models.Model):
+    """
+    A tag of a guide.
+
+    The publication date of the guide is copied, so that the
+    guides with a tag are listed from an index on this table.
+    """
+
+    guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name="guide_tags")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="guide_tags")
+    pub_datetime = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.guide_id} tagged {self.tag_id}"
+
+    class Meta:
+        unique_together = ("guide", "tag")
+        indexes = [
+            models.Index(
+                fields=["tag", "-pub_datetime", "-guide"], name="guides_guidetag_listing_idx"
+            ),
+        ]
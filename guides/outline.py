@@ -0,0 +1,44 @@
+"""
+The outline of every guide: its headings, word count and code languages.
+
+These are collected by `website.artifacts` while the content of a guide
+is rendered on save, and stored in `GuideOutline` next to the guide. The
+list, search results, feeds and detail page show them without parsing
+the markdown again. Storing the outline right after saving takes the
+rendered document from the render cache, which still holds it.
+"""
+
+import json
+
+from website.converters import render_document
+from .models import GuideOutline
+
+
+def outline_fields(artifacts) -> dict:
+    """Return the `GuideOutline` field values for the given `RenderArtifacts`."""
+
+    max_length = GuideOutline._meta.get_field('code_languages').max_length
+    languages = ''
+    for language in artifacts.code_languages:
+        if len(languages) + len(language) + 1 > max_length:
+            break
+        languages = f'{languages} {language}'.lstrip()
+
+    return {
+        'headings': json.dumps(artifacts.headings, ensure_ascii=False, separators=(',', ':')),
+        'word_count': artifacts.word_count,
+        'code_languages': languages,
+    }
+
+
+def build_outline(guide, document) -> GuideOutline:
+    return GuideOutline(guide_id=guide.pk, **outline_fields(document.artifacts))
+
+
+def update_outline(guide, using='default'):
+    """Store the outline of a saved guide."""
+
+    document = render_document(guide.content.raw, strict=True)
+    GuideOutline.objects.using(using).update_or_create(
+        guide_id=guide.pk, defaults=outline_fields(document.artifacts)
+    )
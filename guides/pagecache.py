@@ -0,0 +1,90 @@
+"""
+Caching of rendered guide detail pages.
+
+A detail page only differs by the audience viewing it: anonymous
+users, guests, members, the guide's author, and users allowed to
+change the guide. Pages for anonymous visitors are cached as whole
+responses, so serving them touches neither the session nor any
+database. For everyone else, the navigation bar shows who is logged
+in, so only the guide itself is cached as a template fragment.
+
+Every guide has a cache version, which is replaced whenever the
+guide, its author or its object permissions change. A global version
+covers changes affecting all guides at once, such as changes to the
+permissions of a group.
+"""
+
+import uuid
+
+from django.core.cache import cache
+
+from .httpcache import is_shareable_request
+
+
+# Seconds after which a cached page is rendered again regardless.
+DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+
+GLOBAL_VERSION_KEY = 'guides:detail:version'
+
+ANONYMOUS = 'anonymous'
+GUEST = 'guest'
+MEMBER = 'member'
+AUTHOR = 'author'
+EDITOR = 'editor'
+
+
+def guide_version_key(guide_id) -> str:
+    return f'guides:detail:version:{guide_id}'
+
+
+def cache_version(guide_id) -> str:
+    """Return the current cache version of the detail page of the given guide."""
+
+    keys = (GLOBAL_VERSION_KEY, guide_version_key(guide_id))
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = uuid.uuid4().hex
+            cache.add(key, versions[key], None)
+    return ':'.join(versions[key] for key in keys)
+
+
+def invalidate_guide(guide_id):
+    """Discard the cached detail pages of the guide with the given ID."""
+
+    cache.set(guide_version_key(guide_id), uuid.uuid4().hex, None)
+
+
+def invalidate_all():
+    """Discard the cached detail pages of all guides."""
+
+    cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def response_key(guide_id) -> str:
+    """Return the cache key of the full response served to anonymous visitors."""
+
+    return f'guides:detail:{guide_id}:{cache_version(guide_id)}:{ANONYMOUS}'
+
+
+def is_anonymous_request(request) -> bool:
+    """
+    Check whether the request is guaranteed to come from an anonymous
+    visitor with nothing personalised to show, without loading its session.
+    """
+
+    return not request.GET and is_shareable_request(request)
+
+
+def audience(user, guide, can_change: bool) -> str:
+    """Return which variant of the detail page of `guide` is shown to `user`."""
+
+    if user.is_anonymous:
+        return ANONYMOUS
+    if user.id == guide.author_id:
+        return AUTHOR
+    if can_change:
+        return EDITOR
+    if user.groups.filter(name='guest').exists():
+        return GUEST
+    return MEMBER
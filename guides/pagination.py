@@ -0,0 +1,205 @@
+"""
+Keyset pagination of guide lists.
+
+Instead of skipping a number of rows with `OFFSET`, every page after
+the first one starts right behind the last guide of the previous page.
+The position of a guide in the sort order is passed along in an opaque
+cursor, and the next page is selected with a range condition on the
+sort keys, which the database answers from an index. Fetching a deep
+page therefore costs the same as fetching the first one.
+
+The total number of guides is never counted for a page. Lists that can
+cheaply tell their size offer an estimate, which is shown instead.
+"""
+
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+
+
+# Seconds for which an estimated count is reused before counting again.
+ESTIMATE_TIMEOUT = 60 * 5
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_value(value):
+    if isinstance(value, datetime.datetime):
+        # Unlike Django's JSON encoder, this keeps the microseconds,
+        # which are needed to seek to the exact position.
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor.")
+
+
+def encode_cursor(position: tuple) -> str:
+    """Encode the sort keys of a list item into an URL-safe cursor."""
+
+    data = json.dumps(position, default=encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    """Decode a cursor created by `encode_cursor` holding `length` sort keys."""
+
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(data.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("The cursor is malformed.")
+    if not isinstance(position, list) or len(position) != length:
+        raise InvalidCursor("The cursor is malformed.")
+    return position
+
+
+class KeysetQuerySet:
+    """
+    Seeks through a queryset ordered by the given unique combination of fields.
+
+    Fields prefixed with `-` are sorted in descending order.
+    """
+
+    def __init__(self, queryset: QuerySet, ordering):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def position(self, obj) -> tuple:
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def behind(self, position, backwards: bool) -> Q:
+        """Build the condition selecting the items behind `position` in the given direction."""
+
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            descending = self.ordering[index].startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            equal = {self.fields[i]: position[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+        return condition
+
+    def seek(self, limit: int, after=None, before=None) -> list:
+        queryset = self.queryset
+        try:
+            if before is not None:
+                queryset = queryset.filter(self.behind(before, backwards=True)).order_by(*(
+                    field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+                ))
+            else:
+                if after is not None:
+                    queryset = queryset.filter(self.behind(after, backwards=False))
+                queryset = queryset.order_by(*self.ordering)
+            items = list(queryset[:limit])
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor("The cursor does not match the list.")
+        return items[::-1] if before is not None else items
+
+    def estimate_count(self) -> int:
+        """Count the items, reusing the count for a few minutes."""
+
+        query = str(self.queryset.order_by().values('pk').query)
+        key = f"guides:count:{hashlib.md5(query.encode('utf-8')).hexdigest()}"
+        count = cache.get(key)
+        if count is None:
+            count = self.queryset.count()
+            cache.set(key, count, ESTIMATE_TIMEOUT)
+        return count
+
+
+class KeysetPage(Sequence):
+    """A page of items along with the cursors of the adjacent pages."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self):
+        return encode_cursor(self.paginator.source.position(self.object_list[-1]))
+
+    def previous_cursor(self):
+        return encode_cursor(self.paginator.source.position(self.object_list[0]))
+
+
+class KeysetPaginator:
+    """
+    Splits a list into pages by cursor instead of page number.
+
+    The list is either a queryset, which is sorted by `ordering`, or an
+    object naming its sort keys in an `ordering` attribute, with a
+    `seek(limit, after=None, before=None)` method returning up to `limit`
+    items behind the given positions, and a `position(item)` method
+    returning the sort keys of an item.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pk',)):
+        if isinstance(object_list, QuerySet):
+            object_list = KeysetQuerySet(object_list, ordering)
+        self.source = object_list
+        self.per_page = int(per_page)
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        return decode_cursor(cursor, len(self.source.ordering))
+
+    def page(self, after=None, before=None) -> KeysetPage:
+        """Return the page following the `after` cursor, or preceding the `before` cursor."""
+
+        after, before = self.decode(after), self.decode(before)
+        # One more item than needed tells whether another page follows.
+        items = self.source.seek(self.per_page + 1, after=after, before=before)
+
+        if before is not None:
+            if len(items) <= self.per_page:
+                # Paging back reached the start of the list, which may have
+                # changed since. Show a full first page instead.
+                return self.page()
+            return KeysetPage(items[1:], self, has_next=True, has_previous=True)
+
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return KeysetPage(items, self, has_next=has_next, has_previous=bool(after and items))
+
+    @property
+    def estimated_count(self):
+        """The approximate number of items, or `None` if it cannot be cheaply estimated."""
+
+        estimate = getattr(self.source, 'estimate_count', None)
+        return estimate() if estimate is not None else None
+
+    @property
+    def estimated_num_pages(self):
+        count = self.estimated_count
+        if count is None:
+            return None
+        return max(1, -(-count // self.per_page))
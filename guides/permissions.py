@@ -0,0 +1,93 @@
+"""
+Object permission checks answered from memory.
+
+Guardian's `ObjectPermissionBackend` builds a new `ObjectPermissionChecker`
+for every check, so every `user.has_perm(perm, guide)` queries the
+database again. `PrefetchingObjectPermissionBackend` keeps a single
+checker on each user object instead, which lives as long as the request
+the user belongs to. `prefetch_permissions` fills that checker for a
+whole page of guides with a single query, after which all permission
+checks on these guides are dictionary lookups.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.utils.encoding import force_text
+from guardian.backends import ObjectPermissionBackend, check_object_support, check_user_support
+from guardian.core import ObjectPermissionChecker
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+
+class PrefetchingObjectPermissionChecker(ObjectPermissionChecker):
+    """An `ObjectPermissionChecker` prefetching user and group permissions with one query."""
+
+    def prefetch_perms(self, objects):
+        objects = [
+            obj for obj in objects if self.get_local_cache_key(obj) not in self._obj_perms_cache
+        ]
+        if not objects or self.user is None or not self.user.is_active:
+            return
+        if self.user.is_superuser:
+            super().prefetch_perms(objects)
+            return
+
+        content_type = ContentType.objects.get_for_model(objects[0])
+        pks = [force_text(obj.pk) for obj in objects]
+        user_permissions = UserObjectPermission.objects.filter(
+            user=self.user, content_type=content_type, object_pk__in=pks
+        )
+        group_permissions = GroupObjectPermission.objects.filter(
+            group__user=self.user, content_type=content_type, object_pk__in=pks
+        )
+
+        codenames = {pk: [] for pk in pks}
+        rows = user_permissions.values_list('object_pk', 'permission__codename').union(
+            group_permissions.values_list('object_pk', 'permission__codename')
+        )
+        for pk, codename in rows:
+            codenames[pk].append(codename)
+        for pk, perms in codenames.items():
+            self._obj_perms_cache[(content_type.id, pk)] = perms
+
+
+def get_checker(user_obj):
+    """Return the permission checker kept on the given user, or `None` for unsupported users."""
+
+    checker = getattr(user_obj, '_object_permission_checker', None)
+    if checker is None:
+        supported, identity = check_user_support(user_obj)
+        if not supported:
+            return None
+        checker = PrefetchingObjectPermissionChecker(identity)
+        user_obj._object_permission_checker = checker
+    return checker
+
+
+def prefetch_permissions(user_obj, objects):
+    """Load the object permissions of the given user on all `objects` with a single query."""
+
+    checker = get_checker(user_obj)
+    if checker is not None:
+        checker.prefetch_perms(objects)
+
+
+class PrefetchingObjectPermissionBackend(ObjectPermissionBackend):
+    """
+    An `ObjectPermissionBackend` checking permissions through the checker
+    kept on each user, see `prefetch_permissions`.
+    """
+
+    def has_perm(self, user_obj, perm, obj=None):
+        if not check_object_support(obj):
+            return False
+        if '.' in perm and perm.split('.')[0] != obj._meta.app_label:
+            # Let guardian compare the content type's app label or fail loudly.
+            return super().has_perm(user_obj, perm, obj)
+
+        checker = get_checker(user_obj)
+        return checker is not None and checker.has_perm(perm, obj)
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not check_object_support(obj):
+            return set()
+        checker = get_checker(user_obj)
+        return set(checker.get_perms(obj)) if checker is not None else set()
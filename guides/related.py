@@ -0,0 +1,371 @@
+"""
+Related guides, found by the TF-IDF cosine similarity of their text.
+
+The term counts of every guide are stored in `GuideTerms` when it is
+saved, with words in the title and overview counting more than words in
+the content. From these, sparse TF-IDF vectors are built and the
+`RELATED_GUIDES` most similar guides of every guide are stored as
+`RelatedGuide` rows, so showing them is a single indexed query.
+
+The terms of every guide are also stored as `TermPosting` rows, and the
+number of guides with every term as a `TermFrequency`. Saving a guide
+only loads the guides sharing a term with it, from which it recomputes
+the neighbours of that guide, and updates the lists of other guides it
+enters, moves in or drops out of. Terms found in a large share of all
+guides are not followed, as they would load most of the guides while
+adding little to any similarity. Guides sharing only such terms with a
+saved guide are compared again by the next `rebuild`. The document frequencies of all terms
+change slightly with every guide, which the stored scores of unaffected
+guides do not follow until the next `rebuild`, run by the
+`rebuildrelatedguides` command.
+"""
+
+import heapq
+import json
+import math
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import httpcache, pagecache
+from .models import Guide, GuideTerms, RelatedGuide, TermFrequency, TermPosting
+from .search import TOKEN_PATTERN
+
+
+# The number of related guides stored for every guide.
+RELATED_GUIDES = 5
+
+# Guides less similar than this are never related.
+MIN_SCORE = 0.05
+
+# Only this many of the most frequent terms of a guide are stored.
+MAX_TERMS = 300
+
+# Longer words are not terms.
+MAX_TERM_LENGTH = TermPosting._meta.get_field('term').max_length
+
+# Terms and guides are looked up in batches of this size, below the parameter limit of SQLite.
+LOOKUP_BATCH_SIZE = 500
+
+# Terms in more than this share of all guides, and in more than `COMMON_TERM_MIN_GUIDES`
+# guides, are too common to load the guides sharing them when a guide is saved.
+COMMON_TERM_FREQUENCY = 0.1
+COMMON_TERM_MIN_GUIDES = 50
+
+# How much more a word counts in the title and overview than in the content.
+FIELD_WEIGHTS = (('title', 3), ('overview', 2), ('content', 1))
+
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are because been before being below
+    between both but can could did does doing down during each few for from further had has
+    have having her here hers herself him himself his how into its itself just more most
+    much not now off once only other our ours ourselves out over own same she should some
+    such than that the their theirs them themselves then there these they this those
+    through too under until use used using very was were what when where which while who
+    whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def term_counts(title: str, overview: str, content: str) -> dict:
+    """Count the weighted terms of a guide, keeping the `MAX_TERMS` most frequent ones."""
+
+    counts = Counter()
+    texts = {'title': title, 'overview': overview, 'content': content}
+    for field, weight in FIELD_WEIGHTS:
+        for word in TOKEN_PATTERN.findall(texts[field].lower()):
+            if (
+                2 < len(word) <= MAX_TERM_LENGTH
+                and not word.isdigit() and word not in STOP_WORDS
+            ):
+                counts[word] += weight
+    return dict(counts.most_common(MAX_TERMS))
+
+
+class SimilarityIndex:
+    """
+    Sparse, normalized TF-IDF vectors of guides with an inverted index.
+
+    Built from a mapping of guide IDs to term counts. The similarities of
+    a guide are accumulated over the postings of its terms only, so guides
+    without any common term are never compared. Terms are weighted by the
+    number of the given guides with them, unless the `document_frequencies`
+    among a `total` number of guides are given, to index only some of them.
+    """
+
+    def __init__(self, counts_by_guide: dict, document_frequencies=None, total=None):
+        if document_frequencies is None:
+            document_frequencies = Counter()
+            for counts in counts_by_guide.values():
+                document_frequencies.update(counts.keys())
+            total = len(counts_by_guide)
+
+        idf = {
+            term: math.log((1 + total) / (1 + document_frequencies.get(term, 0))) + 1
+            for counts in counts_by_guide.values() for term in counts
+        }
+
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for guide_id, counts in counts_by_guide.items():
+            vector = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            vector = {term: weight / norm for term, weight in vector.items()}
+            self.vectors[guide_id] = vector
+            for term, weight in vector.items():
+                self.postings[term].append((guide_id, weight))
+
+    def scores(self, guide_id) -> dict:
+        """Return the cosine similarity of the given guide to every guide sharing a term."""
+
+        scores = defaultdict(float)
+        for term, weight in self.vectors[guide_id].items():
+            for other_id, other_weight in self.postings[term]:
+                scores[other_id] += weight * other_weight
+        scores.pop(guide_id, None)
+        return scores
+
+    def neighbours(self, guide_id, scores=None) -> list:
+        """Return the `(score, guide_id)` pairs of the most similar guides, best first."""
+
+        if scores is None:
+            scores = self.scores(guide_id)
+        return top_neighbours(scores)
+
+
+def top_neighbours(scores: dict) -> list:
+    candidates = ((score, other_id) for other_id, score in scores.items() if score >= MIN_SCORE)
+    # Ties are broken by preferring newer guides, which have higher IDs.
+    return heapq.nlargest(RELATED_GUIDES, candidates)
+
+
+def batches(values, size=LOOKUP_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_index(guide_ids, using='default') -> SimilarityIndex:
+    """Load the vectors of the given guides, weighted by the document frequencies of all guides."""
+
+    counts_by_guide = {}
+    for batch in batches(guide_ids):
+        rows = GuideTerms.objects.using(using).filter(guide_id__in=batch)
+        counts_by_guide.update(
+            (guide_id, json.loads(counts)) for guide_id, counts in rows.values_list(
+                'guide_id', 'counts'
+            )
+        )
+
+    terms = set()
+    for counts in counts_by_guide.values():
+        terms.update(counts)
+    frequencies = {}
+    for batch in batches(terms):
+        rows = TermFrequency.objects.using(using).filter(term__in=batch)
+        frequencies.update(rows.values_list('term', 'guide_count'))
+    total = GuideTerms.objects.using(using).count()
+    return SimilarityIndex(counts_by_guide, frequencies, total)
+
+
+def common_terms(terms, using='default') -> set:
+    """Return those of the given terms which are too common to follow, see `load_neighbourhood`."""
+
+    total = GuideTerms.objects.using(using).count()
+    cutoff = max(COMMON_TERM_MIN_GUIDES, total * COMMON_TERM_FREQUENCY)
+    common = set()
+    for batch in batches(terms):
+        rows = TermFrequency.objects.using(using).filter(term__in=batch, guide_count__gt=cutoff)
+        common.update(rows.values_list('term', flat=True))
+    return common
+
+
+def load_neighbourhood(guide_ids, using='default') -> SimilarityIndex:
+    """Load the vectors of the given guides and of all guides sharing an uncommon term."""
+
+    terms = set()
+    for batch in batches(guide_ids):
+        rows = TermPosting.objects.using(using).filter(guide_id__in=batch)
+        terms.update(rows.values_list('term', flat=True))
+    terms -= common_terms(terms, using)
+    sharing_ids = set(guide_ids)
+    for batch in batches(terms):
+        rows = TermPosting.objects.using(using).filter(term__in=batch)
+        sharing_ids.update(rows.values_list('guide_id', flat=True))
+    return load_index(sharing_ids, using)
+
+
+def load_neighbours(guide_ids, using='default') -> dict:
+    """Return the stored `(score, guide_id)` pairs of the given guides, best first."""
+
+    neighbours = defaultdict(list)
+    for batch in batches(guide_ids):
+        rows = RelatedGuide.objects.using(using).filter(guide_id__in=batch)
+        for guide_id, related_id, score in rows.order_by('guide_id', 'rank').values_list(
+            'guide_id', 'related_id', 'score'
+        ):
+            neighbours[guide_id].append((score, related_id))
+    return neighbours
+
+
+def update_postings(guide_id, previous_terms, terms, using='default'):
+    """Replace the postings of a guide, and count the guides with every term."""
+
+    added, removed = set(terms) - set(previous_terms), set(previous_terms) - set(terms)
+    for batch in batches(removed):
+        TermPosting.objects.using(using).filter(guide_id=guide_id, term__in=batch).delete()
+        TermFrequency.objects.using(using).filter(term__in=batch).update(
+            guide_count=F('guide_count') - 1
+        )
+    TermPosting.objects.using(using).bulk_create(
+        (TermPosting(term=term, guide_id=guide_id) for term in added),
+        batch_size=LOOKUP_BATCH_SIZE
+    )
+    for batch in batches(added):
+        existing = set(
+            TermFrequency.objects.using(using).filter(term__in=batch)
+            .values_list('term', flat=True)
+        )
+        new = [term for term in batch if term not in existing]
+        try:
+            with transaction.atomic(using=using):
+                TermFrequency.objects.using(using).bulk_create(
+                    TermFrequency(term=term) for term in new
+                )
+        except IntegrityError:
+            # Some of the terms were counted by a concurrent save.
+            for term in new:
+                TermFrequency.objects.using(using).get_or_create(term=term)
+        TermFrequency.objects.using(using).filter(term__in=batch).update(
+            guide_count=F('guide_count') + 1
+        )
+
+
+def store_neighbours(neighbours_by_guide: dict, using='default'):
+    """Replace the related guides of the given guides."""
+
+    if not neighbours_by_guide:
+        return
+    RelatedGuide.objects.using(using).filter(guide_id__in=neighbours_by_guide).delete()
+    RelatedGuide.objects.using(using).bulk_create(
+        RelatedGuide(guide_id=guide_id, related_id=related_id, rank=rank, score=score)
+        for guide_id, neighbours in neighbours_by_guide.items()
+        for rank, (score, related_id) in enumerate(neighbours)
+    )
+    for guide_id in neighbours_by_guide:
+        pagecache.invalidate_guide(guide_id)
+    httpcache.purge(httpcache.guide_key(guide_id) for guide_id in neighbours_by_guide)
+
+
+def update_guide(guide, using='default'):
+    """Store the terms of a saved guide and update the related guides affected by it."""
+
+    counts = term_counts(guide.title, guide.overview, guide.content.raw)
+    with transaction.atomic(using=using):
+        previous_terms = list(
+            TermPosting.objects.using(using).filter(guide_id=guide.id)
+            .values_list('term', flat=True)
+        )
+        GuideTerms.objects.using(using).update_or_create(
+            guide_id=guide.id, defaults={'counts': json.dumps(counts)}
+        )
+        update_postings(guide.id, previous_terms, counts, using)
+
+        # Only guides sharing a term with the guide, or listing it before, are affected.
+        index = load_neighbourhood([guide.id], using)
+        listing_ids = RelatedGuide.objects.using(using).filter(related_id=guide.id).values_list(
+            'guide_id', flat=True
+        )
+        affected_ids = (set(index.vectors) | set(listing_ids)) - {guide.id}
+        stored = load_neighbours(affected_ids, using)
+
+        scores = index.scores(guide.id)
+        changed = {guide.id: index.neighbours(guide.id, scores)}
+        dropped_ids = []
+        for other_id in affected_ids:
+            score = scores.get(other_id, 0.0)
+            neighbours = stored.get(other_id, [])
+            listed = any(related_id == guide.id for _, related_id in neighbours)
+            lowest = neighbours[-1][0] if len(neighbours) == RELATED_GUIDES else MIN_SCORE
+
+            if listed and score < lowest:
+                # The guide may drop out in favour of a guide not listed yet.
+                dropped_ids.append(other_id)
+            elif listed or score >= lowest:
+                candidates = {related_id: s for s, related_id in neighbours}
+                candidates[guide.id] = score
+                changed[other_id] = top_neighbours(candidates)
+        if dropped_ids:
+            dropped_index = load_neighbourhood(dropped_ids, using)
+            changed.update(
+                (other_id, dropped_index.neighbours(other_id))
+                for other_id in dropped_ids if other_id in dropped_index.vectors
+            )
+        store_neighbours(changed, using)
+
+
+def refill_guides(guide_ids, using='default'):
+    """Recompute the related guides of the given guides, for example after a guide was deleted."""
+
+    guide_ids = set(guide_ids)
+    if not guide_ids:
+        return
+    with transaction.atomic(using=using):
+        index = load_neighbourhood(guide_ids, using)
+        store_neighbours(
+            {
+                guide_id: index.neighbours(guide_id)
+                for guide_id in guide_ids if guide_id in index.vectors
+            },
+            using
+        )
+
+
+def remove_guide(guide, using='default'):
+    """Subtract a guide which is about to be deleted from the counts of its terms."""
+
+    terms = TermPosting.objects.using(using).filter(guide=guide).values_list('term', flat=True)
+    for batch in batches(terms):
+        TermFrequency.objects.using(using).filter(term__in=batch).update(
+            guide_count=F('guide_count') - 1
+        )
+
+
+def rebuild(using='default') -> int:
+    """Recompute the terms and related guides of all guides from scratch."""
+
+    guides = Guide.objects.using(using).values_list('id', 'title', 'overview', 'content')
+    counts_by_guide = {
+        guide_id: term_counts(title, overview, content)
+        for guide_id, title, overview, content in guides.iterator()
+    }
+    index = SimilarityIndex(counts_by_guide)
+    frequencies = Counter()
+    for counts in counts_by_guide.values():
+        frequencies.update(counts.keys())
+    with transaction.atomic(using=using):
+        GuideTerms.objects.using(using).all().delete()
+        GuideTerms.objects.using(using).bulk_create(
+            GuideTerms(guide_id=guide_id, counts=json.dumps(counts))
+            for guide_id, counts in counts_by_guide.items()
+        )
+        TermPosting.objects.using(using).all().delete()
+        TermPosting.objects.using(using).bulk_create(
+            (
+                TermPosting(term=term, guide_id=guide_id)
+                for guide_id, counts in counts_by_guide.items() for term in counts
+            ),
+            batch_size=LOOKUP_BATCH_SIZE
+        )
+        TermFrequency.objects.using(using).all().delete()
+        TermFrequency.objects.using(using).bulk_create(
+            (TermFrequency(term=term, guide_count=count) for term, count in frequencies.items()),
+            batch_size=LOOKUP_BATCH_SIZE
+        )
+        RelatedGuide.objects.using(using).all().delete()
+        store_neighbours(
+            {guide_id: index.neighbours(guide_id) for guide_id in counts_by_guide}, using
+        )
+    pagecache.invalidate_all()
+    httpcache.purge([httpcache.ALL_GUIDES_KEY])
+    return len(counts_by_guide)
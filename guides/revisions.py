@@ -0,0 +1,139 @@
+"""
+Revision history of guides, stored as compressed deltas.
+
+Every time a guide is created or edited, a `GuideRevision` is recorded.
+Most revisions only store the lines that changed since the previous
+revision, so the history grows with the size of the edits rather than
+the size of the guide. Every `SNAPSHOT_INTERVAL` revisions, the full
+content is stored instead, which bounds the number of deltas applied
+to reconstruct any revision. The latest content is always the guide's
+own `content`, so reading it costs nothing extra.
+
+Both snapshots and deltas are compressed with zlib. A delta is a JSON
+list of operations turning the lines of the previous content into the
+lines of the new one: `[start, end]` copies the previous lines in that
+range, and a list of strings inserts new lines.
+"""
+
+import difflib
+import json
+import zlib
+
+from django.db import transaction
+
+from .models import GuideRevision
+
+
+# Every this many revisions, the full content is stored instead of a delta.
+SNAPSHOT_INTERVAL = 10
+
+
+def compress_snapshot(content: str) -> bytes:
+    return zlib.compress(content.encode('utf-8'))
+
+
+def compress_delta(delta: list) -> bytes:
+    return zlib.compress(json.dumps(delta, separators=(',', ':')).encode('utf-8'))
+
+
+def make_delta(old: str, new: str) -> list:
+    """Return the operations turning `old` into `new`."""
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            delta.append(new_lines[j1:j2])
+    return delta
+
+
+def apply_delta(old: str, delta: list) -> str:
+    """Apply operations created by `make_delta` to `old`."""
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = []
+    for operation in delta:
+        if operation and isinstance(operation[0], int):
+            start, end = operation
+            new_lines.extend(old_lines[start:end])
+        else:
+            new_lines.extend(operation)
+    return ''.join(new_lines)
+
+
+def reconstruct(revisions) -> str:
+    """
+    Return the content of the last of the given revisions, which are
+    sorted by number and start with a snapshot.
+    """
+
+    content = None
+    for revision in revisions:
+        data = zlib.decompress(bytes(revision.data)).decode('utf-8')
+        if revision.is_snapshot:
+            content = data
+        else:
+            content = apply_delta(content, json.loads(data))
+    return content
+
+
+def revision_chain(guide_id, number=None) -> list:
+    """
+    Fetch the revisions needed to reconstruct the given revision,
+    or the latest one, in a single query, sorted by number.
+    """
+
+    revisions = GuideRevision.objects.filter(guide_id=guide_id)
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    # A snapshot is taken at least every `SNAPSHOT_INTERVAL` revisions.
+    chain = list(revisions.order_by('-number')[:SNAPSHOT_INTERVAL])
+    for index, revision in enumerate(chain):
+        if revision.is_snapshot:
+            return chain[index::-1]
+    return []
+
+
+def revision_content(revision) -> str:
+    """Return the full content of the given revision."""
+
+    return reconstruct(revision_chain(revision.guide_id, revision.number))
+
+
+def record_revision(guide, editor=None):
+    """
+    Record the current version of the given guide as a new revision.
+
+    Returns the new revision, or `None` if nothing changed since
+    the latest revision.
+    """
+
+    content = guide.content.raw
+    with transaction.atomic():
+        chain = revision_chain(guide.id)
+        if chain:
+            latest = chain[-1]
+            previous = reconstruct(chain)
+            if (latest.title, latest.overview, previous) == (guide.title, guide.overview, content):
+                return None
+            number = latest.number + 1
+        else:
+            number = 1
+
+        is_snapshot = (number - 1) % SNAPSHOT_INTERVAL == 0
+        return GuideRevision.objects.create(
+            guide=guide,
+            number=number,
+            editor=editor,
+            title=guide.title,
+            overview=guide.overview,
+            is_snapshot=is_snapshot,
+            data=(
+                compress_snapshot(content) if is_snapshot
+                else compress_delta(make_delta(previous, content))
+            ),
+        )
@@ -0,0 +1,375 @@
+"""
+Full-text search over the title, overview and raw markdown content of guides.
+
+The search index lives next to the `guides_guide` table and is kept in sync
+by the signal handlers in `guides.signals`. On SQLite, it is an FTS5 virtual
+table ranked with BM25. On PostgreSQL, it is a table of weighted `tsvector`s
+covered by a GIN index and ranked with `ts_rank`. Any other database falls
+back to a plain (unindexed) `icontains` lookup.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Guide
+from .pagination import InvalidCursor
+
+
+# Only this many words of a search term are used for the query.
+MAX_SEARCH_TOKENS = 8
+
+# Matched words in snippets are wrapped in these private use characters
+# by the database. They are swapped for `<mark>` tags after the snippet
+# was escaped, as the raw markdown may contain arbitrary HTML.
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(term: str) -> list:
+    """Split a user-supplied search term into plain lowercase words."""
+
+    return TOKEN_PATTERN.findall(term.lower())[:MAX_SEARCH_TOKENS]
+
+
+def highlight(snippet: str) -> str:
+    """Escape a snippet returned by the database and mark up matched words."""
+
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+class SQLiteBackend:
+    """Searches through an FTS5 virtual table whose `rowid` is the guide ID."""
+
+    table = 'guides_guide_fts'
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            "USING fts5(title, overview, content, tokenize='porter unicode61')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def rebuild(self, cursor):
+        cursor.execute(f"DELETE FROM {self.table}")
+        cursor.execute(
+            f"INSERT INTO {self.table} (rowid, title, overview, content) "
+            "SELECT id, title, overview, content FROM guides_guide"
+        )
+
+    def index(self, cursor, guide):
+        # FTS5 tables have no upsert, replacing the row has the same effect.
+        self.remove(cursor, guide.id)
+        cursor.execute(
+            f"INSERT INTO {self.table} (rowid, title, overview, content) VALUES (%s, %s, %s, %s)",
+            [guide.id, guide.title, guide.overview, guide.content.raw]
+        )
+
+    def index_new(self, cursor, guides):
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, title, overview, content) VALUES (%s, %s, %s, %s)",
+            [(guide.id, guide.title, guide.overview, guide.content.raw) for guide in guides]
+        )
+
+    def remove(self, cursor, guide_id):
+        cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [guide_id])
+
+    @staticmethod
+    def build_query(tokens):
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def count(self, cursor, tokens):
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s",
+            [self.build_query(tokens)]
+        )
+        return cursor.fetchone()[0]
+
+    def search(self, cursor, tokens, limit, after=None, before=None):
+        # Matches in the title weigh more than matches in the overview,
+        # which in turn weigh more than matches in the content. BM25 scores
+        # better matches lower, ties are broken by showing newer guides first.
+        # The page of IDs is selected first, so snippets are only built for it.
+        rank = f"bm25({self.table}, 10.0, 5.0, 1.0)"
+        condition, order, params = '', 'score, rowid DESC', []
+        if after is not None:
+            condition = 'WHERE score > %s OR (score = %s AND rowid < %s)'
+            params = [after[0], after[0], after[1]]
+        elif before is not None:
+            condition = 'WHERE score < %s OR (score = %s AND rowid > %s)'
+            order = 'score DESC, rowid'
+            params = [before[0], before[0], before[1]]
+
+        query = self.build_query(tokens)
+        cursor.execute(
+            f"SELECT rowid, snippet({self.table}, -1, %s, %s, '…', 24), {rank} "
+            f"FROM {self.table} WHERE {self.table} MATCH %s AND rowid IN ("
+            f"SELECT rowid FROM (SELECT rowid, {rank} AS score "
+            f"FROM {self.table} WHERE {self.table} MATCH %s) "
+            f"{condition} ORDER BY {order} LIMIT %s"
+            f") ORDER BY {rank}, rowid DESC",
+            [HIGHLIGHT_START, HIGHLIGHT_END, query, query, *params, limit]
+        )
+        return cursor.fetchall()
+
+
+class PostgreSQLBackend:
+    """Searches through a table of weighted `tsvector`s with a GIN index."""
+
+    table = 'guides_guide_search'
+    document = (
+        "setweight(to_tsvector('english', {title}), 'A') || "
+        "setweight(to_tsvector('english', {overview}), 'B') || "
+        "setweight(to_tsvector('english', {content}), 'C')"
+    )
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "guide_id integer PRIMARY KEY REFERENCES guides_guide (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_document_idx "
+            f"ON {self.table} USING GIN (document)"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def rebuild(self, cursor):
+        document = self.document.format(title='title', overview='overview', content='content')
+        cursor.execute(f"DELETE FROM {self.table}")
+        cursor.execute(
+            f"INSERT INTO {self.table} (guide_id, document) "
+            f"SELECT id, {document} FROM guides_guide"
+        )
+
+    def index(self, cursor, guide):
+        document = self.document.format(title='%s', overview='%s', content='%s')
+        cursor.execute(
+            f"INSERT INTO {self.table} (guide_id, document) VALUES (%s, {document}) "
+            "ON CONFLICT (guide_id) DO UPDATE SET document = EXCLUDED.document",
+            [guide.id, guide.title, guide.overview, guide.content.raw]
+        )
+
+    def index_new(self, cursor, guides):
+        document = self.document.format(title='%s', overview='%s', content='%s')
+        cursor.executemany(
+            f"INSERT INTO {self.table} (guide_id, document) VALUES (%s, {document})",
+            [(guide.id, guide.title, guide.overview, guide.content.raw) for guide in guides]
+        )
+
+    def remove(self, cursor, guide_id):
+        cursor.execute(f"DELETE FROM {self.table} WHERE guide_id = %s", [guide_id])
+
+    @staticmethod
+    def build_query(tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def count(self, cursor, tokens):
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {self.table} "
+            "WHERE document @@ to_tsquery('english', %s)",
+            [self.build_query(tokens)]
+        )
+        return cursor.fetchone()[0]
+
+    def search(self, cursor, tokens, limit, after=None, before=None):
+        # The ranked page of IDs is selected first so that the comparatively
+        # expensive `ts_headline` only runs for the guides that are returned.
+        # Ranks are compared as `real`, the type returned by `ts_rank`.
+        rank = "ts_rank(document, query)"
+        condition, order, params = '', 'rank DESC, guide_id DESC', []
+        if after is not None:
+            condition = f"AND ({rank} < %s::real OR ({rank} = %s::real AND guide_id < %s))"
+            params = [after[0], after[0], after[1]]
+        elif before is not None:
+            condition = f"AND ({rank} > %s::real OR ({rank} = %s::real AND guide_id > %s))"
+            order = 'rank, guide_id'
+            params = [before[0], before[0], before[1]]
+
+        cursor.execute(
+            "SELECT guide.id, ts_headline("
+            "'english', guide.overview || ' ' || guide.content, query, %s), hit.rank "
+            "FROM ("
+            f"SELECT guide_id, {rank} AS rank FROM {self.table}, "
+            f"to_tsquery('english', %s) query WHERE document @@ query {condition} "
+            f"ORDER BY {order} LIMIT %s"
+            ") hit "
+            "JOIN guides_guide guide ON guide.id = hit.guide_id, "
+            "to_tsquery('english', %s) query "
+            "ORDER BY hit.rank DESC, hit.guide_id DESC",
+            [
+                f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8',
+                self.build_query(tokens), *params, limit, self.build_query(tokens)
+            ]
+        )
+        return cursor.fetchall()
+
+
+class FallbackBackend:
+    """Unindexed substring search for databases without a full-text search backend."""
+
+    def create(self, cursor):
+        pass
+
+    def drop(self, cursor):
+        pass
+
+    def rebuild(self, cursor):
+        pass
+
+    def index(self, cursor, guide):
+        pass
+
+    def index_new(self, cursor, guides):
+        pass
+
+    def remove(self, cursor, guide_id):
+        pass
+
+    @staticmethod
+    def build_query(tokens):
+        query = Q()
+        for token in tokens:
+            query &= Q(title__icontains=token) | Q(overview__icontains=token)
+        return Guide.objects.filter(query)
+
+    def count(self, cursor, tokens):
+        return self.build_query(tokens).count()
+
+    def search(self, cursor, tokens, limit, after=None, before=None):
+        # Without a ranking, all matches rank equally and newer guides come first.
+        guides = self.build_query(tokens)
+        if before is not None:
+            guides = list(guides.filter(id__gt=before[1]).order_by('id')[:limit])[::-1]
+        elif after is not None:
+            guides = guides.filter(id__lt=after[1]).order_by('-id')[:limit]
+        else:
+            guides = guides.order_by('-id')[:limit]
+        return [(guide.id, guide.overview, 0) for guide in guides]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgreSQLBackend(),
+}
+
+
+def get_backend(connection):
+    """Return the search backend used for the given database connection."""
+
+    return BACKENDS.get(connection.vendor, FallbackBackend())
+
+
+def index_guide(guide, using='default'):
+    """Add the given guide to the search index, or update its entry."""
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        get_backend(connection).index(cursor, guide)
+
+
+def index_new_guides(guides, using='default'):
+    """Add the given guides, which are not indexed yet, to the search index at once."""
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        get_backend(connection).index_new(cursor, guides)
+
+
+def remove_guide(guide_id, using='default'):
+    """Remove the guide with the given ID from the search index."""
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        get_backend(connection).remove(cursor, guide_id)
+
+
+def rebuild_index(using='default'):
+    """Recreate the search index from scratch from the contents of the guides table."""
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        backend = get_backend(connection)
+        backend.create(cursor)
+        backend.rebuild(cursor)
+
+
+class SearchResults:
+    """
+    The ranked guides matching a search term.
+
+    Results are paginated by `KeysetPaginator`: every page is selected
+    with a single indexed query starting behind the rank and ID of the
+    last guide of the previous page. Every returned guide carries a
+    highlighted `search_snippet` of the text surrounding the match.
+    """
+
+    model = Guide
+    ordering = ('rank', '-id')
+
+    def __init__(self, term: str, using='default'):
+        self.tokens = tokenize(term)
+        self.connection = connections[using]
+        self.backend = get_backend(self.connection)
+        self._count = None
+
+    def count(self):
+        """Return the exact number of matching guides, which is not needed for paginating."""
+
+        if self._count is None:
+            if not self.tokens:
+                self._count = 0
+            else:
+                with self.connection.cursor() as cursor:
+                    self._count = self.backend.count(cursor, self.tokens)
+        return self._count
+
+    def position(self, guide) -> tuple:
+        return (guide.search_rank, guide.id)
+
+    @staticmethod
+    def validate(position):
+        if position is None:
+            return
+        rank, guide_id = position
+        if (
+            isinstance(rank, bool) or not isinstance(rank, (int, float))
+            or isinstance(guide_id, bool) or not isinstance(guide_id, int)
+        ):
+            raise InvalidCursor("The cursor does not match the search results.")
+
+    def seek(self, limit: int, after=None, before=None) -> list:
+        """Return up to `limit` guides ranked behind `after`, or ahead of `before`."""
+
+        self.validate(after)
+        self.validate(before)
+        if not self.tokens or limit <= 0:
+            return []
+
+        with self.connection.cursor() as cursor:
+            hits = self.backend.search(cursor, self.tokens, limit, after=after, before=before)
+        guides = Guide.objects.for_listing().in_bulk([guide_id for guide_id, _, _ in hits])
+
+        results = []
+        for guide_id, snippet, rank in hits:
+            guide = guides.get(guide_id)
+            if guide is not None:
+                guide.search_snippet = highlight(snippet)
+                guide.search_rank = rank
+                results.append(guide)
+        return results
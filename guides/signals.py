@@ -1,8 +1,18 @@
-from django.db.models.signals import post_save
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
 from guardian.shortcuts import assign_perm
 
-from .models import Guide
+from website import sitemaps, snapshots
+from . import (
+    autocomplete, feeds, httpcache, outline, pagecache, related, search, tags, viewcounts
+)
+from .models import Guide, RelatedGuide
 
 
 @receiver(post_save, sender=Guide)
@@ -10,9 +20,156 @@ def guide_post_save(sender, instance, created, **kwargs):
     """Called when a guide is saved.
 
     Gives the guide author the necessary permissions
-    to change the guide and delete the guide.
+    to change the guide and delete the guide,
+    stores the outline of its content,
+    updates the guide's entry in the search and title indexes
+    and the guides related to it,
+    and discards the cached guide feeds, pages and sitemaps
+    once the change is committed, including those kept by reverse proxies.
     """
 
     if created:
         assign_perm('change_guide', instance.author, instance)
         assign_perm('delete_guide', instance.author, instance)
+
+    outline.update_outline(instance, using=kwargs.get('using', 'default'))
+    search.index_guide(instance, using=kwargs.get('using', 'default'))
+    autocomplete.update_title(instance.id, instance.title, using=kwargs.get('using', 'default'))
+    related.update_guide(instance, using=kwargs.get('using', 'default'))
+    transaction.on_commit(
+        lambda: discard_cached_pages(instance.id), using=kwargs.get('using', 'default')
+    )
+    # A new guide shifts every list of guides, while changes
+    # only affect the lists already showing the guide.
+    httpcache.purge(
+        [httpcache.guide_key(instance.id)] + ([httpcache.GUIDE_LIST_KEY] if created else [])
+    )
+
+
+@receiver(pre_delete, sender=Guide)
+def guide_pre_delete(sender, instance, **kwargs):
+    """Called before a guide is deleted.
+
+    Remembers which guides list the guide as related,
+    as these rows are deleted along with the guide,
+    and subtracts the guide from the counts of its tags and terms.
+    """
+
+    instance.related_by_ids = list(
+        RelatedGuide.objects.using(kwargs.get('using', 'default'))
+        .filter(related=instance)
+        .values_list('guide_id', flat=True)
+    )
+    tags.remove_guide(instance, using=kwargs.get('using', 'default'))
+    related.remove_guide(instance, using=kwargs.get('using', 'default'))
+
+
+@receiver(post_delete, sender=Guide)
+def guide_post_delete(sender, instance, **kwargs):
+    """Called when a guide is deleted.
+
+    Removes the guide from the search and title indexes,
+    finds new related guides for the guides that listed it,
+    and discards the cached guide feeds, pages and sitemaps
+    once the change is committed, including those kept by reverse proxies.
+    """
+
+    search.remove_guide(instance.id, using=kwargs.get('using', 'default'))
+    autocomplete.update_title(instance.id, using=kwargs.get('using', 'default'))
+    related.refill_guides(
+        getattr(instance, 'related_by_ids', ()), using=kwargs.get('using', 'default')
+    )
+    transaction.on_commit(
+        lambda: discard_cached_pages(instance.id), using=kwargs.get('using', 'default')
+    )
+    httpcache.purge([httpcache.guide_key(instance.id), httpcache.GUIDE_LIST_KEY])
+
+
+def discard_cached_pages(guide_id):
+    """
+    Discard the cached feeds, sitemaps and pages of a guide.
+
+    Called once a change to the guide is committed, as a request rendering
+    them before would cache the previous guide under the new versions.
+    """
+
+    feeds.invalidate_feeds()
+    pagecache.invalidate_guide(guide_id)
+    sitemaps.invalidate_sitemaps()
+
+
+@receiver(post_save, sender=UserObjectPermission)
+@receiver(post_delete, sender=UserObjectPermission)
+@receiver(post_save, sender=GroupObjectPermission)
+@receiver(post_delete, sender=GroupObjectPermission)
+def object_permission_changed(sender, instance, **kwargs):
+    """Called when an object permission is granted or revoked.
+
+    Discards the cached pages of the guide it applies to, if any.
+    """
+
+    if instance.content_type_id == ContentType.objects.get_for_model(Guide).id:
+        pagecache.invalidate_guide(instance.object_pk)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def global_permissions_changed(sender, action, **kwargs):
+    """Called when the global permissions of a user or group change.
+
+    Discards the cached pages of all guides.
+    """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        pagecache.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=SocialAccount)
+@receiver(post_delete, sender=SocialAccount)
+def author_changed(sender, instance, **kwargs):
+    """Called when a user or their Discord account changes.
+
+    Discards the cached pages of all guides written by the user,
+    including those kept by reverse proxies, and the cached feeds,
+    as these show the author's name and link to their profile.
+    Updates only touching the last login date are ignored.
+    """
+
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+
+    user_id = instance.id if sender is User else instance.user_id
+    guide_ids = list(Guide.objects.filter(author_id=user_id).values_list('id', flat=True))
+    for guide_id in guide_ids:
+        pagecache.invalidate_guide(guide_id)
+    if guide_ids:
+        feeds.invalidate_feeds()
+    httpcache.purge(httpcache.guide_key(guide_id) for guide_id in guide_ids)
+
+
+@receiver(httpcache.purge_requested)
+def guide_pages_purged(sender, keys, **kwargs):
+    """Called when pages showing guides are purged from reverse proxies.
+
+    Deletes the static snapshots of these pages, if snapshots are enabled,
+    to write them again once the response was sent.
+    """
+
+    if snapshots.is_enabled():
+        snapshots.regenerator.mark_stale(snapshots.paths_for_keys(keys))
+
+
+@receiver(request_finished)
+def request_finished_handler(sender, **kwargs):
+    """Called when a response was sent.
+
+    Stores the guide views counted by this process, if they are due,
+    and writes the static snapshots of changed pages again,
+    unless too many pages changed at once.
+    """
+
+    viewcounts.counter.flush_if_due()
+    if snapshots.is_enabled():
+        snapshots.regenerator.regenerate(limit=snapshots.MAX_REGENERATED_PAGES)
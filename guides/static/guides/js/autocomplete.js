@@ -0,0 +1,39 @@
+// Suggests guide titles below the search box while typing.
+(function () {
+  var input = document.getElementById('search-term');
+  var titles = document.getElementById('search-titles');
+  var pending = null;
+  var timeout = null;
+
+  function suggest() {
+    var term = input.value.trim();
+    if (pending) {
+      pending.abort();
+    }
+    if (!term) {
+      titles.innerHTML = '';
+      return;
+    }
+
+    pending = new XMLHttpRequest();
+    pending.open('GET', input.dataset.autocompleteUrl + '?term=' + encodeURIComponent(term));
+    pending.responseType = 'json';
+    pending.onload = function () {
+      if (this.status !== 200 || !this.response) {
+        return;
+      }
+      titles.innerHTML = '';
+      this.response.results.forEach(function (result) {
+        var option = document.createElement('option');
+        option.value = result.title;
+        titles.appendChild(option);
+      });
+    };
+    pending.send();
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(timeout);
+    timeout = setTimeout(suggest, 100);
+  });
+})();
@@ -0,0 +1,35 @@
+// Renders the guide content below the form while typing.
+(function () {
+  var content = document.getElementById('id_content');
+  var output = document.getElementById('content-preview');
+  var token = document.querySelector('input[name="csrfmiddlewaretoken"]');
+  var pending = null;
+  var timeout = null;
+
+  function render() {
+    if (pending) {
+      pending.abort();
+    }
+
+    var data = new FormData();
+    data.append('content', content.value);
+    pending = new XMLHttpRequest();
+    pending.open('POST', content.dataset.previewUrl);
+    pending.setRequestHeader('X-CSRFToken', token.value);
+    pending.responseType = 'json';
+    pending.onload = function () {
+      if (this.status !== 200 || !this.response) {
+        return;
+      }
+      // The HTML is sanitized by the server.
+      output.innerHTML = this.response.html;
+    };
+    pending.send(data);
+  }
+
+  content.addEventListener('input', function () {
+    clearTimeout(timeout);
+    timeout = setTimeout(render, 300);
+  });
+  render();
+})();
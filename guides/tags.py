@@ -0,0 +1,156 @@
+"""
+Tags of guides, and the number of guides with every tag.
+
+Tags are matched by their slug, so "Python" and "python" are the same
+tag, which keeps the spelling it was first used with. Every tag stores
+the number of guides tagged with it in `guide_count`, which is updated
+whenever the tags of a guide change or a tagged guide is deleted. The
+most used tags are listed with their counts, as facets of the guide
+list, by a single query on an index of these counts, which is cached
+until the next change.
+"""
+
+import re
+import uuid
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from . import feeds, httpcache, pagecache
+from .models import GuideTag, Tag
+
+
+# The maximum number of tags of a guide.
+MAX_TAGS = 5
+
+# The number of most used tags listed as facets.
+FACET_TAGS = 20
+
+FACETS_CACHE_VERSION_KEY = 'guides:tags:version'
+
+# Slugify drops these characters, which tell languages like C, C++ and C# apart.
+SLUG_REPLACEMENTS = (('++', 'pp'), ('+', 'plus'), ('#', 'sharp'))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def tag_slug(name: str) -> str:
+    slug = name.lower()
+    for character, replacement in SLUG_REPLACEMENTS:
+        slug = slug.replace(character, replacement)
+    return slugify(slug)
+
+
+def parse_tags(text: str) -> list:
+    """Split comma separated tag names, dropping empty names and repeated tags."""
+
+    names = {}
+    for name in text.split(','):
+        name = WHITESPACE_PATTERN.sub(' ', name).strip()
+        slug = tag_slug(name)
+        if slug and slug not in names:
+            names[slug] = name
+    return list(names.values())
+
+
+def tag_key(tag_id) -> str:
+    """Return the surrogate key of the lists of guides with the given tag."""
+
+    return f'tag-{tag_id}'
+
+
+def invalidate_facets():
+    cache.set(FACETS_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_or_create_tags(names, using='default') -> list:
+    tags = {tag.slug: tag for tag in Tag.objects.using(using).filter(
+        slug__in=[tag_slug(name) for name in names]
+    )}
+    for name in names:
+        slug = tag_slug(name)
+        if slug not in tags:
+            try:
+                with transaction.atomic(using=using):
+                    tags[slug] = Tag.objects.using(using).create(name=name, slug=slug)
+            except IntegrityError:
+                # Created by a concurrent request, or named like another tag with a different slug.
+                tags[slug] = Tag.objects.using(using).get(slug=slug)
+    return [tags[tag_slug(name)] for name in names]
+
+
+def set_tags(guide, names, using='default'):
+    """Replace the tags of a saved guide with the tags of the given names."""
+
+    with transaction.atomic(using=using):
+        tag_ids = {tag.id for tag in get_or_create_tags(names, using)}
+        current = set(
+            GuideTag.objects.using(using).filter(guide=guide).values_list('tag_id', flat=True)
+        )
+        added, removed = tag_ids - current, current - tag_ids
+        if not added and not removed:
+            return
+
+        GuideTag.objects.using(using).filter(guide=guide, tag_id__in=removed).delete()
+        GuideTag.objects.using(using).bulk_create(
+            GuideTag(guide=guide, tag_id=tag_id, pub_datetime=guide.pub_datetime)
+            for tag_id in added
+        )
+        Tag.objects.using(using).filter(id__in=added).update(guide_count=F('guide_count') + 1)
+        Tag.objects.using(using).filter(id__in=removed).update(guide_count=F('guide_count') - 1)
+    transaction.on_commit(lambda: discard_cached_pages(guide.id), using=using)
+    # Every list of guides shows the facet counts.
+    httpcache.purge(
+        [httpcache.guide_key(guide.id), httpcache.GUIDE_LIST_KEY]
+        + [tag_key(tag_id) for tag_id in added | removed]
+    )
+
+
+def discard_cached_pages(guide_id):
+    """Discard the cached facets, feeds and page of a guide whose tags changed, once committed."""
+
+    invalidate_facets()
+    feeds.invalidate_feeds()
+    pagecache.invalidate_guide(guide_id)
+
+
+def remove_guide(guide, using='default'):
+    """Subtract a guide which is about to be deleted from the counts of its tags."""
+
+    tag_ids = list(
+        GuideTag.objects.using(using).filter(guide=guide).values_list('tag_id', flat=True)
+    )
+    if tag_ids:
+        Tag.objects.using(using).filter(id__in=tag_ids).update(guide_count=F('guide_count') - 1)
+        transaction.on_commit(invalidate_facets, using=using)
+
+
+def recount_guides(tag_ids, using='default'):
+    """Count the guides with the given tags again, for example after guides were imported."""
+
+    counts = (
+        GuideTag.objects.using(using).filter(tag=OuterRef('pk'))
+        .order_by().values('tag').annotate(count=Count('*')).values('count')
+    )
+    Tag.objects.using(using).filter(id__in=tag_ids).update(
+        guide_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+def facets() -> list:
+    """Return the most used tags, along with the number of guides with each of them."""
+
+    version = cache.get_or_set(FACETS_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    key = f'guides:tags:{version}:facets'
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(
+            Tag.objects.filter(guide_count__gt=0)
+            .order_by('-guide_count', 'name')
+            .only('name', 'slug', 'guide_count')[:FACET_TAGS]
+        )
+        cache.set(key, tags, None)
+    return tags
@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from guides import autocomplete
+from guides.models import Guide
+
+
+class TitleIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = autocomplete.TitleIndex()
+        self.index.load([
+            (1, "Python decorators"),
+            (2, "Decorating Flask routes"),
+            (3, "Getting started with Rust"),
+        ])
+
+    def test_completes_prefix_of_any_word(self):
+        self.assertEqual(
+            self.index.complete("deco"), [(2, "Decorating Flask routes"), (1, "Python decorators")]
+        )
+        self.assertEqual(self.index.complete("ru"), [(3, "Getting started with Rust")])
+
+    def test_titles_starting_with_term_come_first(self):
+        self.assertEqual(
+            self.index.complete("python deco"), [(1, "Python decorators")]
+        )
+        self.assertEqual(self.index.complete("dec")[0], (2, "Decorating Flask routes"))
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.index.complete("flask deco"), [(2, "Decorating Flask routes")])
+        self.assertEqual(self.index.complete("rust deco"), [])
+
+    def test_add_replaces_title(self):
+        self.index.add(1, "Rust macros")
+        self.assertEqual(self.index.complete("deco"), [(2, "Decorating Flask routes")])
+        self.assertEqual(self.index.complete("mac"), [(1, "Rust macros")])
+
+    def test_remove(self):
+        self.index.remove(2)
+        self.index.remove(42)
+        self.assertEqual(self.index.complete("deco"), [(1, "Python decorators")])
+        self.assertEqual(len(self.index), 2)
+
+    def test_limit_and_empty_terms(self):
+        self.assertEqual(len(self.index.complete("deco", limit=1)), 1)
+        self.assertEqual(self.index.complete(""), [])
+        self.assertEqual(self.index.complete("!?"), [])
+
+
+class AutocompleteViewTests(TransactionTestCase):
+    """
+    Scenario:
+        - 2 existing Guides
+        - Anonymous user types into the search box
+        - Guides are created, renamed and deleted in between
+    """
+
+    multi_db = True
+    # The groups created by migrations are kept.
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('testauthor', password='testpass')
+        for title in ("Python decorators", "Decorating Flask routes"):
+            Guide.objects.create(
+                title=title,
+                overview="test overview",
+                content="test guide content",
+                author=self.author
+            )
+
+    def complete(self, term):
+        resp = self.client.get(reverse("guides:autocomplete"), {'term': term})
+        self.assertEqual(resp.status_code, 200)
+        return [result['title'] for result in resp.json()['results']]
+
+    def test_results_link_to_guides(self):
+        guide = Guide.objects.get(title="Python decorators")
+        resp = self.client.get(reverse("guides:autocomplete"), {'term': "pyth"})
+        self.assertEqual(resp.json(), {'results': [{
+            'id': guide.id,
+            'title': "Python decorators",
+            'url': reverse("guides:detail", kwargs={"pk": guide.id}),
+        }]})
+
+    def test_completion_does_not_query_database(self):
+        self.complete("deco")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.complete("decor"), ["Decorating Flask routes", "Python decorators"]
+            )
+
+    def test_guide_changes_update_index_in_place(self):
+        self.complete("deco")
+        version = cache.get(autocomplete.TITLE_INDEX_VERSION_KEY)
+        with transaction.atomic():
+            created = Guide.objects.create(
+                title="Class decorators", overview="test", content="test", author=self.author
+            )
+            renamed = Guide.objects.get(title="Python decorators")
+            renamed.title = "Python generators"
+            renamed.save()
+            Guide.objects.get(title="Decorating Flask routes").delete()
+            # Until the changes are committed, other processes would not see them.
+            self.assertEqual(self.complete("gen"), [])
+            self.assertEqual(cache.get(autocomplete.TITLE_INDEX_VERSION_KEY), version)
+
+        self.assertNotEqual(cache.get(autocomplete.TITLE_INDEX_VERSION_KEY), version)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete("deco"), [created.title])
+            self.assertEqual(self.complete("gen"), ["Python generators"])
+
+    def test_changes_by_other_processes_reload_index(self):
+        self.complete("deco")
+        Guide.objects.filter(title="Python decorators").update(title="Python generators")
+        # Another process saving a guide replaces the version.
+        cache.set(autocomplete.TITLE_INDEX_VERSION_KEY, 'changed elsewhere', None)
+
+        self.assertEqual(self.complete("gen"), ["Python generators"])
@@ -0,0 +1,173 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from guides import revisions, search, tags
+from guides.models import Guide, GuideOutline, GuideRevision, Tag
+
+
+class GuideBulkCommandTests(TestCase):
+    """
+    Scenario:
+        - 3 existing Guides by 2 Authors
+        - The Guides are exported, deleted and imported again
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first_author = User.objects.create_user('firstauthor', password='testpass')
+        cls.second_author = User.objects.create_user('secondauthor', password='testpass')
+        for number, author in enumerate((cls.first_author, cls.second_author, cls.first_author)):
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content=f"# Heading {number}\n\nExporting **decorators** ✓",
+                author=author
+            )
+
+    def export(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('exportguides', *args, stdout=stdout, stderr=stderr)
+        self.assertIn("Exported", stderr.getvalue())
+        return stdout.getvalue()
+
+    def reimport(self, export, *args):
+        Guide.objects.all().delete()
+        self.import_file(self.write_file(export), *args)
+
+    def import_file(self, path, *args):
+        call_command('importguides', path, *args, stdout=io.StringIO())
+
+    def write_file(self, contents):
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', suffix='.ndjson', delete=False
+        ) as output:
+            output.write(contents)
+        self.addCleanup(os.remove, output.name)
+        return output.name
+
+    def test_export_writes_one_guide_per_line(self):
+        lines = self.export().splitlines()
+        self.assertEqual(len(lines), 3)
+        record = json.loads(lines[1])
+        self.assertEqual(record['title'], "test guide 1")
+        self.assertEqual(record['author'], "secondauthor")
+        self.assertEqual(record['content'], "# Heading 1\n\nExporting **decorators** ✓")
+        guide = Guide.objects.get(title="test guide 1")
+        self.assertEqual(record['pub_datetime'], guide.pub_datetime.isoformat())
+
+    def test_round_trip_restores_guides(self):
+        before = list(
+            Guide.objects.order_by('title')
+            .values_list('title', 'overview', 'content', 'author', 'pub_datetime', 'edit_datetime')
+        )
+        self.reimport(self.export())
+
+        after = list(
+            Guide.objects.order_by('title')
+            .values_list('title', 'overview', 'content', 'author', 'pub_datetime', 'edit_datetime')
+        )
+        self.assertEqual(before, after)
+        guide = Guide.objects.get(title="test guide 2")
+        self.assertIn("<strong>decorators</strong>", str(guide.content))
+
+    def test_round_trip_restores_tags(self):
+        tags.set_tags(Guide.objects.get(title="test guide 0"), ["Python", "Django"])
+        tags.set_tags(Guide.objects.get(title="test guide 2"), ["Python"])
+        export = self.export()
+        self.assertEqual(json.loads(export.splitlines()[0])['tags'], ["Django", "Python"])
+        self.assertEqual([tag.guide_count for tag in tags.facets()], [2, 1])
+
+        self.reimport(export)
+        self.assertEqual(
+            list(Guide.objects.get(title="test guide 2").tags.values_list('name', flat=True)),
+            ["Python"]
+        )
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'guide_count')), {"Python": 2, "Django": 1}
+        )
+        self.assertEqual(
+            [(tag.name, tag.guide_count) for tag in tags.facets()], [("Python", 2), ("Django", 1)]
+        )
+        resp = self.client.get(reverse("guides:index"), {'tag': 'python'})
+        self.assertEqual(
+            [guide.title for guide in resp.context['latest_guides']],
+            ["test guide 2", "test guide 0"]
+        )
+
+    def test_import_does_the_work_of_the_signal_handlers(self):
+        self.reimport(self.export())
+        guide = Guide.objects.get(title="test guide 1")
+
+        author = User.objects.get(id=self.second_author.id)
+        self.assertTrue(author.has_perm('guides.change_guide', guide))
+        self.assertTrue(author.has_perm('guides.delete_guide', guide))
+        self.assertFalse(
+            User.objects.get(id=self.first_author.id).has_perm('guides.change_guide', guide)
+        )
+
+        revision = GuideRevision.objects.get(guide=guide)
+        self.assertEqual(revision.editor, author)
+        self.assertEqual(revisions.revision_content(revision), guide.content.raw)
+        self.assertEqual(GuideOutline.objects.get(guide=guide).toc[0]['name'], "Heading 1")
+
+        self.assertEqual(search.SearchResults("decorators").count(), 3)
+        resp = self.client.get(reverse("guides:autocomplete"), {'term': "test gui"})
+        self.assertEqual(len(resp.json()['results']), 3)
+
+    def test_import_queries_do_not_grow_with_guides(self):
+        export = self.export()
+        lines = export.splitlines() * 4
+
+        small_file = self.write_file('\n'.join(lines[:4]))
+        large_file = self.write_file('\n'.join(lines))
+        Guide.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as small:
+            self.import_file(small_file, '--batch-size', '4')
+        with CaptureQueriesContext(connection) as large:
+            self.import_file(large_file, '--batch-size', '12')
+        self.assertEqual(Guide.objects.count(), 16)
+        self.assertEqual(len(small), len(large))
+
+    def test_unknown_author_imports_nothing(self):
+        export = self.export()
+        User.objects.filter(id=self.second_author.id).delete()
+
+        with self.assertRaisesMessage(CommandError, 'Line 2: Unknown author "secondauthor"'):
+            self.reimport(export)
+        self.assertFalse(Guide.objects.exists())
+
+    def test_invalid_lines_are_reported(self):
+        cases = {
+            "not json": "Line 1: Invalid JSON",
+            '{"title": "t", "overview": "o", "content": "c"}': "`author` must be",
+            json.dumps({
+                "title": "t" * 101, "overview": "o", "content": "c", "author": "firstauthor"
+            }): "`title` is longer than 100 characters",
+            json.dumps({
+                "title": "t", "overview": "o", "content": "c", "author": "firstauthor",
+                "pub_datetime": "yesterday"
+            }): "`pub_datetime` is not an ISO 8601 date and time",
+            json.dumps({
+                "title": "t", "overview": "o", "content": "c", "author": "firstauthor",
+                "tags": "python"
+            }): "`tags` must be a list of strings",
+            json.dumps({
+                "title": "t", "overview": "o", "content": "c", "author": "firstauthor",
+                "tags": ["C# F# Q# J# C# F# Q# J# x#"]
+            }): "has too many special characters",
+        }
+        for line, message in cases.items():
+            with self.subTest(line=line), self.assertRaisesMessage(CommandError, message):
+                self.reimport(line)
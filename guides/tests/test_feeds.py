@@ -0,0 +1,168 @@
+import re
+from unittest import mock
+
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from guides import feeds
+from guides.models import Guide
+from profiles.models import RestrictProcessing
+
+
+@override_settings(GUIDE_FEED_LIMIT=2)
+class GuideFeedTests(TransactionTestCase):
+    """
+    Scenario:
+        - 3 existing Guides, more than the feed limit
+        - 1 Guide by another author
+        - Feed reader polls the RSS and Atom feeds, and the feeds of an author
+    """
+
+    multi_db = True
+    # The groups created by migrations are kept.
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('testauthor', password='testpass')
+        SocialAccount.objects.create(
+            user=self.author,
+            uid=42,
+            provider='discoauth',
+            extra_data={'guild': None}
+        )
+        self.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content=f"test guide content {number}",
+                author=self.author
+            )
+            for number in range(3)
+        ]
+        self.other_author = User.objects.create_user('otherauthor', password='testpass')
+        SocialAccount.objects.create(
+            user=self.other_author,
+            uid=43,
+            provider='discoauth',
+            extra_data={'guild': None}
+        )
+        self.other_guide = Guide.objects.create(
+            title="other guide",
+            overview="test overview",
+            content="other guide content",
+            author=self.other_author
+        )
+
+    def test_feeds_are_limited_to_newest_guides(self):
+        for name in ("guides:feed_rss", "guides:feed_atom"):
+            with self.subTest(feed=name):
+                resp = self.client.get(reverse(name))
+                self.assertEqual(resp.status_code, 200)
+                self.assertContains(resp, "other guide")
+                self.assertContains(resp, "test guide 2")
+                self.assertNotContains(resp, "test guide 1")
+
+    def test_feed_links_author_profile(self):
+        resp = self.client.get(reverse("guides:feed_atom"))
+        self.assertContains(resp, reverse("profiles:detail", kwargs={"pk": 42}))
+
+    def test_cached_feed_does_not_query_database(self):
+        first = self.client.get(reverse("guides:feed_rss"))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("guides:feed_rss"))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_conditional_requests_are_not_modified(self):
+        resp = self.client.get(reverse("guides:feed_rss"))
+        self.assertIn('ETag', resp)
+        self.assertIn('Last-Modified', resp)
+
+        resp = self.client.get(reverse("guides:feed_rss"), HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+        last_modified = resp['Last-Modified']
+        resp = self.client.get(reverse("guides:feed_rss"), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_saving_guide_invalidates_feed(self):
+        etag = self.client.get(reverse("guides:feed_rss"))['ETag']
+
+        guide = Guide.objects.get(id=self.guides[2].id)
+        guide.title = "edited test guide"
+        guide.save()
+
+        resp = self.client.get(reverse("guides:feed_rss"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "edited test guide")
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_feed_is_discarded_only_once_the_change_is_committed(self):
+        self.client.get(reverse("guides:feed_rss"))
+        with transaction.atomic():
+            guide = Guide.objects.get(id=self.guides[2].id)
+            guide.title = "edited test guide"
+            guide.save()
+            # A request before the commit must not cache the feed under a new version.
+            self.assertNotContains(self.client.get(reverse("guides:feed_rss")), "edited test")
+        self.assertContains(self.client.get(reverse("guides:feed_rss")), "edited test guide")
+
+    def test_deleting_guide_invalidates_feed(self):
+        self.client.get(reverse("guides:feed_atom"))
+        Guide.objects.get(id=self.guides[2].id).delete()
+
+        resp = self.client.get(reverse("guides:feed_atom"))
+        self.assertNotContains(resp, "test guide 2")
+        self.assertContains(resp, "test guide 1")
+
+    def test_author_feeds_list_only_their_guides(self):
+        for name in ("guides:feed_author_rss", "guides:feed_author_atom"):
+            with self.subTest(feed=name):
+                resp = self.client.get(reverse(name, kwargs={"uid": 42}))
+                self.assertEqual(resp.status_code, 200)
+                self.assertContains(resp, "Programming Guides by")
+                self.assertContains(resp, "test guide 2")
+                self.assertContains(resp, "test guide 1")
+                self.assertNotContains(resp, "test guide 0")
+                self.assertNotContains(resp, "other guide")
+
+    def test_author_feeds_of_hidden_profiles_are_not_found(self):
+        RestrictProcessing.objects.filter(user=self.author).update(restrict_processing=True)
+        resp = self.client.get(reverse("guides:feed_author_rss", kwargs={"uid": 42}))
+        self.assertEqual(resp.status_code, 404)
+        resp = self.client.get(reverse("guides:feed_author_rss", kwargs={"uid": 1000}))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_items_are_serialized_once_for_all_feeds(self):
+        serialize_item = feeds.CachedRssFeed.serialize_item
+        with mock.patch.object(
+            feeds.CachedRssFeed, 'serialize_item', autospec=True, side_effect=serialize_item
+        ) as serialize:
+            latest = self.client.get(reverse("guides:feed_rss")).content.decode()
+            self.assertEqual(serialize.call_count, 2)
+
+            by_author = self.client.get(
+                reverse("guides:feed_author_rss", kwargs={"uid": 42})
+            ).content.decode()
+            # Only the guide missing from the latest guides is serialized.
+            self.assertEqual(serialize.call_count, 3)
+
+            guide = Guide.objects.get(id=self.guides[2].id)
+            guide.title = "edited test guide"
+            guide.save()
+            serialize.reset_mock()
+            self.client.get(reverse("guides:feed_author_rss", kwargs={"uid": 42}))
+            self.assertIn(
+                "edited test guide", [call[0][1]['title'] for call in serialize.call_args_list]
+            )
+
+        item = next(
+            item for item in re.findall(r'<item>.*?</item>', latest) if "test guide 2" in item
+        )
+        self.assertIn(item, by_author)
@@ -0,0 +1,127 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from guides import httpcache
+from guides.models import Guide, WebhookMessage
+
+
+class GuideHTTPCacheTests(TestCase):
+    """
+    Scenario:
+        - 2 existing Guides by 1 Author
+        - Anonymous user revisits the guide list and a Guide
+        - Author views the same pages, and edits and deletes Guides
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+        cls.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=cls.author
+            )
+            for number in range(2)
+        ]
+        cls.url = reverse("guides:detail", kwargs={"pk": cls.guides[0].id})
+
+    def setUp(self):
+        cache.clear()
+        self.purged = []
+        httpcache.purge_requested.connect(self.record_purge)
+        self.addCleanup(httpcache.purge_requested.disconnect, self.record_purge)
+
+    def record_purge(self, sender, keys, **kwargs):
+        self.purged.append(keys)
+
+    def test_anonymous_detail_page_is_public_with_validators(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=0, must-revalidate')
+        self.assertEqual(resp['Vary'], 'Cookie, Accept-Encoding')
+        self.assertEqual(resp['Surrogate-Key'], f'guides guide-{self.guides[0].id}')
+        self.assertEqual(resp['Surrogate-Control'], f'max-age={httpcache.SURROGATE_MAX_AGE}')
+        self.assertEqual(
+            resp['Last-Modified'], http_date(self.guides[0].edit_datetime.timestamp())
+        )
+        self.assertTrue(resp.has_header('ETag'))
+
+    def test_unchanged_detail_page_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+        guide = Guide.objects.get(id=self.guides[0].id)
+        guide.title = "edited title"
+        guide.save()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_logged_in_pages_are_private_without_validators(self):
+        self.client.force_login(self.author)
+        for url in (self.url, reverse("guides:index")):
+            with self.subTest(url=url):
+                resp = self.client.get(url)
+                self.assertEqual(resp['Cache-Control'], 'private, no-cache')
+                self.assertIn('Cookie', resp['Vary'])
+                self.assertFalse(resp.has_header('ETag'))
+                self.assertFalse(resp.has_header('Surrogate-Key'))
+
+    def test_guide_list_changes_with_its_guides(self):
+        resp = self.client.get(reverse("guides:index"))
+        self.assertEqual(
+            resp['Surrogate-Key'].split(),
+            ['guides', 'guide-list'] + [f'guide-{guide.id}' for guide in reversed(self.guides)]
+        )
+        etag = resp['ETag']
+        resp = self.client.get(reverse("guides:index"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        Guide.objects.create(
+            title="test guide 2",
+            overview="test overview",
+            content="test guide content",
+            author=self.author
+        )
+        resp = self.client.get(reverse("guides:index"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_saving_and_deleting_guides_purges_their_keys(self):
+        guide = Guide.objects.create(
+            title="test guide 2",
+            overview="test overview",
+            content="test guide content",
+            author=self.author
+        )
+        self.assertIn(sorted(['guide-list', f'guide-{guide.id}']), self.purged)
+
+        self.purged.clear()
+        guide.save()
+        self.assertIn([f'guide-{guide.id}'], self.purged)
+        self.assertNotIn('guide-list', sum(self.purged, []))
+
+        self.purged.clear()
+        guide_id = guide.id
+        guide.delete()
+        self.assertIn(sorted(['guide-list', f'guide-{guide_id}']), self.purged)
+
+    @override_settings(SURROGATE_PURGE_URL='https://cdn.example.com/purge')
+    def test_purges_are_queued_for_the_purge_url(self):
+        guide = Guide.objects.get(id=self.guides[1].id)
+        guide.save()
+        payloads = [
+            json.loads(message.payload)
+            for message in WebhookMessage.objects.filter(url='https://cdn.example.com/purge')
+        ]
+        self.assertIn({'surrogate_keys': [f'guide-{guide.id}']}, payloads)
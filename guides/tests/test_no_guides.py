@@ -23,12 +23,11 @@ class NoGuidesTests(TestCase):
     def test_no_guides_passes_empty_context_data(self):
         """
         Since no Guides exist in the database,
-        the index page should receive an empty query
-        set for the `guides` context object.
+        the index page should receive an empty list
+        for the `guides` context object.
         """
 
         resp = self.client.get(reverse("guides:index"))
         context_guides = resp.context[INDEX_GUIDE_CONTEXT_NAME]
 
-        self.assertFalse(context_guides.exists())
         self.assertSequenceEqual(context_guides, [])
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from guides.models import Guide, GuideOutline
+from website import converters, workers
+
+
+CONTENT = """
+# Setting up
+
+Install the interpreter first.
+
+```python
+print("Hello")
+```
+
+## Running *tests*
+
+```bash
+python -m pytest
+```
+"""
+
+
+class GuideOutlineTests(TestCase):
+    """
+    Scenario:
+        - 1 existing Guide with headings and code blocks
+        - Anonymous user browses the guide list, search results, feed and guide
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+        cls.guide = Guide.objects.create(
+            title="test guide", overview="test overview", content=CONTENT, author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_outline_is_stored_on_save(self):
+        outline = GuideOutline.objects.get(guide=self.guide)
+        self.assertEqual(outline.toc, [
+            {'level': 1, 'anchor': 'setting-up', 'name': "Setting up"},
+            {'level': 2, 'anchor': 'running-tests', 'name': "Running tests"},
+        ])
+        self.assertEqual(outline.languages, ['python', 'bash'])
+        self.assertEqual(outline.word_count, 8)
+        self.assertEqual(outline.reading_minutes, 1)
+
+    def test_outline_follows_edits(self):
+        guide = Guide.objects.get(id=self.guide.id)
+        guide.content = "No headings and no code."
+        guide.save()
+
+        outline = GuideOutline.objects.get(guide=guide)
+        self.assertEqual((outline.toc, outline.languages), ([], []))
+        self.assertEqual(outline.word_count, 5)
+
+    def test_detail_shows_table_of_contents(self):
+        resp = self.client.get(reverse("guides:detail", kwargs={"pk": self.guide.id}))
+        self.assertContains(
+            resp, '<a class="no-underline" href="#running-tests">Running tests</a>'
+        )
+        self.assertContains(resp, "1 min read")
+        self.assertContains(resp, '<meta property="article:tag" content="bash">')
+
+    def test_list_and_search_show_reading_time_and_languages(self):
+        for params in ({}, {'term': "interpreter"}):
+            with self.subTest(params=params):
+                resp = self.client.get(reverse("guides:index"), params)
+                self.assertContains(resp, "1 min read")
+                self.assertContains(resp, '<span class="guide-list-item-language">python</span>')
+
+    def test_feed_lists_languages_as_categories(self):
+        resp = self.client.get(reverse("guides:feed_rss"))
+        self.assertContains(resp, "<category>python</category>")
+
+    def test_guides_without_outline_are_shown(self):
+        GuideOutline.objects.all().delete()
+        resp = self.client.get(reverse("guides:index"))
+        self.assertContains(resp, "test guide")
+        self.assertNotContains(resp, "min read")
+        resp = self.client.get(reverse("guides:detail", kwargs={"pk": self.guide.id}))
+        self.assertContains(resp, "test overview")
+
+    def test_content_which_could_not_render_is_not_saved(self):
+        self.client.force_login(self.author)
+        with mock.patch.object(
+            converters.render_pool, 'call', side_effect=workers.PoolBusy("busy")
+        ):
+            resp = self.client.post(
+                reverse("guides:edit", kwargs={"pk": self.guide.id}),
+                data={"title": "test guide", "overview": "test overview", "content": "# Busy"}
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['form'].errors['content'])
+
+        guide = Guide.objects.get(id=self.guide.id)
+        self.assertEqual(guide.content.raw, CONTENT)
+        self.assertIn('id="running-tests"', guide.content.rendered)
+        self.assertEqual(GuideOutline.objects.get(guide=guide).word_count, 8)
@@ -0,0 +1,112 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from guardian.shortcuts import assign_perm, remove_perm
+
+from guides.models import Guide
+
+
+@override_settings(DISCORD_GUILD_ID=55555)
+class GuideDetailPageCacheTests(TestCase):
+    """
+    Scenario:
+        - 1 existing Guide
+        - Anonymous user, Member and the Author view the Guide repeatedly
+        - The Guide, its Author and permissions change in between
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            'testauthor', password='testpass', first_name='Author'
+        )
+        SocialAccount.objects.create(
+            user=cls.author,
+            uid=42,
+            provider='discoauth',
+            extra_data={'guild': {'id': '55555', 'permissions': 0x63584C0}}
+        )
+        cls.member = User.objects.create_user('testmember', password='testpass')
+        SocialAccount.objects.create(
+            user=cls.member,
+            uid=43,
+            provider='discoauth',
+            extra_data={'guild': {'id': '55555', 'permissions': 0x63584C0}}
+        )
+        cls.guide = Guide.objects.create(
+            title="test guide",
+            overview="test overview",
+            content="test guide content",
+            author=cls.author
+        )
+        cls.url = reverse("guides:detail", kwargs={"pk": cls.guide.id})
+        cls.edit_url = reverse("guides:edit", kwargs={"pk": cls.guide.id})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_anonymous_page_does_not_query_database(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+
+    def test_query_string_bypasses_anonymous_cache(self):
+        self.client.get(self.url)
+        resp = self.client.get(self.url + "?utm_source=test")
+        self.assertIsNotNone(resp.context)
+
+    def test_pending_messages_bypass_anonymous_cache(self):
+        self.client.get(self.url)
+        self.client.cookies['messages'] = 'pending'
+        resp = self.client.get(self.url)
+        self.assertIsNotNone(resp.context)
+
+    def test_saving_guide_invalidates_page(self):
+        self.client.get(self.url)
+
+        guide = Guide.objects.get(id=self.guide.id)
+        guide.title = "edited test guide"
+        guide.save()
+
+        self.assertContains(self.client.get(self.url), "edited test guide")
+
+    def test_renaming_author_invalidates_page(self):
+        self.client.get(self.url)
+
+        author = User.objects.get(id=self.author.id)
+        author.first_name = 'Renamed'
+        author.save()
+
+        self.assertContains(self.client.get(self.url), "@Renamed")
+
+    def test_author_and_member_see_different_pages(self):
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(self.url), self.edit_url)
+
+        self.client.force_login(self.member)
+        self.assertNotContains(self.client.get(self.url), self.edit_url)
+
+    def test_object_permission_changes_invalidate_page(self):
+        self.client.force_login(self.member)
+        self.assertNotContains(self.client.get(self.url), self.edit_url)
+
+        assign_perm('change_guide', self.member, self.guide)
+        self.assertContains(self.client.get(self.url), self.edit_url)
+
+        remove_perm('change_guide', self.member, self.guide)
+        self.assertNotContains(self.client.get(self.url), self.edit_url)
+
+    def test_group_permission_changes_invalidate_page(self):
+        editors = Group.objects.create(name='testeditors')
+        self.member.groups.add(editors)
+        self.client.force_login(self.member)
+        self.assertNotContains(self.client.get(self.url), self.edit_url)
+
+        editors.permissions.add(Permission.objects.get(codename='change_guide'))
+        self.assertContains(self.client.get(self.url), self.edit_url)
@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from guides.models import Guide
+from guides.pagination import encode_cursor
+from . import INDEX_GUIDE_CONTEXT_NAME
+
+
+class GuideIndexPaginationTests(TestCase):
+    """
+    Scenario:
+        - 25 existing Guides, several published at the same time
+        - Anonymous user pages through the guide list and search results
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('testauthor', password='testpass')
+        for number in range(25):
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=author
+            )
+        # Ties on the publication date must be broken by the ID.
+        Guide.objects.filter(id__lte=12).update(pub_datetime=timezone.now())
+        cls.expected = list(Guide.objects.order_by('-pub_datetime', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, **params):
+        """Follow the "next" links from the first page and return all pages."""
+
+        pages = []
+        resp = self.client.get(reverse("guides:index"), params)
+        while True:
+            page = resp.context['page_obj']
+            pages.append(resp)
+            if not page.has_next():
+                return pages
+            resp = self.client.get(
+                reverse("guides:index"), {**params, 'after': page.next_cursor()}
+            )
+
+    def test_pages_cover_every_guide_once_in_order(self):
+        pages = self.walk()
+        self.assertEqual(
+            [len(resp.context[INDEX_GUIDE_CONTEXT_NAME]) for resp in pages], [10, 10, 5]
+        )
+
+        guides = [guide for resp in pages for guide in resp.context[INDEX_GUIDE_CONTEXT_NAME]]
+        self.assertSequenceEqual(guides, self.expected)
+
+    def test_previous_page_returns_the_same_guides(self):
+        first, second, third = self.walk()
+        resp = self.client.get(
+            reverse("guides:index"), {'before': third.context['page_obj'].previous_cursor()}
+        )
+        self.assertSequenceEqual(
+            resp.context[INDEX_GUIDE_CONTEXT_NAME], second.context[INDEX_GUIDE_CONTEXT_NAME]
+        )
+        self.assertTrue(resp.context['page_obj'].has_previous())
+
+    def test_paging_back_to_start_shows_first_page(self):
+        first, second, third = self.walk()
+        resp = self.client.get(
+            reverse("guides:index"), {'before': second.context['page_obj'].previous_cursor()}
+        )
+        self.assertSequenceEqual(
+            resp.context[INDEX_GUIDE_CONTEXT_NAME], first.context[INDEX_GUIDE_CONTEXT_NAME]
+        )
+        self.assertFalse(resp.context['page_obj'].has_previous())
+
+    def test_deep_pages_run_the_same_queries_as_the_first(self):
+        first, second, third = self.walk()
+        with self.assertNumQueries(2):
+            self.client.get(reverse("guides:index"))
+        cursor = second.context['page_obj'].next_cursor()
+        with self.assertNumQueries(2):
+            self.client.get(reverse("guides:index"), {'after': cursor})
+
+    def test_page_count_is_estimated(self):
+        resp = self.client.get(reverse("guides:index"))
+        self.assertEqual(resp.context['paginator'].estimated_num_pages, 3)
+        self.assertContains(resp, "About <strong>3</strong> pages")
+
+    def test_invalid_cursors_status_404(self):
+        for cursor in ("garbage", encode_cursor(("not a date", 1)), encode_cursor((1,))):
+            with self.subTest(cursor=cursor):
+                resp = self.client.get(reverse("guides:index"), {'after': cursor})
+                self.assertEqual(resp.status_code, 404)
+
+    def test_search_results_are_paginated(self):
+        pages = self.walk(term="guide")
+        guides = [guide for resp in pages for guide in resp.context[INDEX_GUIDE_CONTEXT_NAME]]
+        self.assertEqual(len(pages), 3)
+        self.assertCountEqual(guides, self.expected)
+        self.assertIn("term=guide", pages[0].content.decode())
+
+        resp = self.client.get(
+            reverse("guides:index"),
+            {'term': 'guide', 'before': pages[2].context['page_obj'].previous_cursor()}
+        )
+        self.assertSequenceEqual(
+            resp.context[INDEX_GUIDE_CONTEXT_NAME], pages[1].context[INDEX_GUIDE_CONTEXT_NAME]
+        )
+
+    def test_invalid_search_cursor_status_404(self):
+        resp = self.client.get(
+            reverse("guides:index"), {'term': 'guide', 'after': encode_cursor(("x", 1))}
+        )
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,101 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from guardian.shortcuts import assign_perm
+
+from guides.models import Guide
+from guides.permissions import PrefetchingObjectPermissionChecker, prefetch_permissions
+
+
+class GuidePermissionPrefetchTests(TestCase):
+    """
+    Scenario:
+        - 4 existing Guides by 1 Author
+        - 1 Editor who may change one Guide directly and another through a group
+        - Author and Editor browse the guide list and edit and delete guides
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+        cls.editor = User.objects.create_user('testeditor', password='testpass')
+        cls.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=cls.author
+            )
+            for number in range(4)
+        ]
+        group = Group.objects.create(name="editors")
+        cls.editor.groups.add(group)
+        assign_perm('change_guide', cls.editor, cls.guides[0])
+        assign_perm('change_guide', group, cls.guides[1])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_user_and_group_permissions_are_prefetched_with_one_query(self):
+        checker = PrefetchingObjectPermissionChecker(User.objects.get(id=self.editor.id))
+        with self.assertNumQueries(1):
+            checker.prefetch_perms(self.guides)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [checker.has_perm('guides.change_guide', guide) for guide in self.guides],
+                [True, True, False, False]
+            )
+            self.assertFalse(checker.has_perm('guides.delete_guide', self.guides[0]))
+
+    def test_checks_after_prefetching_do_not_query(self):
+        editor = User.objects.get(id=self.editor.id)
+        prefetch_permissions(editor, self.guides)
+        with self.assertNumQueries(0):
+            for guide in self.guides:
+                editor.has_perm('guides.change_guide', guide)
+
+    def test_list_shows_links_for_permitted_guides_only(self):
+        self.client.force_login(self.editor)
+        resp = self.client.get(reverse("guides:index"))
+        for guide, shown in zip(self.guides, (True, True, False, False)):
+            with self.subTest(guide=guide.title):
+                edit_url = reverse("guides:edit", kwargs={"pk": guide.id})
+                if shown:
+                    self.assertContains(resp, edit_url)
+                else:
+                    self.assertNotContains(resp, edit_url)
+        self.assertNotContains(resp, reverse("guides:delete", kwargs={"pk": self.guides[0].id}))
+
+    def test_list_queries_do_not_grow_with_guides(self):
+        self.client.force_login(self.author)
+        with self.assertNumQueries(10) as small:
+            self.client.get(reverse("guides:index"))
+        for number in range(4, 8):
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=self.author
+            )
+        cache.clear()
+        with self.assertNumQueries(len(small)):
+            resp = self.client.get(reverse("guides:index"))
+        self.assertContains(resp, reverse("guides:delete", kwargs={"pk": self.guides[3].id}))
+
+    def test_edit_and_delete_check_permissions(self):
+        guide = self.guides[1]
+        self.client.force_login(self.editor)
+        self.assertEqual(
+            self.client.get(reverse("guides:edit", kwargs={"pk": guide.id})).status_code, 200
+        )
+        self.assertEqual(
+            self.client.post(reverse("guides:delete", kwargs={"pk": guide.id})).status_code, 403
+        )
+
+        self.client.force_login(self.author)
+        resp = self.client.post(reverse("guides:delete", kwargs={"pk": guide.id}), follow=True)
+        self.assertContains(resp, "was deleted successfully")
+        self.assertFalse(Guide.objects.filter(id=guide.id).exists())
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from website import preview
+
+
+class GuidePreviewTests(TestCase):
+    """
+    Scenario:
+        - Member previews the content of a guide while writing it
+        - Anonymous user requests a preview
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testmember', password='testpass')
+
+    def setUp(self):
+        preview.block_cache.clear()
+
+    def test_member_receives_sanitized_html(self):
+        self.client.force_login(self.user)
+        resp = self.client.post(
+            reverse("guides:preview"), {'content': "Some *text*\n\n<script>alert(1)</script>"}
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.json()['html'], "<p>Some <em>text</em></p>\n&lt;script&gt;alert(1)&lt;/script&gt;"
+        )
+
+    def test_anonymous_user_cannot_render_previews(self):
+        resp = self.client.post(reverse("guides:preview"), {'content': "*text*"})
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(preview.block_cache.info().misses, 0)
+
+    def test_form_shows_the_preview(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'a@b.c', 'testpass'))
+        resp = self.client.get(reverse("guides:create"))
+        self.assertContains(resp, f'data-preview-url="{reverse("guides:preview")}"')
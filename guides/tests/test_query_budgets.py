@@ -0,0 +1,98 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from guides.models import Guide
+
+
+# The number of SQL queries each page may run, regardless of how many
+# guides exist. Anonymous users skip the session and user lookups, and
+# the object permissions of members are loaded with one query per page.
+# Budgets apply to uncached pages, the cache is cleared before every request,
+# so the guide list also counts its guides to estimate the number of pages.
+# Its first page also lists the trending guides, and every list the most used tags.
+QUERY_BUDGETS = {
+    'index': {'anonymous': 5, 'member': 11},
+    'search': {'anonymous': 4, 'member': 10},
+    'detail': {'anonymous': 4, 'member': 11},
+    'profile': {'anonymous': 2, 'member': 5},
+}
+
+
+@override_settings(DISCORD_GUILD_ID=55555)
+class QueryBudgetTests(TestCase):
+    """
+    Scenario:
+        - More than a page of Guides written by many different authors
+          with Discord accounts
+        - Anonymous user and Member access the guide list, search,
+          guide detail and profile pages
+        - The number of queries stays the same as more guides are written
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('testmember', password='testpass')
+        SocialAccount.objects.create(
+            user=cls.member,
+            uid=42,
+            provider='discoauth',
+            extra_data={'guild': {'id': '55555', 'permissions': 0x63584C0}}
+        )
+        cls.create_guides(11)
+
+    @classmethod
+    def create_guides(cls, amount):
+        offset = Guide.objects.count()
+        for number in range(offset, offset + amount):
+            author = User.objects.create_user(f'testauthor{number}', password='testpass')
+            SocialAccount.objects.create(
+                user=author,
+                uid=1000 + number,
+                provider='discoauth',
+                extra_data={'guild': None}
+            )
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=author
+            )
+
+    def urls(self):
+        return {
+            'index': reverse("guides:index"),
+            'search': reverse("guides:index") + "?term=test",
+            'detail': reverse("guides:detail", kwargs={"pk": Guide.objects.first().id}),
+            'profile': reverse("profiles:detail", kwargs={"pk": 1000}),
+        }
+
+    def assert_within_budgets(self):
+        for page, url in self.urls().items():
+            for role, budget in QUERY_BUDGETS[page].items():
+                with self.subTest(page=page, role=role):
+                    if role == 'member':
+                        self.client.force_login(self.member)
+                    else:
+                        self.client.logout()
+                    cache.clear()
+
+                    with self.assertNumQueries(budget):
+                        resp = self.client.get(url)
+                    self.assertEqual(resp.status_code, 200)
+
+    def test_pages_stay_within_budget(self):
+        self.assert_within_budgets()
+
+    def test_budget_does_not_grow_with_guides(self):
+        self.create_guides(12)
+        self.assert_within_budgets()
+
+    def test_list_links_authors_discord_profiles(self):
+        resp = self.client.get(reverse("guides:index"))
+        for uid in (1008, 1009, 1010):
+            self.assertContains(resp, reverse("profiles:detail", kwargs={"pk": uid}))
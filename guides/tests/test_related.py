@@ -0,0 +1,147 @@
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from guides import related
+from guides.models import Guide, GuideTerms, RelatedGuide, TermFrequency, TermPosting
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    def test_term_counts_weight_title_and_skip_stop_words(self):
+        counts = related.term_counts("Python decorators", "about decorators", "the decorators 42")
+        self.assertEqual(counts, {'decorators': 6, 'python': 3})
+
+    def test_similar_guides_score_higher(self):
+        index = related.SimilarityIndex({
+            1: {'python': 3, 'decorators': 2},
+            2: {'python': 1, 'decorators': 3},
+            3: {'python': 1, 'rust': 4},
+            4: {'gardening': 2},
+        })
+        scores = index.scores(1)
+        self.assertGreater(scores[2], scores[3])
+        self.assertNotIn(4, scores)
+        self.assertEqual([guide_id for _, guide_id in index.neighbours(1)], [2, 3])
+
+
+class RelatedGuideTests(TestCase):
+    """
+    Scenario:
+        - 1 Author with Guides on python decorators, python generators and gardening
+        - Guides are created, edited and deleted
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+
+    def create_guide(self, title, content):
+        return Guide.objects.create(
+            title=title, overview=title, content=content, author=self.author
+        )
+
+    def related_ids(self, guide):
+        return list(
+            RelatedGuide.objects.filter(guide=guide).order_by('rank')
+            .values_list('related_id', flat=True)
+        )
+
+    def test_similar_guides_become_related(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        generators = self.create_guide("Python generators", "Lazy python iteration")
+        gardening = self.create_guide("Gardening", "Watering tomatoes")
+
+        self.assertEqual(self.related_ids(decorators), [generators.id])
+        self.assertEqual(self.related_ids(generators), [decorators.id])
+        self.assertEqual(self.related_ids(gardening), [])
+
+    def test_editing_updates_related_guides(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        gardening = self.create_guide("Gardening", "Watering tomatoes")
+
+        gardening = Guide.objects.get(id=gardening.id)
+        gardening.title = "Python gardening"
+        gardening.save()
+        self.assertEqual(self.related_ids(decorators), [gardening.id])
+
+        gardening.title = "Gardening"
+        gardening.save()
+        self.assertEqual(self.related_ids(decorators), [])
+        self.assertEqual(self.related_ids(gardening), [])
+
+    def test_deleting_refills_related_guides(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        generators = self.create_guide("Python generators", "Lazy python iteration")
+        self.create_guide("Python closures", "Wrapping python functions")
+
+        Guide.objects.get(title="Python closures").delete()
+        self.assertEqual(self.related_ids(decorators), [generators.id])
+        self.assertEqual(GuideTerms.objects.count(), 2)
+
+    def test_saving_loads_only_guides_sharing_terms(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        gardening = self.create_guide("Gardening", "Watering tomatoes")
+
+        with mock.patch.object(related, 'load_index', wraps=related.load_index) as load_index:
+            generators = self.create_guide("Python generators", "Lazy python iteration")
+        self.assertEqual(load_index.call_args[0][0], {decorators.id, generators.id})
+        self.assertNotIn(gardening.id, load_index.call_args[0][0])
+        self.assertEqual(self.related_ids(decorators), [generators.id])
+
+    def test_saving_skips_guides_sharing_only_common_terms(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        gardening = self.create_guide("Python gardening", "Watering tomatoes")
+
+        with mock.patch.multiple(related, COMMON_TERM_FREQUENCY=0.5, COMMON_TERM_MIN_GUIDES=2), \
+                mock.patch.object(related, 'load_index', wraps=related.load_index) as load_index:
+            generators = self.create_guide("Python generators", "Wrapping lazy iteration")
+        self.assertEqual(load_index.call_args[0][0], {decorators.id, generators.id})
+        self.assertNotIn(gardening.id, load_index.call_args[0][0])
+        self.assertEqual(self.related_ids(generators), [decorators.id])
+
+    def test_term_frequencies_follow_changes(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        self.create_guide("Python generators", "Lazy python iteration")
+        decorators = Guide.objects.get(id=decorators.id)
+        decorators.title = decorators.overview = "Python closures"
+        decorators.save()
+        Guide.objects.filter(title="Python generators").delete()
+
+        frequencies = dict(
+            TermFrequency.objects.filter(guide_count__gt=0).values_list('term', 'guide_count')
+        )
+        self.assertEqual(frequencies['python'], 1)
+        self.assertNotIn('decorators', frequencies)
+        self.assertEqual(
+            set(TermPosting.objects.values_list('term', flat=True)), set(frequencies)
+        )
+
+        related.rebuild()
+        self.assertEqual(
+            dict(TermFrequency.objects.values_list('term', 'guide_count')), frequencies
+        )
+
+    def test_rebuild_command(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        generators = self.create_guide("Python generators", "Lazy python iteration")
+        RelatedGuide.objects.all().delete()
+        GuideTerms.objects.all().delete()
+
+        stdout = io.StringIO()
+        call_command('rebuildrelatedguides', stdout=stdout)
+        self.assertIn("2", stdout.getvalue())
+        self.assertEqual(self.related_ids(decorators), [generators.id])
+
+    def test_detail_shows_related_guides(self):
+        decorators = self.create_guide("Python decorators", "Wrapping python functions")
+        generators = self.create_guide("Python generators", "Lazy python iteration")
+
+        resp = self.client.get(reverse("guides:detail", kwargs={"pk": decorators.id}))
+        self.assertContains(resp, "Related guides")
+        self.assertContains(resp, reverse("guides:detail", kwargs={"pk": generators.id}))
@@ -0,0 +1,143 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from guides import revisions
+from guides.models import Guide, GuideRevision
+
+
+class DeltaTests(SimpleTestCase):
+    def test_delta_round_trip(self):
+        cases = [
+            ("", "new guide\n"),
+            ("first\nsecond\nthird\n", "first\nchanged\nthird\nfourth"),
+            ("keep\r\nremove\r\n", "keep\r\n"),
+            ("no trailing newline", "no trailing newline\n"),
+            ("same\n", "same\n"),
+        ]
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, new)), new)
+
+    def test_delta_size_depends_on_edit_size(self):
+        old = "".join(f"line {number} of a long guide\n" for number in range(2000))
+        new = old.replace("line 1000 of", "line one thousand of")
+        delta = revisions.compress_delta(revisions.make_delta(old, new))
+        self.assertLess(len(delta), 100)
+        self.assertGreater(len(revisions.compress_snapshot(old)), len(delta) * 10)
+
+
+@override_settings(DISCORD_GUILD_ID=55555)
+class GuideRevisionTests(TestCase):
+    """
+    Scenario:
+        - 1 existing Guide created by its Author
+        - The Author edits the Guide many times
+        - Anonymous user browses the revision history
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            'testauthor', password='testpass', first_name='Author'
+        )
+        SocialAccount.objects.create(
+            user=cls.author,
+            uid=42,
+            extra_data={'guild': {'id': '55555', 'permissions': 0x63584C0}}
+        )
+
+    def create_guide(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse("guides:create"), data={
+            "title": "test guide",
+            "overview": "test overview",
+            "content": "# Heading\n\nversion 0",
+        })
+        return Guide.objects.get()
+
+    def edit_guide(self, guide, version):
+        self.client.post(reverse("guides:edit", kwargs={"pk": guide.id}), data={
+            "title": "test guide",
+            "overview": "test overview",
+            "content": f"# Heading\n\nversion {version}",
+        })
+
+    def test_create_and_edit_record_revisions(self):
+        guide = self.create_guide()
+        self.edit_guide(guide, 1)
+
+        first, second = GuideRevision.objects.filter(guide=guide).order_by('number')
+        self.assertEqual((first.number, second.number), (1, 2))
+        self.assertTrue(first.is_snapshot)
+        self.assertFalse(second.is_snapshot)
+        self.assertEqual(second.editor, self.author)
+        self.assertEqual(revisions.revision_content(first), "# Heading\n\nversion 0")
+        self.assertEqual(revisions.revision_content(second), "# Heading\n\nversion 1")
+
+    def test_unchanged_save_records_no_revision(self):
+        guide = self.create_guide()
+        self.edit_guide(guide, 0)
+        self.assertEqual(GuideRevision.objects.filter(guide=guide).count(), 1)
+
+    def test_every_revision_is_reconstructed_with_one_query(self):
+        guide = self.create_guide()
+        for version in range(1, 25):
+            self.edit_guide(guide, version)
+
+        snapshots = GuideRevision.objects.filter(guide=guide, is_snapshot=True)
+        self.assertSequenceEqual(
+            snapshots.order_by('number').values_list('number', flat=True), [1, 11, 21]
+        )
+        for revision in GuideRevision.objects.filter(guide=guide).defer('data'):
+            with self.subTest(number=revision.number), self.assertNumQueries(1):
+                self.assertEqual(
+                    revisions.revision_content(revision),
+                    f"# Heading\n\nversion {revision.number - 1}"
+                )
+
+    def test_guides_without_revisions_start_with_a_snapshot(self):
+        guide = Guide.objects.create(
+            title="test guide", overview="test overview", content="old", author=self.author
+        )
+        guide.content = "new"
+        guide.save()
+        revision = revisions.record_revision(guide)
+        self.assertEqual(revision.number, 1)
+        self.assertTrue(revision.is_snapshot)
+
+    def test_revision_list_and_detail(self):
+        guide = self.create_guide()
+        self.edit_guide(guide, 1)
+        self.client.logout()
+
+        resp = self.client.get(reverse("guides:revisions", kwargs={"pk": guide.id}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertSequenceEqual(
+            [revision.number for revision in resp.context['revisions']], [2, 1]
+        )
+        self.assertContains(
+            resp, reverse("guides:revision_detail", kwargs={"pk": guide.id, "number": 1})
+        )
+
+        resp = self.client.get(
+            reverse("guides:revision_detail", kwargs={"pk": guide.id, "number": 1})
+        )
+        self.assertContains(resp, "version 0")
+        self.assertContains(resp, "<h1")
+
+    def test_unknown_revisions_status_404(self):
+        guide = self.create_guide()
+        self.assertEqual(
+            self.client.get(reverse("guides:revisions", kwargs={"pk": guide.id + 1})).status_code,
+            404
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("guides:revision_detail", kwargs={"pk": guide.id, "number": 2})
+            ).status_code,
+            404
+        )
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from guides import search
+from guides.models import Guide
+from . import INDEX_GUIDE_CONTEXT_NAME
+
+
+class GuideSearchTests(TestCase):
+    """
+    Scenario:
+        - 3 existing Guides, matching a term in different fields
+        - Anonymous user searches for guides
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+        cls.title_match = Guide.objects.create(
+            title="Writing decorators",
+            overview="test overview",
+            content="test guide content",
+            author=cls.author
+        )
+        cls.overview_match = Guide.objects.create(
+            title="Metaprogramming",
+            overview="Class decorators and metaclasses",
+            content="test guide content",
+            author=cls.author
+        )
+        cls.content_match = Guide.objects.create(
+            title="Flask basics",
+            overview="test overview",
+            content="Routes are registered with <b>decorators</b> such as `app.route`.",
+            author=cls.author
+        )
+
+    def test_results_are_ranked_by_field(self):
+        """
+        Matches in the title rank above matches in the
+        overview, which rank above matches in the content.
+        """
+
+        results = search.SearchResults("decorators")
+        self.assertEqual(results.count(), 3)
+        self.assertSequenceEqual(
+            results.seek(3), [self.title_match, self.overview_match, self.content_match]
+        )
+
+    def test_prefix_and_stem_match(self):
+        self.assertEqual(search.SearchResults("deco").count(), 3)
+        self.assertEqual(search.SearchResults("decorator").count(), 3)
+
+    def test_all_terms_must_match(self):
+        results = search.SearchResults("decorators flask")
+        self.assertSequenceEqual(results.seek(10), [self.content_match])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        guide, = search.SearchResults("route").seek(1)
+        self.assertIn("<mark>", guide.search_snippet)
+        self.assertIn("&lt;b&gt;", guide.search_snippet)
+        self.assertNotIn("<b>", guide.search_snippet)
+
+    def test_term_without_words_returns_nothing(self):
+        results = search.SearchResults('"*) OR (')
+        self.assertEqual(results.count(), 0)
+        self.assertSequenceEqual(results.seek(10), [])
+
+    def test_edited_guide_is_reindexed(self):
+        guide = Guide.objects.get(id=self.content_match.id)
+        guide.content = "Routes are registered with blueprints."
+        guide.save()
+        self.assertEqual(search.SearchResults("blueprints").count(), 1)
+        self.assertEqual(search.SearchResults("decorators").count(), 2)
+
+    def test_deleted_guide_is_removed_from_index(self):
+        Guide.objects.get(id=self.title_match.id).delete()
+        self.assertSequenceEqual(
+            search.SearchResults("decorators").seek(10), [self.overview_match, self.content_match]
+        )
+
+    def test_rebuild_command_restores_index(self):
+        with connection.cursor() as cursor:
+            search.get_backend(connection).drop(cursor)
+        call_command('rebuildsearchindex', stdout=StringIO())
+        self.assertEqual(search.SearchResults("decorators").count(), 3)
+
+    def test_index_view_shows_ranked_results(self):
+        resp = self.client.get(reverse("guides:index"), {'term': "decorators"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertSequenceEqual(
+            resp.context[INDEX_GUIDE_CONTEXT_NAME],
+            [self.title_match, self.overview_match, self.content_match]
+        )
+        self.assertContains(resp, "<mark>")
@@ -0,0 +1,190 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from guides import tags
+from guides.models import Guide, Tag
+
+
+@override_settings(DISCORD_GUILD_ID=55555)
+class GuideTagTests(TestCase):
+    """
+    Scenario:
+        - 3 existing Guides
+        - Member tags Guides while creating and editing them
+        - Anonymous user filters the guide list by tag
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testmember', password='testpass')
+        SocialAccount.objects.create(
+            user=cls.author,
+            uid=42,
+            extra_data={'guild': {'id': '55555', 'permissions': 0x63584C0}}
+        )
+        cls.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=cls.author
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def guide_data(self, tag_text):
+        return {
+            "title": "tagged guide",
+            "overview": "test overview",
+            "content": "test guide content",
+            "tags": tag_text,
+        }
+
+    def guide_counts(self) -> dict:
+        return dict(Tag.objects.values_list('slug', 'guide_count'))
+
+    def test_tag_names_are_parsed_and_matched_by_slug(self):
+        self.assertEqual(tags.parse_tags(" Python,  C++ , python, ,C#"), ["Python", "C++", "C#"])
+        self.assertEqual(
+            [tags.tag_slug(name) for name in ("Python", "C++", "C#", "C", "Web  Design")],
+            ["python", "cpp", "csharp", "c", "web-design"]
+        )
+
+        tags.set_tags(self.guides[0], ["Python"])
+        tags.set_tags(self.guides[1], ["python"])
+        self.assertEqual(Tag.objects.get().name, "Python")
+        self.assertEqual(self.guide_counts(), {'python': 2})
+
+    def test_counts_follow_tag_changes_and_deletion(self):
+        tags.set_tags(self.guides[0], ["Python", "Django"])
+        tags.set_tags(self.guides[1], ["Python"])
+        self.assertEqual(self.guide_counts(), {'python': 2, 'django': 1})
+
+        tags.set_tags(self.guides[0], ["Python", "Rust"])
+        self.assertEqual(self.guide_counts(), {'python': 2, 'django': 0, 'rust': 1})
+
+        Guide.objects.filter(id=self.guides[1].id).delete()
+        self.assertEqual(self.guide_counts(), {'python': 1, 'django': 0, 'rust': 1})
+        self.assertEqual(
+            [(tag.name, tag.guide_count) for tag in tags.facets()], [("Python", 1), ("Rust", 1)]
+        )
+
+    def test_unchanged_tags_write_nothing(self):
+        tags.set_tags(self.guides[0], ["Python"])
+        # Only the savepoint, the tags and the tags of the guide.
+        with self.assertNumQueries(4):
+            tags.set_tags(self.guides[0], ["python"])
+
+    def test_member_sets_tags_with_the_guide_form(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse("guides:create"), data=self.guide_data("Python, Django"))
+        guide = Guide.objects.get(title="tagged guide")
+        self.assertEqual(sorted(guide.tags.values_list('name', flat=True)), ["Django", "Python"])
+
+        resp = self.client.get(reverse("guides:edit", kwargs={"pk": guide.id}))
+        self.assertContains(resp, 'value="Django, Python"')
+
+        self.client.post(
+            reverse("guides:edit", kwargs={"pk": guide.id}), data=self.guide_data("Rust")
+        )
+        self.assertEqual(list(guide.tags.values_list('name', flat=True)), ["Rust"])
+        self.assertEqual(self.guide_counts(), {'python': 0, 'django': 0, 'rust': 1})
+
+        resp = self.client.get(reverse("guides:detail", kwargs={"pk": guide.id}))
+        self.assertContains(resp, f'{reverse("guides:index")}?tag=rust')
+
+    def test_form_rejects_too_many_and_too_long_tags(self):
+        self.client.force_login(self.author)
+        # The last tag is short enough, but its slug is not.
+        for text in ("a, b, c, d, e, f", "x" * 31, "C# F# Q# J# C# F# Q# J# x#"):
+            with self.subTest(tags=text):
+                resp = self.client.post(reverse("guides:create"), data=self.guide_data(text))
+                self.assertEqual(resp.status_code, 200)
+                self.assertTrue(resp.context['form'].errors['tags'])
+        self.assertFalse(Guide.objects.filter(title="tagged guide").exists())
+
+    def test_list_is_filtered_by_tag_and_shows_facets(self):
+        tags.set_tags(self.guides[0], ["Python"])
+        tags.set_tags(self.guides[2], ["Python", "Rust"])
+
+        resp = self.client.get(reverse("guides:index"), {'tag': 'python'})
+        self.assertEqual(
+            list(resp.context['latest_guides']), [self.guides[2], self.guides[0]]
+        )
+        self.assertContains(resp, 'Guides tagged "Python"')
+        self.assertContains(resp, "Rust (1)")
+        python = Tag.objects.get(slug='python')
+        self.assertIn(tags.tag_key(python.id), resp['Surrogate-Key'].split())
+
+        self.assertEqual(
+            self.client.get(reverse("guides:index"), {'tag': 'missing'}).status_code, 404
+        )
+
+    def test_tagged_list_is_sorted_by_the_listing_index(self):
+        for guide in self.guides:
+            tags.set_tags(guide, ["Python"])
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse("guides:index"), {'tag': 'python'})
+        self.assertEqual(list(resp.context['latest_guides']), self.guides[::-1])
+        listing = next(
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "guides_guide"."id"')
+        )
+        # The filter and sort keys share a single join of the tags.
+        self.assertEqual(listing.count('JOIN "guides_guidetag"'), 1)
+        self.assertIn('"guides_guidetag"."pub_datetime" AS "tagged_datetime"', listing)
+        self.assertIn('ORDER BY "tagged_datetime" DESC, "tagged_guide_id" DESC', listing)
+
+
+class TagFacetTests(TransactionTestCase):
+    """
+    Scenario:
+        - 2 existing Guides
+        - The Guides are tagged while the facets are listed
+    """
+
+    multi_db = True
+    # The groups created by migrations are kept.
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user('testauthor', password='testpass')
+        self.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=author
+            )
+            for number in range(2)
+        ]
+
+    def test_facets_are_cached_until_tags_change(self):
+        tags.set_tags(self.guides[0], ["Python"])
+        tags.facets()
+        with self.assertNumQueries(0):
+            tags.facets()
+
+        tags.set_tags(self.guides[1], ["Python"])
+        with self.assertNumQueries(1):
+            self.assertEqual(tags.facets()[0].guide_count, 2)
+
+    def test_facets_are_discarded_only_once_committed(self):
+        tags.facets()
+        with transaction.atomic():
+            tags.set_tags(self.guides[0], ["Python"])
+            with self.assertNumQueries(0):
+                self.assertEqual(tags.facets(), [])
+        self.assertEqual([tag.name for tag in tags.facets()], ["Python"])
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from guides import viewcounts
+from guides.models import Guide, GuidePopularity
+
+
+class GuideViewCountTests(TestCase):
+    """
+    Scenario:
+        - 3 existing Guides
+        - Anonymous users view Guides, and the views are flushed in batches
+        - Anonymous user visits the guide list showing the trending Guides
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('testauthor', password='testpass')
+        cls.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=cls.author
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        viewcounts.counter.clear()
+
+    def view(self, guide, times=1):
+        for _ in range(times):
+            self.client.get(reverse("guides:detail", kwargs={"pk": guide.id}))
+
+    def view_counts(self) -> dict:
+        return dict(GuidePopularity.objects.values_list('guide_id', 'view_count'))
+
+    def test_views_are_counted_in_memory_until_flushed(self):
+        self.view(self.guides[0], times=3)
+        self.view(self.guides[1])
+        self.assertEqual(self.view_counts(), {})
+
+        self.assertEqual(viewcounts.counter.flush(), 2)
+        self.assertEqual(self.view_counts(), {self.guides[0].id: 3, self.guides[1].id: 1})
+
+        self.view(self.guides[0])
+        viewcounts.counter.flush()
+        self.assertEqual(self.view_counts()[self.guides[0].id], 4)
+
+    def test_flushing_takes_the_same_queries_for_any_number_of_guides(self):
+        viewcounts.counter.record(self.guides[0].id)
+        viewcounts.counter.flush()
+        viewcounts.counter.record(self.guides[0].id)
+        with self.assertNumQueries(4) as one:
+            viewcounts.counter.flush()
+
+        for guide in self.guides:
+            viewcounts.counter.record(guide.id)
+        viewcounts.counter.flush()
+        for guide in self.guides:
+            viewcounts.counter.record(guide.id)
+        with self.assertNumQueries(len(one)):
+            viewcounts.counter.flush()
+
+    def test_views_of_missing_guides_are_dropped(self):
+        viewcounts.counter.record(self.guides[2].id + 100)
+        viewcounts.counter.flush()
+        self.assertEqual(self.view_counts(), {})
+
+    @override_settings(GUIDE_VIEWS_FLUSH_INTERVAL=0)
+    def test_due_views_are_flushed_after_the_response(self):
+        self.view(self.guides[2])
+        self.assertEqual(self.view_counts(), {self.guides[2].id: 1})
+
+    def test_recent_views_outweigh_older_views(self):
+        now = timezone.now()
+        viewcounts.store_views({self.guides[0].id: 10}, now - timedelta(days=5))
+        viewcounts.store_views({self.guides[1].id: 1}, now - timedelta(days=1))
+        viewcounts.store_views({self.guides[1].id: 1}, now)
+        self.assertEqual(
+            [popularity.guide_id for popularity in viewcounts.trending_guides()],
+            [self.guides[1].id, self.guides[0].id]
+        )
+
+    def test_guide_list_shows_trending_guides(self):
+        self.view(self.guides[1], times=2)
+        viewcounts.counter.flush()
+        resp = self.client.get(reverse("guides:index"))
+        self.assertContains(resp, "Trending Guides")
+        self.assertContains(resp, "2 views")
+        self.assertEqual(resp.context['trending_guides'][0].guide.title, "test guide 1")
+
+        resp = self.client.get(reverse("guides:index"), {'term': "guide"})
+        self.assertNotContains(resp, "Trending Guides")
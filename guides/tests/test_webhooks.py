@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from guides import webhooks
+from guides.models import Guide, WebhookMessage
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """Answers every request with the next queued `(status, headers)` pair of the server."""
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.server.received.append(json.loads(self.rfile.read(length)))
+        status, headers = self.server.responses.pop(0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboxWorkerTests(TestCase):
+    """
+    Scenario:
+        - A local HTTP server stands in for the Discord webhook endpoint
+        - Messages in the outbox are delivered by the outbox worker
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/webhook'
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.received = []
+        self.server.responses = []
+        self.sleeps = []
+        self.worker = webhooks.OutboxWorker(sleep=self.sleeps.append)
+
+    def test_delivered_messages_are_removed(self):
+        self.server.responses = [(204, {}), (204, {})]
+        webhooks.enqueue(self.url, {'content': "first"})
+        webhooks.enqueue(self.url, {'content': "second"})
+
+        self.assertEqual(self.worker.drain(), 2)
+        self.assertEqual(self.server.received, [{'content': "first"}, {'content': "second"}])
+        self.assertFalse(WebhookMessage.objects.exists())
+
+    def test_server_errors_are_retried_with_backoff(self):
+        self.server.responses = [(502, {})]
+        webhooks.enqueue(self.url, {'content': "retry me"})
+
+        before = timezone.now()
+        self.assertEqual(self.worker.run_once(), 1)
+        message = WebhookMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreaterEqual(
+            message.next_attempt_datetime, before + timedelta(seconds=webhooks.RETRY_BASE_SECONDS)
+        )
+        # The message is not due yet, so it is not attempted again.
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_retry_delay_doubles_up_to_maximum(self):
+        self.assertEqual(webhooks.retry_delay(1), timedelta(seconds=webhooks.RETRY_BASE_SECONDS))
+        self.assertEqual(
+            webhooks.retry_delay(3), timedelta(seconds=webhooks.RETRY_BASE_SECONDS * 4)
+        )
+        self.assertEqual(webhooks.retry_delay(50), timedelta(seconds=webhooks.RETRY_MAX_SECONDS))
+
+    def test_message_is_dropped_after_max_attempts(self):
+        self.server.responses = [(500, {})]
+        message = webhooks.enqueue(self.url, {'content': "doomed"})
+        message.attempts = webhooks.MAX_ATTEMPTS - 1
+        message.save()
+
+        with self.assertLogs('guides.webhooks', 'ERROR'):
+            self.worker.run_once()
+        self.assertFalse(WebhookMessage.objects.exists())
+
+    def test_rate_limited_message_waits_without_counting_attempt(self):
+        self.server.responses = [(429, {'Retry-After': '30'})]
+        webhooks.enqueue(self.url, {'content': "later"})
+
+        self.worker.run_once()
+        message = WebhookMessage.objects.get()
+        self.assertEqual(message.attempts, 0)
+        self.assertGreater(message.next_attempt_datetime, timezone.now() + timedelta(seconds=25))
+
+    def test_malformed_rate_limit_headers_wait_the_base_delay(self):
+        self.server.responses = [
+            (429, {'Retry-After': 'soon'}),
+            (204, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': 'inf'}),
+        ]
+        webhooks.enqueue(self.url, {'content': "later"})
+
+        self.worker.run_once()
+        message = WebhookMessage.objects.get()
+        self.assertEqual(message.attempts, 0)
+        self.assertGreater(message.next_attempt_datetime, timezone.now())
+
+        WebhookMessage.objects.update(next_attempt_datetime=timezone.now())
+        self.worker.blocked_until.clear()
+        self.worker.run_once()
+        self.assertFalse(WebhookMessage.objects.exists())
+        self.assertLessEqual(
+            self.worker.blocked_until[self.url] - time.monotonic(), webhooks.RETRY_BASE_SECONDS
+        )
+
+    def test_exhausted_rate_limit_bucket_delays_next_request(self):
+        self.server.responses = [
+            (204, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '2.5'}),
+            (204, {}),
+        ]
+        webhooks.enqueue(self.url, {'content': "first"})
+        webhooks.enqueue(self.url, {'content': "second"})
+
+        self.worker.drain()
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertGreater(self.sleeps[0], 2)
+        self.assertEqual(len(self.server.received), 2)
+
+
+@override_settings(DISCORD_GUILD_ID=55555, DISCORD_WEBHOOK_URL='http://127.0.0.1:9/webhook')
+class GuideCreationWebhookTests(TestCase):
+    """
+    Scenario:
+        - A webhook URL is configured
+        - Member creates a guide
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testmember', password='testpass')
+        cls.social_account = SocialAccount.objects.create(
+            user=cls.user,
+            uid=42,
+            provider='discoauth',
+            extra_data={
+                'guild': {'id': '55555', 'permissions': 0x63584C0},
+                'id': '42',
+                'username': 'testmember',
+                'avatar': 'abcdef',
+            }
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_guide_creation_queues_announcement(self):
+        resp = self.client.post(
+            reverse("guides:create"),
+            data={"title": "test guide", "overview": "test overview", "content": "test content"}
+        )
+        self.assertEqual(resp.status_code, 302)
+
+        guide = Guide.objects.get()
+        message = WebhookMessage.objects.get()
+        self.assertEqual(message.url, 'http://127.0.0.1:9/webhook')
+
+        embed, = json.loads(message.payload)['embeds']
+        self.assertEqual(embed['title'], 'New Guide posted: "test guide"')
+        self.assertEqual(embed['author']['name'], 'testmember')
+        self.assertIn(reverse("guides:detail", kwargs={"pk": guide.id}), embed['url'])
@@ -1,16 +1,28 @@
 from django.urls import path
 
 from . import views
-from .feeds import LatestGuidesAtomFeed, LatestGuidesRSSFeed
+from .feeds import (
+    AuthorGuidesAtomFeed, AuthorGuidesRSSFeed, LatestGuidesAtomFeed, LatestGuidesRSSFeed
+)
 
 
 app_name = "guides"
 urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
     path("create", views.CreateView.as_view(), name="create"),
+    path("autocomplete", views.AutocompleteView.as_view(), name="autocomplete"),
+    path("preview", views.PreviewView.as_view(), name="preview"),
     path("<int:pk>", views.DetailView.as_view(), name="detail"),
     path("<int:pk>/edit", views.EditView.as_view(), name="edit"),
     path("<int:pk>/delete", views.DeleteView.as_view(), name="delete"),
+    path("<int:pk>/revisions", views.RevisionListView.as_view(), name="revisions"),
+    path(
+        "<int:pk>/revisions/<int:number>",
+        views.RevisionDetailView.as_view(),
+        name="revision_detail"
+    ),
     path("feed/atom", LatestGuidesAtomFeed(), name="feed_atom"),
     path("feed/rss", LatestGuidesRSSFeed(), name="feed_rss"),
+    path("feed/author/<int:uid>/atom", AuthorGuidesAtomFeed(), name="feed_author_atom"),
+    path("feed/author/<int:uid>/rss", AuthorGuidesRSSFeed(), name="feed_author_rss"),
 ]
@@ -0,0 +1,175 @@
+"""
+Buffered counting of guide views, and the trending guides.
+
+Every worker process counts the views of guides in memory, and writes
+them to `GuidePopularity` in one batch at most every
+`GUIDE_VIEWS_FLUSH_INTERVAL` seconds, after the response of a request
+was sent. Views counted since the last write are lost if the process
+exits.
+
+Views lose half their weight every `TRENDING_HALF_LIFE` seconds. As the
+weights of all views decay at the same rate, the guides can be ranked
+by their views weighted relative to a fixed `EPOCH` instead of to the
+current time, which only changes when a guide is viewed again. These
+weights grow exponentially with time, so their logarithm is stored as
+the `trending_score`, and the trending guides are read with a single
+query on its index.
+"""
+
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, FloatField, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .models import Guide, GuidePopularity
+
+
+log = logging.getLogger(__name__)
+
+# Seconds after which a view only counts half as much for trending.
+TRENDING_HALF_LIFE = 60 * 60 * 24
+
+DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE
+
+EPOCH = datetime(2018, 1, 1, tzinfo=timezone.utc)
+
+# The number of guides in the trending list.
+TRENDING_GUIDES = 5
+
+# Seconds the trending guides are cached for, and a reverse proxy may show them for.
+TRENDING_CACHE_TIMEOUT = 60
+TRENDING_MAX_AGE = 60 * 5
+
+TRENDING_CACHE_KEY = 'guides:trending'
+
+
+def view_score(views: int, when: datetime) -> float:
+    """Return the trending score of the given number of views at the given time."""
+
+    return math.log(views) + DECAY_RATE * (when - EPOCH).total_seconds()
+
+
+def add_scores(first: float, second: float) -> float:
+    """Return the score of the views of two scores together, `log(exp(first) + exp(second))`."""
+
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def store_views(counts: dict, when: datetime, using='default'):
+    """Add the given numbers of views by guide ID, viewed at `when`, to their popularity."""
+
+    with transaction.atomic(using=using):
+        scores = dict(
+            GuidePopularity.objects.using(using)
+            .select_for_update()
+            .filter(guide_id__in=counts)
+            .values_list('guide_id', 'trending_score')
+        )
+        if scores:
+            GuidePopularity.objects.using(using).filter(guide_id__in=scores).update(
+                view_count=F('view_count') + Case(
+                    *(
+                        When(guide_id=guide_id, then=Value(counts[guide_id]))
+                        for guide_id in scores
+                    ),
+                    output_field=PositiveIntegerField()
+                ),
+                trending_score=Case(
+                    *(
+                        When(
+                            guide_id=guide_id,
+                            then=Value(add_scores(score, view_score(counts[guide_id], when)))
+                        )
+                        for guide_id, score in scores.items()
+                    ),
+                    output_field=FloatField()
+                )
+            )
+
+        # Views of guides deleted in the meantime are dropped.
+        new_ids = Guide.objects.using(using).filter(
+            id__in=[guide_id for guide_id in counts if guide_id not in scores]
+        ).values_list('id', flat=True)
+        GuidePopularity.objects.using(using).bulk_create(
+            GuidePopularity(
+                guide_id=guide_id,
+                view_count=counts[guide_id],
+                trending_score=view_score(counts[guide_id], when)
+            )
+            for guide_id in new_ids
+        )
+
+
+class ViewCounter:
+    """Counts guide views in memory until they are flushed to the database. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._flushed_at = timezone.now()
+
+    def record(self, guide_id: int, views=1):
+        with self._lock:
+            self._pending[guide_id] += views
+
+    def clear(self):
+        """Forget the views counted so far."""
+
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self, using='default') -> int:
+        """Store the views counted so far, and return how many guides were viewed."""
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = timezone.now()
+        if not pending:
+            return 0
+
+        try:
+            store_views(pending, self._flushed_at, using)
+        except DatabaseError:
+            log.exception("Could not store the views of %d guides.", len(pending))
+            # Keep the views for the next attempt.
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        return len(pending)
+
+    def flush_if_due(self, using='default') -> int:
+        """Flush the counted views if the last flush was `GUIDE_VIEWS_FLUSH_INTERVAL` ago."""
+
+        interval = settings.GUIDE_VIEWS_FLUSH_INTERVAL
+        if interval is None or (timezone.now() - self._flushed_at).total_seconds() < interval:
+            return 0
+        return self.flush(using)
+
+
+counter = ViewCounter()
+
+
+def record_view(guide_id):
+    counter.record(int(guide_id))
+
+
+def trending_guides() -> list:
+    """Return the `GuidePopularity` of the most trending guides, along with each guide's title."""
+
+    trending = cache.get(TRENDING_CACHE_KEY)
+    if trending is None:
+        trending = list(
+            GuidePopularity.objects.select_related('guide')
+            .only('view_count', 'trending_score', 'guide__id', 'guide__title')
+            .order_by('-trending_score')[:TRENDING_GUIDES]
+        )
+        cache.set(TRENDING_CACHE_KEY, trending, TRENDING_CACHE_TIMEOUT)
+    return trending
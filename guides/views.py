@@ -1,14 +1,27 @@
-import requests
 from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
 from django.contrib import messages
-from django.http import HttpResponseRedirect
-from django.shortcuts import reverse
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, reverse
 from django.urls import reverse_lazy
+from django.utils.safestring import mark_safe
 from django.views import generic
 from guardian.mixins import PermissionRequiredMixin
 
-from .models import Guide
+from website import preview
+from website.converters import RenderError, markdownify
+from . import (
+    autocomplete, httpcache, pagecache, permissions, revisions, tags, viewcounts, webhooks
+)
+from .forms import GuideForm
+from .models import Guide, GuideRevision, Tag
+from .pagination import KeysetPaginator
+from .search import SearchResults
 
 
 class IndexView(generic.ListView):
@@ -16,23 +29,240 @@ class IndexView(generic.ListView):
     model = Guide
     paginate_by = 10
 
+    # Guides with a tag are sorted by the columns of the tag's listing index.
+    ordering = ('-pub_datetime', '-id')
+    tag_ordering = ('-tagged_datetime', '-tagged_guide_id')
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.tag_ordering if self.tag is not None else self.ordering
+        paginator = KeysetPaginator(queryset, page_size, ordering=ordering)
+        try:
+            page = paginator.page(
+                after=self.request.GET.get('after'), before=self.request.GET.get('before')
+            )
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get(self, request, *args, **kwargs):
+        return httpcache.conditional_response(request, super().get(request, *args, **kwargs))
+
     def get_queryset(self):
         term = self.request.GET.get('term')
-        if not term:
-            guides = self.model.objects.all()
+        slug = self.request.GET.get('tag')
+        self.tag = None
+        if term:
+            guides = SearchResults(term)
+        elif slug:
+            self.tag = get_object_or_404(Tag, slug=slug)
+            # The annotations reuse the join of the filter.
+            guides = self.model.objects.for_listing().filter(guide_tags__tag=self.tag).annotate(
+                tagged_datetime=F('guide_tags__pub_datetime'),
+                tagged_guide_id=F('guide_tags__guide_id')
+            )
         else:
-            guides = self.model.objects.filter(title__icontains=term)
+            guides = self.model.objects.for_listing()
         return guides
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['term'] = self.request.GET.get('term', '')
+        context['tag'] = self.tag
+        context['tag_facets'] = tags.facets()
+        if not self.request.GET:
+            context['trending_guides'] = viewcounts.trending_guides()
+
+        # Anonymous users are not given permissions on guides, and for everyone
+        # else the object permissions of all listed guides are loaded at once.
+        user = self.request.user
+        if user.is_authenticated:
+            can_change_guides = user.has_perm('guides.change_guide')
+            can_delete_guides = user.has_perm('guides.delete_guide')
+            permissions.prefetch_permissions(user, context['latest_guides'])
+            for guide in context['latest_guides']:
+                guide.can_change = can_change_guides or user.has_perm('guides.change_guide', guide)
+                guide.can_delete = can_delete_guides or user.has_perm('guides.delete_guide', guide)
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        guides = context['latest_guides']
+        page = context['page_obj']
+        trending = context.get('trending_guides', ())
+        keys = [httpcache.GUIDE_LIST_KEY] + [httpcache.guide_key(guide.id) for guide in guides]
+        if self.tag is not None:
+            keys.append(tags.tag_key(self.tag.id))
+        # The links to neighbouring pages depend on the guides outside of the page.
+        return httpcache.add_headers(
+            self.request,
+            response,
+            etag=httpcache.make_etag(
+                page.has_previous(),
+                page.has_next(),
+                *(f'{guide.id}@{guide.edit_datetime.isoformat()}' for guide in guides),
+                *(f'{popularity.guide_id}:{popularity.view_count}' for popularity in trending),
+                *(f'{tag.slug}:{tag.guide_count}' for tag in context['tag_facets'])
+            ),
+            last_modified=max((guide.edit_datetime for guide in guides), default=None),
+            keys=keys,
+            # Trending guides change with views, which purge nothing.
+            max_age=viewcounts.TRENDING_MAX_AGE if trending else httpcache.SURROGATE_MAX_AGE
+        )
+
+
+class AutocompleteView(generic.View):
+    """Completes the search term in the `term` parameter to matching guide titles."""
+
+    def get(self, request, *args, **kwargs):
+        results = [
+            {
+                'id': guide_id,
+                'title': title,
+                'url': reverse("guides:detail", kwargs={"pk": guide_id}),
+            }
+            for guide_id, title in autocomplete.complete(request.GET.get('term', ''))
+        ]
+        return JsonResponse({'results': results})
+
+
+class PreviewView(generic.View):
+    """
+    Renders the markdown in the `content` parameter for the preview of the guide form.
+
+    Rendering takes CPU time, so only signed in users can render previews.
+    """
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise PermissionDenied
+        return JsonResponse({'html': preview.render_preview(request.POST.get('content', ''))})
+
 
 class DetailView(generic.DetailView):
     model = Guide
 
+    def get(self, request, *args, **kwargs):
+        if not httpcache.is_snapshot_request(request):
+            viewcounts.record_view(self.kwargs['pk'])
+        if not pagecache.is_anonymous_request(request):
+            return httpcache.conditional_response(request, super().get(request, *args, **kwargs))
+
+        key = pagecache.response_key(self.kwargs['pk'])
+        response = cache.get(key)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, rendered, pagecache.DETAIL_CACHE_TIMEOUT)
+            )
+        # Cached responses keep their validators, so checking them needs no query.
+        return httpcache.conditional_response(request, response)
+
+    def get_queryset(self):
+        return self.model.objects.with_author().with_outline()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = self.request.user
+        if user.is_authenticated:
+            permissions.prefetch_permissions(user, [self.object])
+        can_change = user.is_authenticated and (
+            user.has_perm('guides.change_guide')
+            or user.has_perm('guides.change_guide', self.object)
+        )
+        audience = pagecache.audience(user, self.object, can_change)
+
+        context['can_change'] = audience in (pagecache.AUTHOR, pagecache.EDITOR)
+        context['show_invite'] = audience in (pagecache.ANONYMOUS, pagecache.GUEST)
+        context['audience'] = audience
+        # Only evaluated when the cached page fragment has to be rendered again.
+        context['related_guides'] = (
+            Guide.objects.filter(related_by__guide_id=self.object.id)
+            .order_by('related_by__rank')
+            .only('id', 'title', 'overview')
+        )
+        context['cache_version'] = pagecache.cache_version(self.object.id)
+        context['cache_timeout'] = pagecache.DETAIL_CACHE_TIMEOUT
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        guide = self.object
+        # The cache version changes along with the author, permissions and related guides.
+        return httpcache.add_headers(
+            self.request,
+            response,
+            etag=httpcache.make_etag(
+                guide.id, guide.edit_datetime.isoformat(), context['cache_version']
+            ),
+            last_modified=guide.edit_datetime,
+            keys=[httpcache.guide_key(guide.id)]
+        )
+
 
-class CreateView(PermissionRequiredMixin, generic.CreateView):
-    fields = ('title', 'overview', 'content')
+class RevisionListView(generic.ListView):
+    context_object_name = "revisions"
+    paginate_by = 20
+    template_name = "guides/guiderevision_list.html"
+
+    def get_queryset(self):
+        self.guide = get_object_or_404(Guide.objects.only('id', 'title'), pk=self.kwargs['pk'])
+        # The stored content is not needed to list the revisions.
+        return self.guide.revisions.select_related('editor').defer('data')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['guide'] = self.guide
+        return context
+
+
+class RevisionDetailView(generic.DetailView):
+    context_object_name = "revision"
+    template_name = "guides/guiderevision_detail.html"
+
+    def get_object(self, queryset=None):
+        return get_object_or_404(
+            GuideRevision.objects.select_related('guide', 'editor'),
+            guide_id=self.kwargs['pk'],
+            number=self.kwargs['number']
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['content'] = mark_safe(markdownify(revisions.revision_content(self.object)))
+        return context
+
+
+class GuidePermissionRequiredMixin(PermissionRequiredMixin):
+    """
+    Checks the permissions on the guide of the view with a single query,
+    and keeps the guide fetched for the check instead of fetching it again.
+    """
+
+    def get_object(self, queryset=None):
+        if getattr(self, '_guide', None) is None:
+            self._guide = super().get_object(queryset)
+        return self._guide
+
+    def get_permission_object(self):
+        guide = self.get_object()
+        permissions.prefetch_permissions(self.request.user, [guide])
+        return guide
+
+
+class GuideFormMixin:
+    """Shows the form again if the content could not be rendered, instead of saving the guide."""
+
+    form_class = GuideForm
     model = Guide
 
+    def render_failed(self, form):
+        form.add_error(
+            'content', "Your guide could not be rendered right now. Please try again in a moment."
+        )
+        return self.form_invalid(form)
+
+
+class CreateView(PermissionRequiredMixin, GuideFormMixin, generic.CreateView):
     permission_required = 'guides.add_guide'
     permission_object = None
     return_403 = True
@@ -40,38 +270,29 @@ class CreateView(PermissionRequiredMixin, generic.CreateView):
     def form_valid(self, form):
         guide = form.save(commit=False)
         guide.author = self.request.user
-        guide.save()
 
-        detail_url = self.request.build_absolute_uri(
-            reverse("guides:detail", kwargs={"pk": guide.id})
-        )
-        if settings.DISCORD_WEBHOOK_URL is not None and not settings.IS_TESTING:
-            discord_user = SocialAccount.objects.filter(user=self.request.user).first()
-            if discord_user is not None:
-                requests.post(
-                    settings.DISCORD_WEBHOOK_URL,
-                    json={
-                        "embeds": [
-                            {
-                                "title": f'New Guide posted: "{guide.title}"',
-                                "author": {
-                                    "name": discord_user.extra_data['username'],
-                                    "icon_url": discord_user.get_avatar_url()
-                                },
-                                "url": detail_url,
-                                "description": guide.overview,
-                                "color": 0x0066CC
-                            }
-                        ]
-                    }
+        try:
+            with transaction.atomic():
+                guide.save()
+                form.save_m2m()
+                revisions.record_revision(guide, editor=self.request.user)
+
+                detail_url = self.request.build_absolute_uri(
+                    reverse("guides:detail", kwargs={"pk": guide.id})
                 )
+                if settings.DISCORD_WEBHOOK_URL is not None:
+                    discord_user = SocialAccount.objects.filter(user=self.request.user).first()
+                    if discord_user is not None:
+                        webhooks.enqueue(
+                            settings.DISCORD_WEBHOOK_URL,
+                            webhooks.guide_created_payload(guide, discord_user, detail_url)
+                        )
+        except RenderError:
+            return self.render_failed(form)
         return HttpResponseRedirect(detail_url)
 
 
-class EditView(PermissionRequiredMixin, generic.UpdateView):
-    fields = ('title', 'overview', 'content')
-    model = Guide
-
+class EditView(GuidePermissionRequiredMixin, GuideFormMixin, generic.UpdateView):
     permission_required = 'guides.change_guide'
     accept_global_perms = True
     return_403 = True
@@ -80,14 +301,19 @@ class EditView(PermissionRequiredMixin, generic.UpdateView):
         return reverse("guides:detail", kwargs={"pk": self.object.id})
 
     def form_valid(self, form):
-        super().form_valid(form)
+        try:
+            with transaction.atomic():
+                super().form_valid(form)
+                revisions.record_revision(self.object, editor=self.request.user)
+        except RenderError:
+            return self.render_failed(form)
         detail_url = self.request.build_absolute_uri(
             reverse("guides:detail", kwargs={"pk": self.object.id})
         )
         return HttpResponseRedirect(detail_url)
 
 
-class DeleteView(PermissionRequiredMixin, generic.DeleteView):
+class DeleteView(GuidePermissionRequiredMixin, generic.DeleteView):
     model = Guide
     success_message = 'The guide "{}" was deleted successfully.'
     success_url = reverse_lazy("guides:index")
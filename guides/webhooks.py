@@ -0,0 +1,186 @@
+"""
+Delivery of webhook requests through an outbox table.
+
+Views never talk to webhook endpoints themselves. Instead, they
+enqueue a `WebhookMessage` in the same transaction as the change
+it announces, and the `sendwebhooks` management command delivers
+queued messages in batches, retrying failed deliveries with
+exponential backoff and honouring Discord's rate limit headers.
+The worker assumes that it is the only one draining the outbox.
+"""
+
+import json
+import logging
+import math
+import time
+from datetime import timedelta
+
+import requests
+from django.utils import timezone
+
+from .models import WebhookMessage
+
+
+log = logging.getLogger(__name__)
+
+# How many messages are fetched from the outbox at once.
+BATCH_SIZE = 20
+
+# Seconds to wait for the webhook endpoint to connect and to respond.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Retry delays start at `RETRY_BASE_SECONDS` and double for every
+# failed attempt, up to `RETRY_MAX_SECONDS`. A message that still
+# failed after `MAX_ATTEMPTS` deliveries is dropped.
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 60 * 60
+MAX_ATTEMPTS = 12
+
+
+def enqueue(url: str, payload: dict) -> WebhookMessage:
+    """Queue `payload` for delivery to `url` as part of the current transaction."""
+
+    return WebhookMessage.objects.create(url=url, payload=json.dumps(payload))
+
+
+def guide_created_payload(guide, discord_user, detail_url: str) -> dict:
+    """Build the Discord embed that announces a newly published guide."""
+
+    return {
+        "embeds": [
+            {
+                "title": f'New Guide posted: "{guide.title}"',
+                "author": {
+                    "name": discord_user.extra_data['username'],
+                    "icon_url": discord_user.get_avatar_url()
+                },
+                "url": detail_url,
+                "description": guide.overview,
+                "color": 0x0066CC
+            }
+        ]
+    }
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Return how long to wait before retrying a message that failed `attempts` times."""
+
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def header_seconds(value: str) -> float:
+    """Parse seconds sent by Discord, falling back to `RETRY_BASE_SECONDS` if malformed."""
+
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return float(RETRY_BASE_SECONDS)
+    if not math.isfinite(seconds):
+        return float(RETRY_BASE_SECONDS)
+    return min(max(seconds, 0.0), float(RETRY_MAX_SECONDS))
+
+
+def rate_limit_delay(response) -> float:
+    """
+    Return the number of seconds Discord asks us to wait before
+    the next request to the endpoint that sent `response`, if any.
+
+    Discord reports the time until its rate limit bucket resets in
+    `X-RateLimit-Reset-After`, and only sends it along with the
+    number of remaining requests in `X-RateLimit-Remaining`.
+    Rate limited responses additionally carry `Retry-After`.
+    """
+
+    headers = response.headers
+    if response.status_code == 429:
+        for header in ('X-RateLimit-Reset-After', 'Retry-After'):
+            if header in headers:
+                return header_seconds(headers[header])
+        return float(RETRY_BASE_SECONDS)
+
+    if headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset-After' in headers:
+        return header_seconds(headers['X-RateLimit-Reset-After'])
+    return 0.0
+
+
+class OutboxWorker:
+    """Delivers queued `WebhookMessage`s."""
+
+    def __init__(self, session=None, batch_size=BATCH_SIZE, sleep=time.sleep):
+        self.session = session or requests.Session()
+        self.batch_size = batch_size
+        self.sleep = sleep
+        # Maps webhook URLs to the `time.monotonic()` at
+        # which we may send requests to them again.
+        self.blocked_until = {}
+
+    def run_once(self) -> int:
+        """Attempt to deliver a single batch of due messages, and return its size."""
+
+        batch = list(
+            WebhookMessage.objects.filter(next_attempt_datetime__lte=timezone.now())
+            [:self.batch_size]
+        )
+        for message in batch:
+            self.deliver(message)
+        return len(batch)
+
+    def drain(self) -> int:
+        """Deliver due messages until none are left, and return how many were processed."""
+
+        total = 0
+        processed = self.run_once()
+        while processed:
+            total += processed
+            processed = self.run_once()
+        return total
+
+    def deliver(self, message: WebhookMessage):
+        wait = self.blocked_until.get(message.url, 0) - time.monotonic()
+        if wait > 0:
+            self.sleep(wait)
+
+        try:
+            response = self.session.post(
+                message.url,
+                data=message.payload,
+                headers={'Content-Type': 'application/json'},
+                timeout=REQUEST_TIMEOUT
+            )
+        except requests.RequestException as err:
+            self.reschedule(message, str(err))
+            return
+
+        delay = rate_limit_delay(response)
+        if delay:
+            self.blocked_until[message.url] = time.monotonic() + delay
+
+        if response.status_code == 429:
+            # Being rate limited is not the message's fault, so it does not count as an attempt.
+            message.next_attempt_datetime = timezone.now() + timedelta(seconds=delay)
+            message.last_error = "Rate limited"
+            message.save(update_fields=('next_attempt_datetime', 'last_error'))
+        elif response.ok:
+            message.delete()
+        elif 400 <= response.status_code < 500:
+            log.error(
+                "Dropping webhook message %d, %s responded with %d: %s",
+                message.id, message.url, response.status_code, response.text
+            )
+            message.delete()
+        else:
+            self.reschedule(message, f"HTTP {response.status_code}: {response.text}")
+
+    def reschedule(self, message: WebhookMessage, error: str):
+        message.attempts += 1
+        if message.attempts >= MAX_ATTEMPTS:
+            log.error(
+                "Dropping webhook message %d after %d failed attempts, last error: %s",
+                message.id, message.attempts, error
+            )
+            message.delete()
+            return
+
+        message.next_attempt_datetime = timezone.now() + retry_delay(message.attempts)
+        message.last_error = error
+        message.save(update_fields=('attempts', 'next_attempt_datetime', 'last_error'))
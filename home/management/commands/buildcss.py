@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website import stylesheets
+
+
+STATIC_CSS_DIR = settings.PROJECT_DIR / 'static' / 'css'
+TEMPLATES_DIR = settings.PROJECT_DIR / 'templates'
+
+KUBE_STYLESHEET = STATIC_CSS_DIR / 'kube.css'
+BASE_STYLESHEET = STATIC_CSS_DIR / 'base.css'
+PURGED_STYLESHEET = STATIC_CSS_DIR / 'kube.purged.css'
+BASE_TEMPLATE = TEMPLATES_DIR / 'base.html'
+CRITICAL_TEMPLATE = TEMPLATES_DIR / 'critical_css.html'
+
+PURGED_HEADER = "/* Generated by `python manage.py buildcss` from kube.css, do not edit. */\n"
+CRITICAL_HEADER = (
+    "{# Generated by `python manage.py buildcss` from base.css and kube.css, do not edit. #}\n"
+)
+
+
+def read(path) -> str:
+    return path.read_text(encoding='utf-8')
+
+
+def source_words() -> set:
+    """Return the words of all templates and scripts, and the classes of messages."""
+
+    paths = [
+        path for path in settings.BASE_DIR.glob('*/templates/**/*.html')
+        if path != CRITICAL_TEMPLATE
+    ]
+    paths.extend(settings.BASE_DIR.glob('*/static/**/*.js'))
+    # Messages are shown with these classes, which no template names literally.
+    return stylesheets.used_words(read(path) for path in paths) | {
+        tag for tag in settings.MESSAGE_TAGS.values() if tag
+    }
+
+
+def build() -> dict:
+    """Return the contents of every generated file by its path."""
+
+    words = source_words()
+    purged = stylesheets.purge(read(KUBE_STYLESHEET), words)
+    # The base stylesheet is small and styles the frame of every page, so
+    # it is inlined in full, followed by the Kube rules the frame needs.
+    inlined = stylesheets.serialize(stylesheets.parse(read(BASE_STYLESHEET))) + (
+        stylesheets.critical(purged, read(BASE_TEMPLATE), words=settings.MESSAGE_TAGS.values())
+    )
+    return {
+        PURGED_STYLESHEET: PURGED_HEADER + purged,
+        CRITICAL_TEMPLATE: (
+            f"{CRITICAL_HEADER}<style>{{% verbatim %}}\n{inlined}{{% endverbatim %}}</style>\n"
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the Kube stylesheet without the rules unused by any template, "
+        "and the critical CSS inlined into every page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Fail instead of writing anything if the generated files are out of date."
+        )
+
+    def handle(self, *args, **options):
+        outputs = build()
+        outdated = [
+            path for path, content in outputs.items()
+            if not path.exists() or read(path) != content
+        ]
+        if options['check']:
+            if outdated:
+                raise CommandError(
+                    "Out of date, run `python manage.py buildcss`: "
+                    + ", ".join(path.name for path in outdated)
+                )
+            self.stdout.write(self.style.SUCCESS("The generated stylesheets are up to date."))
+            return
+
+        for path in outdated:
+            path.write_text(outputs[path], encoding='utf-8')
+        original = KUBE_STYLESHEET.stat().st_size
+        purged = len(outputs[PURGED_STYLESHEET].encode('utf-8'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged kube.css from {original} to {purged} bytes, "
+            f"inlining {len(outputs[CRITICAL_TEMPLATE].encode('utf-8'))} bytes of critical CSS."
+        ))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from website import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the pages shown to visitors without a session to `SNAPSHOT_ROOT`, "
+        "for the web server to send directly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--members',
+            action='store_true',
+            help=(
+                "Only write the home page if the number of members changed, "
+                "and the guide list if the trending guides changed."
+            )
+        )
+
+    def handle(self, *args, **options):
+        if not snapshots.is_enabled():
+            raise CommandError("Set `SNAPSHOT_ROOT` to the directory to write the pages to.")
+
+        handler = snapshots.SnapshotHandler()
+        if options['members']:
+            if snapshots.write_home(handler):
+                self.stdout.write(self.style.SUCCESS("Wrote the home page."))
+            else:
+                self.stdout.write("The number of members did not change.")
+            if snapshots.write_trending(handler):
+                self.stdout.write(self.style.SUCCESS("Wrote the guide list."))
+            else:
+                self.stdout.write("The trending guides did not change.")
+            return
+
+        snapshots.write_home(handler, force=True)
+        snapshots.write_trending(handler, force=True)
+        paths = [path for path in snapshots.guide_paths() if path != reverse("guides:index")]
+        written = snapshots.write_pages(paths, handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote the home page, the guide list and {written} of {len(paths)} other guide pages "
+            f"to {settings.SNAPSHOT_ROOT}."
+        ))
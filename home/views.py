@@ -4,12 +4,16 @@ from django.views import generic
 from stats.models import GuildMembership
 
 
+def member_count() -> int:
+    return GuildMembership.objects.using("stats").filter(
+        guild_id=settings.DISCORD_GUILD_ID, is_member=True
+    ).count()
+
+
 class IndexView(generic.TemplateView):
     template_name = "home/index.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["total_members"] = GuildMembership.objects.using("stats").filter(
-            guild_id=settings.DISCORD_GUILD_ID, is_member=True
-        ).count()
+        context["total_members"] = member_count()
         return context
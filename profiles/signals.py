@@ -1,7 +1,10 @@
+from allauth.socialaccount.models import SocialAccount
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from guides import feeds
+from website import sitemaps
 from .models import RestrictProcessing
 
 
@@ -14,3 +17,17 @@ def user_post_save(sender, instance, created, **kwargs):
 
     if created:
         RestrictProcessing.objects.create(user=instance)
+
+
+@receiver(post_save, sender=RestrictProcessing)
+@receiver(post_save, sender=SocialAccount)
+@receiver(post_delete, sender=SocialAccount)
+def profile_visibility_changed(sender, instance, **kwargs):
+    """Called when a profile is added, removed, or hidden from other users.
+
+    Discards the cached sitemaps, which list the visible profiles,
+    and the cached feeds, which include the feeds of visible authors.
+    """
+
+    sitemaps.invalidate_sitemaps()
+    feeds.invalidate_feeds()
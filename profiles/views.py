@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404
 from django.urls import reverse, reverse_lazy
 from django.views import generic
 
+from guides.models import Guide
 from .models import RestrictProcessing
 
 
@@ -15,8 +16,21 @@ class ProfileDetailView(UserPassesTestMixin, generic.DetailView):
     raise_exception = True
 
     def get_object(self, queryset=None):
-        social_account_id = self.kwargs['pk']
-        return get_object_or_404(SocialAccount, uid=social_account_id)
+        # The object is needed by both `test_func` and `get`, so only look it up once.
+        if not hasattr(self, '_social_account'):
+            self._social_account = get_object_or_404(
+                SocialAccount.objects.select_related('user__restrictprocessing'),
+                uid=self.kwargs['pk']
+            )
+        return self._social_account
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['guides'] = (
+            Guide.objects.filter(author=self.object.user)
+            .only('id', 'title', 'pub_datetime')
+        )
+        return context
 
     def test_func(self):
         """Test function used by `UserPassesTestMixin`.
@@ -43,7 +57,7 @@ class ProfileDetailView(UserPassesTestMixin, generic.DetailView):
             return True
 
         try:
-            restrict_processing_row = RestrictProcessing.objects.get(user=social_account.user)
+            restrict_processing_row = social_account.user.restrictprocessing
         except RestrictProcessing.DoesNotExist:
             return True
         else:
@@ -0,0 +1,100 @@
+"""
+Structured information collected while rendering a document.
+
+`RenderArtifactsExtension` walks the finished element tree and notes the
+headings with the anchors the `toc` extension gave them and the number
+of words outside of code blocks. The code highlighting extensions in
+`website.highlighting` add the language of every code block. Nothing
+has to be parsed out of the markdown again to show a table of contents,
+a reading time or the languages a document uses.
+"""
+
+import math
+import re
+from collections import namedtuple
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE
+
+
+# The average number of words read per minute, for estimating reading times.
+WORDS_PER_MINUTE = 200
+
+HEADING_PATTERN = re.compile(r'^h[1-6]$')
+WORD_PATTERN = re.compile(r'\w+')
+
+# `headings` are `(level, anchor, name)` triples in document order, and `code_languages`
+# are the distinct languages of all code blocks in the order of their first appearance.
+RenderArtifacts = namedtuple('RenderArtifacts', ('headings', 'word_count', 'code_languages'))
+
+
+def reading_minutes(word_count: int) -> int:
+    """Return the estimated number of minutes it takes to read the given number of words."""
+
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+
+def element_text(element) -> str:
+    """Return the text of an element, without the placeholders of stashed HTML."""
+
+    return HTML_PLACEHOLDER_RE.sub('', ''.join(element.itertext())).strip()
+
+
+def count_words(text) -> int:
+    if not text:
+        return 0
+    return len(WORD_PATTERN.findall(HTML_PLACEHOLDER_RE.sub('', text)))
+
+
+class RenderArtifactsTreeprocessor(Treeprocessor):
+    def run(self, root):
+        self.collect(root)
+
+    def collect(self, element):
+        # The table of contents inserted for `[TOC]` repeats the headings.
+        if element.get('class') == 'toc':
+            return
+        if isinstance(element.tag, str) and HEADING_PATTERN.match(element.tag):
+            self.markdown.headings.append(
+                (int(element.tag[1]), element.get('id', ''), element_text(element))
+            )
+
+        self.markdown.word_count += count_words(element.text)
+        for child in element:
+            self.collect(child)
+            self.markdown.word_count += count_words(child.tail)
+
+
+class RenderArtifactsExtension(Extension):
+    """Collects the `RenderArtifacts` of every document, see `collect_artifacts`."""
+
+    def extendMarkdown(self, md, md_globals):
+        md.registerExtension(self)
+        self.md = md
+        self.reset()
+        # Added last, after the `toc` extension assigned the heading anchors.
+        md.treeprocessors.add('render_artifacts', RenderArtifactsTreeprocessor(md), '_end')
+
+    def reset(self):
+        self.md.headings = []
+        self.md.word_count = 0
+        self.md.code_languages = []
+
+
+def record_language(md, lang):
+    """Note the language of a code block, if the document collects its artifacts."""
+
+    languages = getattr(md, 'code_languages', None)
+    if languages is not None and lang:
+        languages.append(lang.lower())
+
+
+def collect_artifacts(md) -> RenderArtifacts:
+    """Return the artifacts of the document last converted by `md`."""
+
+    return RenderArtifacts(
+        headings=tuple(md.headings),
+        word_count=md.word_count,
+        code_languages=tuple(dict.fromkeys(md.code_languages))
+    )
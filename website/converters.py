@@ -1,13 +1,234 @@
+import hashlib
+import html
+import logging
+import re
+from collections import namedtuple
+
 import bleach
 import markdown
 from bleach_whitelist import markdown_attrs, markdown_tags
-from markdown.extensions.codehilite import CodeHiliteExtension
-from markdown.extensions.fenced_code import FencedCodeExtension
+from django.core.cache import close_caches
 from markdown.extensions.toc import TocExtension
 
+from website.artifacts import (
+    RenderArtifacts,
+    RenderArtifactsExtension,
+    collect_artifacts,
+    count_words
+)
+from website.highlighting import (
+    CachedCodeHiliteExtension,
+    CachedFencedCodeExtension,
+    highlight_cache
+)
+from website.lru import LRUCache
+from website.workers import PoolBusy, WorkerError, WorkerPool
+
+
+log = logging.getLogger(__name__)
+
 
 # https://python-markdown.github.io/extensions/
-MARKDOWN_EXTENSIONS = (CodeHiliteExtension(), FencedCodeExtension(), TocExtension())
+# Extensions hold per-document state such as the table of contents,
+# so every pipeline builds its own instances from these (class, config) pairs.
+MARKDOWN_EXTENSIONS = (
+    (CachedCodeHiliteExtension, {}),
+    (CachedFencedCodeExtension, {}),
+    (TocExtension, {}),
+    (RenderArtifactsExtension, {}),
+)
+
+# The maximum number of rendered documents kept in the render cache.
+RENDER_CACHE_SIZE = 256
+
+# The number of worker processes rendering documents, see `website.workers`.
+RENDER_WORKERS = 4
+
+# The seconds of CPU time a single document may take to render, and the
+# seconds waited for a free worker and then for the rendered document.
+RENDER_CPU_LIMIT = 2.0
+RENDER_TIMEOUT = 5.0
+
+# Longer documents are not rendered at all.
+RENDER_MAX_LENGTH = 200_000
+
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n\s*\n')
+
+RenderedDocument = namedtuple('RenderedDocument', ('html', 'artifacts'))
+
+
+class FallbackDocument(RenderedDocument):
+    """A document shown as plain text, as it could not be rendered."""
+
+    __slots__ = ()
+
+
+class RenderError(Exception):
+    """Raised instead of returning a `FallbackDocument`, where the result would be stored."""
+
+
+class MarkdownPipeline:
+    """
+    Converts markdown to sanitized HTML.
+
+    The markdown parser and the HTML sanitizer are built once
+    and reset before every conversion, instead of being rebuilt
+    for every document. A pipeline is not thread-safe, every
+    worker process of the `render_pool` has its own.
+    """
+
+    def __init__(self, extensions=MARKDOWN_EXTENSIONS):
+        self.markdown = markdown.Markdown(
+            extensions=[extension(**config) for extension, config in extensions]
+        )
+        self.cleaner = bleach.sanitizer.Cleaner(tags=markdown_tags, attributes=markdown_attrs)
+
+    def render(self, text: str) -> str:
+        return self.render_document(text).html
+
+    def render_document(self, text: str) -> RenderedDocument:
+        """Render the given markdown, along with its `website.artifacts.RenderArtifacts`."""
+
+        self.markdown.reset()
+        html = self.cleaner.clean(self.markdown.convert(text))
+        return RenderedDocument(html, collect_artifacts(self.markdown))
+
+
+def extensions_fingerprint(extensions=MARKDOWN_EXTENSIONS) -> bytes:
+    """Return a digest identifying the given extension configuration."""
+
+    description = repr([
+        (f'{extension.__module__}.{extension.__qualname__}', sorted(config.items()))
+        for extension, config in extensions
+    ])
+    return hashlib.sha256(description.encode('utf-8')).digest()
+
+
+EXTENSIONS_FINGERPRINT = extensions_fingerprint()
+
+
+def render_key(text: str) -> str:
+    """Return the render cache key of the given markdown source."""
+
+    digest = hashlib.sha256(EXTENSIONS_FINGERPRINT)
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def new_renderer():
+    """
+    Return the function rendering documents in a worker process.
+
+    Along with every document, it returns the `HighlightStats` of
+    rendering it, which are added to the `highlight_cache` of the
+    web process by `render_isolated`.
+    """
+
+    # Connections to cache servers inherited from the web process must not be shared.
+    close_caches()
+    pipeline = MarkdownPipeline()
+
+    def render(text: str):
+        document = pipeline.render_document(text)
+        return document, highlight_cache.take_stats()
+
+    return render
+
+
+def fallback_document(text: str) -> RenderedDocument:
+    """Return the given markdown as escaped plain text, for documents which could not render."""
+
+    paragraphs = (paragraph.strip() for paragraph in PARAGRAPH_BREAK_PATTERN.split(text))
+    body = ''.join(
+        f"<p>{html.escape(paragraph).replace(chr(10), '<br>')}</p>\n"
+        for paragraph in paragraphs if paragraph
+    )
+    return FallbackDocument(body, RenderArtifacts((), count_words(text), ()))
+
+
+render_pool = WorkerPool(
+    new_renderer, size=RENDER_WORKERS, timeout=RENDER_TIMEOUT, cpu_limit=RENDER_CPU_LIMIT
+)
+render_cache = LRUCache(RENDER_CACHE_SIZE)
+
+
+def render_isolated(key: str, text: str, cache=render_cache, strict=False) -> RenderedDocument:
+    """
+    Render a document in a worker of the `render_pool`, and store it in `cache`.
+
+    Documents which are too long, or fail to render within the limits
+    of the pool, are shown as plain text. If no worker was available,
+    the plain text is not cached, as the next attempt may succeed.
+    If `strict`, a `RenderError` is raised instead of returning plain text.
+    """
+
+    if len(text) > RENDER_MAX_LENGTH:
+        if strict:
+            raise RenderError(f"The document is longer than {RENDER_MAX_LENGTH} characters.")
+        log.warning("Not rendering a document of %d characters.", len(text))
+        document = fallback_document(text)
+    else:
+        try:
+            document, stats = render_pool.call(text)
+        except PoolBusy as error:
+            if strict:
+                raise RenderError(f"Could not render the document: {error}") from error
+            log.warning("Could not render a document: %s", error)
+            return fallback_document(text)
+        except WorkerError as error:
+            if strict:
+                raise RenderError(f"Could not render the document: {error}") from error
+            log.warning("Could not render a document: %s", error)
+            document = fallback_document(text)
+        else:
+            highlight_cache.add_stats(stats)
+    cache.set(key, document)
+    return document
+
+
+def cached_document(key: str, cache=render_cache, strict=False):
+    """Return the document cached with `key`, ignoring plain text if `strict`."""
+
+    document = cache.get(key)
+    if strict and isinstance(document, FallbackDocument):
+        return None
+    return document
+
+
+def render_document(text: str, strict=False) -> RenderedDocument:
+    """
+    Render the given markdown to sanitized HTML, along with the headings,
+    word count and code languages collected while rendering it.
+
+    Rendering runs in a separate process with limited time, see
+    `render_isolated`. Results are cached by the hash of the input,
+    so rendering unchanged content again is free.
+    """
+
+    key = render_key(text)
+    document = cached_document(key, strict=strict)
+    if document is None:
+        document = render_isolated(key, text, strict=strict)
+    return document
+
+
+def render_documents(texts, cache=render_cache, strict=False) -> list:
+    """
+    Like `render_document`, for many documents at once.
+
+    Documents with identical content are only rendered once.
+    Rendered documents are kept in the given `LRUCache`.
+    """
+
+    keys = [render_key(text) for text in texts]
+    documents = {}
+    for key, text in zip(keys, texts):
+        if key in documents:
+            continue
+        documents[key] = cached_document(key, cache, strict)
+        if documents[key] is None:
+            documents[key] = render_isolated(key, text, cache, strict)
+    return [documents[key] for key in keys]
 
 
 def markdownify(html: str) -> str:
@@ -16,10 +237,26 @@ def markdownify(html: str) -> str:
     to markdown and run through a HTML sanitizer.
     Syntax highlighting and fenced code blocks are supported.
     Additionally, a table of contents can be inserted by using `[TOC]`.
+
+    Results are cached by the hash of the input, so
+    rendering unchanged content again is free.
     """
 
-    return bleach.clean(
-        markdown.markdown(html, extensions=MARKDOWN_EXTENSIONS),
-        markdown_tags,
-        markdown_attrs,
-    )
+    return render_document(html).html
+
+
+def markdownify_strict(html: str) -> str:
+    """
+    Like `markdownify`, but raises a `RenderError` instead of returning plain text.
+
+    Used for content which is stored, such as the rendered content of guides,
+    so a document which could not be rendered is never stored as plain text.
+    """
+
+    return render_document(html, strict=True).html
+
+
+def markdownify_many(texts) -> list:
+    """Like `markdownify`, for many documents at once, see `render_documents`."""
+
+    return [document.html for document in render_documents(texts)]
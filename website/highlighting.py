@@ -0,0 +1,230 @@
+"""
+Syntax highlighting of code blocks with a content-addressed cache.
+
+Running Pygments over every code block is the most expensive part of
+rendering a guide. The markdown extensions in this module highlight
+code blocks exactly like the `codehilite` and `fenced_code` extensions
+they extend, but keep the highlighted HTML of each block in a cache
+keyed by the block's language, code and formatter options. Re-rendering
+a guide thus only highlights the blocks that changed, and code shared
+between guides is only highlighted once.
+
+Documents are rendered in the worker processes of
+`website.converters.render_pool`, so the highlighted blocks are kept in
+the Django cache, which the workers of all web processes share if it is
+backed by a server such as memcached, and in front of it in a small
+cache of every worker. The workers send the hits and the time spent and
+saved back along with every document, which are added up in the web
+process, so that `highlight_cache.info()` reports them there.
+"""
+
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from markdown.extensions.codehilite import (
+    CodeHilite,
+    CodeHiliteExtension,
+    HiliteTreeprocessor,
+    parse_hl_lines
+)
+from markdown.extensions.fenced_code import FencedBlockPreprocessor, FencedCodeExtension
+
+from website.artifacts import record_language
+from website.lru import LRUCache
+
+
+# The maximum number of highlighted code blocks kept in the cache of every process.
+HIGHLIGHT_CACHE_SIZE = 1024
+
+# Seconds highlighted code blocks are kept in the shared Django cache.
+HIGHLIGHT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+HighlightCacheInfo = namedtuple(
+    'HighlightCacheInfo',
+    ('hits', 'misses', 'size', 'max_size', 'seconds_spent', 'seconds_saved')
+)
+
+# Hits, misses and seconds of a `HighlightCache`, as sent back by worker processes.
+HighlightStats = namedtuple(
+    'HighlightStats', ('hits', 'misses', 'seconds_spent', 'seconds_saved')
+)
+
+
+class HighlightCache:
+    """
+    Caches highlighted code blocks along with how long they took to highlight.
+
+    Blocks are looked up in an `LRUCache` of this process first, and
+    then in the shared Django cache. `seconds_spent` is the total time
+    spent highlighting on cache misses, and `seconds_saved` the total
+    time that highlighting the blocks served from the cache would have taken.
+    """
+
+    def __init__(self, max_size=HIGHLIGHT_CACHE_SIZE):
+        self.local = LRUCache(max_size)
+        self._lock = threading.Lock()
+        self._stats = HighlightStats(0, 0, 0.0, 0.0)
+        self._taken = HighlightStats(0, 0, 0.0, 0.0)
+
+    def highlight(self, key: str, highlighter) -> str:
+        """Return the HTML cached for `key`, or cache and return the output of `highlighter()`."""
+
+        entry = self.local.get(key)
+        if entry is None:
+            entry = cache.get(f'highlight:{key}')
+            if entry is not None:
+                self.local.set(key, entry)
+        if entry is not None:
+            html, seconds = entry
+            self.add_stats(HighlightStats(1, 0, 0.0, seconds))
+            return html
+
+        started = time.perf_counter()
+        html = highlighter()
+        seconds = time.perf_counter() - started
+        self.add_stats(HighlightStats(0, 1, seconds, 0.0))
+        self.local.set(key, (html, seconds))
+        cache.set(f'highlight:{key}', (html, seconds), HIGHLIGHT_CACHE_TIMEOUT)
+        return html
+
+    def add_stats(self, stats: HighlightStats):
+        """Count the given hits, misses and seconds, for example those of a worker process."""
+
+        with self._lock:
+            self._stats = HighlightStats(*(
+                total + added for total, added in zip(self._stats, stats)
+            ))
+
+    def take_stats(self) -> HighlightStats:
+        """Return the hits, misses and seconds counted since they were last taken."""
+
+        with self._lock:
+            taken = HighlightStats(*(
+                total - before for total, before in zip(self._stats, self._taken)
+            ))
+            self._taken = self._stats
+        return taken
+
+    def clear(self):
+        """Forget the blocks cached in this process, and the counted hits and seconds."""
+
+        self.local.clear()
+        with self._lock:
+            self._stats = self._taken = HighlightStats(0, 0, 0.0, 0.0)
+
+    def info(self) -> HighlightCacheInfo:
+        local = self.local.info()
+        with self._lock:
+            return HighlightCacheInfo(
+                self._stats.hits, self._stats.misses, local.size, local.max_size,
+                self._stats.seconds_spent, self._stats.seconds_saved
+            )
+
+
+highlight_cache = HighlightCache()
+
+
+class CachedCodeHilite(CodeHilite):
+    """A `CodeHilite` whose output is served from `highlight_cache` when possible."""
+
+    def cache_key(self) -> str:
+        options = (
+            self.src, self.lang, self.linenums, self.guess_lang, self.css_class,
+            self.style, self.noclasses, self.tab_length, tuple(self.hl_lines), self.use_pygments
+        )
+        return hashlib.sha256(repr(options).encode('utf-8')).hexdigest()
+
+    def hilite(self):
+        # The header naming the language is parsed before the lookup,
+        # so that the language is known for cached blocks as well.
+        self.src = self.src.strip('\n')
+        if self.lang is None:
+            self._parseHeader()
+        return highlight_cache.highlight(self.cache_key(), super().hilite)
+
+
+class CachedHiliteTreeprocessor(HiliteTreeprocessor):
+    """Highlights indented code blocks through `CachedCodeHilite`."""
+
+    def run(self, root):
+        for block in root.iter('pre'):
+            if len(block) == 1 and block[0].tag == 'code':
+                code = CachedCodeHilite(
+                    block[0].text,
+                    linenums=self.config['linenums'],
+                    guess_lang=self.config['guess_lang'],
+                    css_class=self.config['css_class'],
+                    style=self.config['pygments_style'],
+                    noclasses=self.config['noclasses'],
+                    tab_length=self.markdown.tab_length,
+                    use_pygments=self.config['use_pygments']
+                )
+                placeholder = self.markdown.htmlStash.store(code.hilite(), safe=True)
+                record_language(self.markdown, code.lang)
+                block.clear()
+                block.tag = 'p'
+                block.text = placeholder
+
+
+class CachedCodeHiliteExtension(CodeHiliteExtension):
+    """The `codehilite` extension, highlighting through `highlight_cache`."""
+
+    def extendMarkdown(self, md, md_globals):
+        hiliter = CachedHiliteTreeprocessor(md)
+        hiliter.config = self.getConfigs()
+        md.treeprocessors.add('hilite', hiliter, '<inline')
+        md.registerExtension(self)
+
+
+class CachedFencedBlockPreprocessor(FencedBlockPreprocessor):
+    """Highlights fenced code blocks through `CachedCodeHilite`."""
+
+    def run(self, lines):
+        if not self.checked_for_codehilite:
+            for ext in self.markdown.registeredExtensions:
+                if isinstance(ext, CodeHiliteExtension):
+                    self.codehilite_conf = ext.config
+                    break
+            self.checked_for_codehilite = True
+
+        text = '\n'.join(lines)
+        match = self.FENCED_BLOCK_RE.search(text)
+        while match:
+            lang = match.group('lang')
+            if self.codehilite_conf:
+                hiliter = CachedCodeHilite(
+                    match.group('code'),
+                    linenums=self.codehilite_conf['linenums'][0],
+                    guess_lang=self.codehilite_conf['guess_lang'][0],
+                    css_class=self.codehilite_conf['css_class'][0],
+                    style=self.codehilite_conf['pygments_style'][0],
+                    use_pygments=self.codehilite_conf['use_pygments'][0],
+                    lang=(lang or None),
+                    noclasses=self.codehilite_conf['noclasses'][0],
+                    hl_lines=parse_hl_lines(match.group('hl_lines'))
+                )
+                code = hiliter.hilite()
+                lang = hiliter.lang
+            else:
+                lang_tag = self.LANG_TAG % lang if lang else ''
+                code = self.CODE_WRAP % (lang_tag, self._escape(match.group('code')))
+
+            record_language(self.markdown, lang)
+            placeholder = self.markdown.htmlStash.store(code, safe=True)
+            text = f'{text[:match.start()]}\n{placeholder}\n{text[match.end():]}'
+            match = self.FENCED_BLOCK_RE.search(text)
+        return text.split('\n')
+
+
+class CachedFencedCodeExtension(FencedCodeExtension):
+    """The `fenced_code` extension, highlighting through `highlight_cache`."""
+
+    def extendMarkdown(self, md, md_globals):
+        md.registerExtension(self)
+        md.preprocessors.add(
+            'fenced_code_block', CachedFencedBlockPreprocessor(md), '>normalize_whitespace'
+        )
@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from website import storage
+
+
+# Responses with these content types are compressed, others are compressed by their formats.
+COMPRESSIBLE_TYPES = (
+    'application/atom+xml',
+    'application/javascript',
+    'application/json',
+    'application/rss+xml',
+    'application/xml',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'text/xml',
+)
+
+# Responses smaller than this many bytes are sent uncompressed.
+MIN_COMPRESS_SIZE = 512
+
+# Seconds after which the cached compressed variant of a response is compressed again.
+COMPRESSED_CACHE_TIMEOUT = 60 * 60 * 24
+
+ACCEPT_ENCODING_PATTERN = re.compile(r'([a-z0-9*-]+)\s*(?:;\s*q=([0-9.]+))?', re.IGNORECASE)
+
+
+class PreloadLinkMiddleware:
+    """
+    Announces the static files every page needs in a `Link` header.
+
+    Browsers start fetching them as soon as the headers of a page
+    arrive, instead of after parsing its `<head>`. The files are listed
+    as `(path, type)` pairs in the `PRELOAD_STATIC` setting, and their
+    URLs are those of the static files storage, which are hashed in
+    production, so cached copies are used without asking the server.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._header = None
+
+    def link_header(self) -> str:
+        if self._header is None:
+            self._header = ', '.join(
+                f'<{staticfiles_storage.url(path)}>; rel=preload; as={kind}'
+                for path, kind in settings.PRELOAD_STATIC
+            )
+        return self._header
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.status_code == 200
+            and response.get('Content-Type', '').startswith('text/html')
+            and settings.PRELOAD_STATIC
+        ):
+            links = [response['Link']] if response.has_header('Link') else []
+            response['Link'] = ', '.join(links + [self.link_header()])
+        return response
+
+
+def accepted_encodings(header: str) -> dict:
+    """Return the quality value of every content coding named in an `Accept-Encoding` header."""
+
+    accepted = {}
+    for coding, quality in ACCEPT_ENCODING_PATTERN.findall(header):
+        try:
+            accepted[coding.lower()] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    return accepted
+
+
+def gzip_compress(content: bytes) -> bytes:
+    return gzip.compress(content, compresslevel=6)
+
+
+def brotli_compress(content: bytes) -> bytes:
+    return storage.brotli.compress(content, quality=5)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, whichever the client prefers.
+
+    Only responses of `COMPRESSIBLE_TYPES` of at least `MIN_COMPRESS_SIZE`
+    bytes are compressed. Responses carrying an `ETag`, like guide pages
+    for visitors without a session and the feeds, are the same for every
+    request until their content changes. Their compressed bytes are cached
+    by the validator, and compressed as much as possible once, instead
+    of quickly for every request. Brotli is only offered if the optional
+    `brotli` package is installed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def encoding(self, request) -> str:
+        """Return the available coding with the highest quality, brotli on ties, if any."""
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        # Codings named explicitly, even with a quality of 0, take precedence over `*`.
+        codings = ('br', 'gzip') if storage.brotli is not None else ('gzip',)
+        best, best_quality = None, 0
+        for coding in codings:
+            quality = accepted.get(coding, accepted.get('*', 0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        # Clients preferring uncompressed responses explicitly get them.
+        if best_quality < accepted.get('identity', 0):
+            return None
+        return best
+
+    def is_compressible(self, response) -> bool:
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.has_header('Content-Encoding')
+            and content_type in COMPRESSIBLE_TYPES
+            and len(response.content) >= MIN_COMPRESS_SIZE
+        )
+
+    def variant_key(self, request, response, encoding: str) -> str:
+        """Return the cache key of the compressed variant of a response with an `ETag`."""
+
+        identity = f'{request.get_full_path()}:{response["ETag"]}:{len(response.content)}'
+        return f'website:compressed:{encoding}:{hashlib.md5(identity.encode()).hexdigest()}'
+
+    def compress(self, request, response, encoding: str) -> bytes:
+        if not response.has_header('ETag') or 'private' in response.get('Cache-Control', ''):
+            return gzip_compress(response.content) if encoding == 'gzip' else (
+                brotli_compress(response.content)
+            )
+
+        key = self.variant_key(request, response, encoding)
+        content = cache.get(key)
+        if content is None:
+            content = storage.gzip_compress(response.content) if encoding == 'gzip' else (
+                storage.brotli_compress(response.content)
+            )
+            cache.set(key, content, COMPRESSED_CACHE_TIMEOUT)
+        return content
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.encoding(request)
+        if encoding is None:
+            return response
+
+        content = self.compress(request, response, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        if response.get('ETag', '').startswith('"'):
+            # The compressed bytes differ from the uncompressed ones, which share the validator.
+            response['ETag'] = 'W/' + response['ETag']
+        return response
@@ -0,0 +1,81 @@
+"""
+Incremental rendering of markdown previews.
+
+A preview is requested on every pause in typing, while usually only a
+single paragraph changed since the previous one. The markdown is split
+into its top-level blocks, which are rendered on their own and cached
+by their content, so only the edited blocks are rendered again and the
+others are reused. The sanitized HTML of the blocks is joined into the
+preview.
+
+Blocks are not independent if the document refers to something defined
+elsewhere in it, such as reference-style links or a `[TOC]`. Those
+documents are rendered as a whole, see `website.converters`.
+"""
+
+import re
+
+from website import converters
+from website.lru import LRUCache
+
+
+# The maximum number of rendered blocks kept for previews.
+PREVIEW_CACHE_SIZE = 2048
+
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+LIST_ITEM_PATTERN = re.compile(r'^ {0,3}([*+-]|\d+[.)])\s')
+# Definitions of reference-style links, and the table of contents, span blocks.
+DOCUMENT_WIDE_PATTERN = re.compile(r'^ {0,3}\[[^\]]+\]:|\[TOC\]', re.MULTILINE)
+
+block_cache = LRUCache(PREVIEW_CACHE_SIZE)
+
+
+def split_blocks(text: str) -> list:
+    """
+    Split markdown into its top-level blocks, which are separated by blank lines.
+
+    Fenced code blocks are kept whole, and indented lines, such as
+    indented code or further paragraphs of a list item, as well as
+    the items of a list stay in the block they continue.
+    """
+
+    blocks = []
+    lines = []
+    fence = None
+    after_blank = False
+    for line in text.splitlines():
+        if fence is not None:
+            lines.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+            continue
+
+        if not line.strip():
+            after_blank = True
+            lines.append('')
+            continue
+
+        continues = line[:1] in (' ', '\t') and not FENCE_PATTERN.match(line) or (
+            LIST_ITEM_PATTERN.match(line) and lines and LIST_ITEM_PATTERN.match(lines[0])
+        )
+        if after_blank and not continues:
+            blocks.append('\n'.join(lines).strip('\n'))
+            lines = []
+        after_blank = False
+        lines.append(line)
+
+        match = FENCE_PATTERN.match(line)
+        if match is not None:
+            fence = match.group(1)
+    if lines:
+        blocks.append('\n'.join(lines).strip('\n'))
+    return [block for block in blocks if block]
+
+
+def render_preview(text: str) -> str:
+    """Render the given markdown to sanitized HTML, reusing the blocks rendered before."""
+
+    if len(text) > converters.RENDER_MAX_LENGTH or DOCUMENT_WIDE_PATTERN.search(text):
+        return converters.markdownify(text)
+    documents = converters.render_documents(split_blocks(text), cache=block_cache)
+    return '\n'.join(document.html for document in documents)
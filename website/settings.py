@@ -6,7 +6,7 @@ from pathlib import Path
 import environ
 from django.contrib.messages import constants as message_constants
 
-from website.converters import markdownify
+from website.converters import markdownify_strict
 
 env = environ.Env(DEBUG=(bool, False))
 
@@ -44,20 +44,25 @@ INSTALLED_APPS = [
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
-    'guardian.backends.ObjectPermissionBackend'
+    'guides.permissions.PrefetchingObjectPermissionBackend'
 )
 
+# Guardian only recognizes its own backend, which the one above extends.
+SILENCED_SYSTEM_CHECKS = ['guardian.W001']
+
 SOCIALACCOUNT_EMAIL_VERIFICATION = 'none'
 
 LOGIN_REDIRECT_URL = '/'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'website.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware'
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'website.middleware.PreloadLinkMiddleware'
 ]
 
 ROOT_URLCONF = 'website.urls'
@@ -95,6 +100,15 @@ if not DEBUG and not IS_TESTING:
     DATABASES['stats']['OPTIONS'] = {'sslmode': 'require'}
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+# With multiple worker processes, point this to a shared cache such as memcached,
+# otherwise invalidating a cached page only affects the worker handling the change.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -161,8 +175,19 @@ STATICFILES_DIRS = [PROJECT_DIR / 'static']
 SITE_ID = 1
 STATIC_ROOT = env('STATIC_ROOT', default=str(BASE_DIR / 'static'))
 
+# Outside of development, `collectstatic` writes content-hashed copies
+# of all static files along with precompressed variants of them.
+if not DEBUG and not IS_TESTING:
+    STATICFILES_STORAGE = 'website.storage.CompressedManifestStaticFilesStorage'
+
+# The static files every page needs, announced in a `Link` header
+# of every page as `(path, type)` pairs, see `website.middleware`.
+PRELOAD_STATIC = [
+    ('css/kube.purged.css', 'style'),
+]
 
-MARKUP_FIELD_TYPES = [('markdown', markdownify)]
+
+MARKUP_FIELD_TYPES = [('markdown', markdownify_strict)]
 
 
 # https://imperavi.com/kube/docs/messages/
@@ -198,3 +223,20 @@ DISCORD_GUILD_ID = os.getenv("DISCORD_GUILD_ID", "181866934353133570")
 
 # The webhook URL to send new events to.
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+
+# The URL the surrogate keys of changed guide pages are sent to, see `guides.httpcache`.
+SURROGATE_PURGE_URL = os.getenv("SURROGATE_PURGE_URL")
+
+# The directory the pages shown to visitors without a session are written to, and the
+# origin they are rendered for, see `website.snapshots`. Snapshots are off if unset.
+SNAPSHOT_ROOT = os.getenv("SNAPSHOT_ROOT")
+SNAPSHOT_ORIGIN = env('SNAPSHOT_ORIGIN', default=f'https://{ALLOWED_HOSTS[0].lstrip(".")}')
+
+# The maximum number of guides included in the guide feeds.
+GUIDE_FEED_LIMIT = env.int('GUIDE_FEED_LIMIT', default=20)
+
+# The seconds between writes of the guide views counted by each process.
+# Tests store them explicitly, so that no request writes them unexpectedly.
+GUIDE_VIEWS_FLUSH_INTERVAL = (
+    None if IS_TESTING else env.int('GUIDE_VIEWS_FLUSH_INTERVAL', default=10)
+)
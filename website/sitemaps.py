@@ -0,0 +1,197 @@
+"""
+Sitemaps listing the guides and the public profiles.
+
+`/sitemap.xml` lists every URL while there are at most
+`URLS_PER_SITEMAP` of them. Beyond that, it becomes a sitemap index
+pointing to the numbered sitemaps of each section, like
+`/sitemap-guides-2.xml`.
+
+A sitemap is written while reading the rows it lists in chunks, and
+streamed to the client as it is written, so neither the database nor
+the worker ever handles a whole table at once. The written sitemap is
+cached until a guide is saved or deleted or a profile changes, so
+crawlers are served from the cache without querying anything.
+"""
+
+import itertools
+import uuid
+from xml.sax.saxutils import escape
+
+from allauth.socialaccount.models import SocialAccount
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from guides.models import Guide
+
+
+# Sitemaps are cached under a key containing this version, which is
+# replaced with a new random one whenever a listed page changes.
+SITEMAP_CACHE_VERSION_KEY = 'website:sitemap:version'
+
+# Seconds after which a cached sitemap is written again regardless.
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The protocol allows 50,000, but smaller sitemaps fit into a memcached entry.
+URLS_PER_SITEMAP = 5000
+
+# The number of rows read from the database at once.
+CHUNK_SIZE = 500
+
+CONTENT_TYPE = 'application/xml'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class GuideSection:
+    name = 'guides'
+
+    def queryset(self):
+        return Guide.objects.order_by('id').values_list('id', 'edit_datetime')
+
+    def entry(self, row) -> tuple:
+        guide_id, edit_datetime = row
+        return reverse('guides:detail', kwargs={'pk': guide_id}), edit_datetime
+
+
+class ProfileSection:
+    name = 'profiles'
+
+    def queryset(self):
+        # Users restricting processing may not have their profile viewed by anyone else.
+        return (
+            SocialAccount.objects.filter(provider='discoauth')
+            .exclude(user__restrictprocessing__restrict_processing=True)
+            .order_by('id')
+            .values_list('uid', flat=True)
+        )
+
+    def entry(self, uid) -> tuple:
+        return reverse('profiles:detail', kwargs={'pk': uid}), None
+
+
+SECTIONS = {section.name: section for section in (GuideSection(), ProfileSection())}
+
+
+def invalidate_sitemaps():
+    """Discard all cached sitemaps."""
+
+    cache.set(SITEMAP_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def page_count(url_count: int) -> int:
+    return -(-url_count // URLS_PER_SITEMAP)
+
+
+def section_counts(version: str) -> dict:
+    """Return the number of URLs in every section."""
+
+    key = f'website:sitemap:{version}:counts'
+    counts = cache.get(key)
+    if counts is None:
+        counts = {name: section.queryset().count() for name, section in SECTIONS.items()}
+        cache.set(key, counts, SITEMAP_CACHE_TIMEOUT)
+    return counts
+
+
+def url_element(location: str, lastmod) -> str:
+    if lastmod is None:
+        return f'<url><loc>{escape(location)}</loc></url>\n'
+    lastmod = lastmod.replace(microsecond=0).isoformat()
+    return f'<url><loc>{escape(location)}</loc><lastmod>{lastmod}</lastmod></url>\n'
+
+
+def write_urlset(base_url: str, slices):
+    """
+    Yield a sitemap of the given `(section, start, stop)` slices of sections in parts,
+    one per chunk of rows read from the database.
+    """
+
+    yield f'{XML_DECLARATION}<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+    for section, start, stop in slices:
+        rows = section.queryset()[start:stop].iterator(chunk_size=CHUNK_SIZE)
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            yield ''.join(
+                url_element(base_url + location, lastmod)
+                for location, lastmod in map(section.entry, chunk)
+            )
+    yield '</urlset>\n'
+
+
+def write_index(base_url: str, counts: dict):
+    yield f'{XML_DECLARATION}<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+    for name, count in counts.items():
+        for page in range(1, page_count(count) + 1):
+            location = base_url + reverse(
+                'sitemap_section', kwargs={'section': name, 'page': page}
+            )
+            yield f'<sitemap><loc>{escape(location)}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def cache_parts(key: str, parts):
+    """Yield the given parts, and cache them joined once all were written."""
+
+    written = []
+    for part in parts:
+        written.append(part)
+        yield part
+    cache.set(key, ''.join(written), SITEMAP_CACHE_TIMEOUT)
+
+
+def cached_response(request, version: str, name: str, write):
+    """
+    Return the cached sitemap with the given name, or stream the parts
+    returned by `write(base_url)` while caching them.
+    """
+
+    base_url = f'{request.scheme}://{request.get_host()}'
+    key = f'website:sitemap:{version}:{base_url}:{name}'
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type=CONTENT_TYPE)
+    return StreamingHttpResponse(cache_parts(key, write(base_url)), content_type=CONTENT_TYPE)
+
+
+def current_version() -> str:
+    return cache.get_or_set(SITEMAP_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def sitemap(request):
+    """Serve the sitemap of all sections, or an index of the sitemaps of each section."""
+
+    version = current_version()
+    counts = section_counts(version)
+    if sum(counts.values()) > URLS_PER_SITEMAP:
+        return cached_response(
+            request, version, 'index', lambda base_url: write_index(base_url, counts)
+        )
+    return cached_response(
+        request,
+        version,
+        'all',
+        lambda base_url: write_urlset(
+            base_url, [(section, 0, None) for section in SECTIONS.values()]
+        )
+    )
+
+
+def section_sitemap(request, section, page):
+    """Serve one page of the URLs of a section, as listed by the sitemap index."""
+
+    version = current_version()
+    counts = section_counts(version)
+    if section not in SECTIONS or not 1 <= page <= page_count(counts[section]):
+        raise Http404("No such sitemap.")
+    start = (page - 1) * URLS_PER_SITEMAP
+    return cached_response(
+        request,
+        version,
+        f'{section}:{page}',
+        lambda base_url: write_urlset(
+            base_url, [(SECTIONS[section], start, start + URLS_PER_SITEMAP)]
+        )
+    )
@@ -0,0 +1,255 @@
+"""
+Static snapshots of the pages anonymous visitors see.
+
+The home page, the first page of the guide list, the guide pages and
+the guide feeds are the same for every visitor without a session. If
+`SNAPSHOT_ROOT` is set, they are rendered into files below it, which
+the web server sends to such visitors directly, so these requests never
+reach Django or the databases. Pages with a query string, and requests
+from visitors with a session, must still be passed on to Django.
+
+Snapshots of changed guides are deleted as soon as their surrogate keys
+are purged, see `guides.httpcache`, so the web server falls back to
+Django until they are written again after the response of the request
+which changed them. Only up to `MAX_REGENERATED_PAGES` pages are written
+after a response, beyond that they stay with Django until the next run
+of `writesnapshots`. Commands changing many guides, such as
+`importguides`, write the pages themselves. The home page only changes with the number of
+members, which another process writes, and the trending guides on the
+guide list change with views, which purge nothing. Both are checked
+from a cron job with `python manage.py writesnapshots --members`.
+"""
+
+import io
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import reverse
+
+from guides import httpcache, viewcounts
+from guides.models import Guide
+from home.views import member_count
+
+
+log = logging.getLogger(__name__)
+
+# Files written for pages of these content types, by the extension the web server serves them as.
+EXTENSIONS = {
+    'text/html': '.html',
+    'application/rss+xml': '.xml',
+    'application/atom+xml': '.xml',
+}
+
+# The number of members shown on the home page when it was written last.
+MEMBERS_FILE = '.members'
+
+# The trending guides shown on the guide list when it was written last.
+TRENDING_FILE = '.trending'
+
+# The maximum number of pages written again after a response, to keep request workers available.
+MAX_REGENERATED_PAGES = 50
+
+
+def is_enabled() -> bool:
+    return settings.SNAPSHOT_ROOT is not None
+
+
+def list_paths() -> list:
+    return [reverse("guides:index"), reverse("guides:feed_rss"), reverse("guides:feed_atom")]
+
+
+def guide_path(guide_id) -> str:
+    return reverse("guides:detail", kwargs={"pk": guide_id})
+
+
+def guide_paths() -> list:
+    """Return the paths of all pages showing guides."""
+
+    return list_paths() + [
+        guide_path(guide_id) for guide_id in Guide.objects.values_list('id', flat=True)
+    ]
+
+
+def paths_for_keys(keys) -> list:
+    """Return the paths of the pages showing guides with any of the given surrogate keys."""
+
+    if httpcache.ALL_GUIDES_KEY in keys:
+        return guide_paths()
+
+    paths = []
+    for key in keys:
+        if key.startswith('guide-') and key[len('guide-'):].isdigit():
+            paths.append(guide_path(key[len('guide-'):]))
+    # The list and the feeds show the titles and contents of the latest guides.
+    if paths or httpcache.GUIDE_LIST_KEY in keys:
+        paths.extend(list_paths())
+    return paths
+
+
+def file_names(path: str) -> list:
+    """Return the names of the files below `SNAPSHOT_ROOT` the page at `path` may be written to."""
+
+    name = (path + 'index' if path.endswith('/') else path).lstrip('/')
+    return sorted({name + extension for extension in EXTENSIONS.values()})
+
+
+class SnapshotHandler(BaseHandler):
+    """Renders pages through all middleware, as if requested by a visitor without a session."""
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+    def render(self, path: str):
+        origin = urlsplit(settings.SNAPSHOT_ORIGIN)
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'HTTP_HOST': origin.netloc,
+            'SERVER_NAME': origin.hostname,
+            'SERVER_PORT': str(origin.port or (443 if origin.scheme == 'https' else 80)),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.url_scheme': origin.scheme,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            httpcache.SNAPSHOT_ENVIRON_KEY: True,
+        })
+        return self.get_response(request)
+
+
+def write_file(root: Path, name: str, content: bytes):
+    """Replace the file atomically, so that the web server never sends a partial page."""
+
+    target = root / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=str(target.parent), prefix='.snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, str(target))
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def remove_pages(paths):
+    """Delete the snapshots of the given pages, so that they are served by Django."""
+
+    root = Path(settings.SNAPSHOT_ROOT)
+    for path in paths:
+        for name in file_names(path):
+            try:
+                (root / name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def write_pages(paths, handler=None) -> int:
+    """Write the snapshots of the given pages, and return how many were written."""
+
+    handler = handler or SnapshotHandler()
+    root = Path(settings.SNAPSHOT_ROOT)
+    written = 0
+    for path in paths:
+        response = handler.render(path)
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        # Missing guides, and pages that cannot be snapshotted, are left to Django.
+        if response.status_code != 200 or response.streaming or content_type not in EXTENSIONS:
+            remove_pages([path])
+            continue
+        for name in file_names(path):
+            if name.endswith(EXTENSIONS[content_type]):
+                write_file(root, name, response.content)
+            elif (root / name).exists():
+                (root / name).unlink()
+        written += 1
+    return written
+
+
+def write_if_changed(path: str, state_name: str, state: str, handler=None, force=False) -> bool:
+    """Write the page if the `state` it shows changed since it was written last."""
+
+    state_file = Path(settings.SNAPSHOT_ROOT) / state_name
+    try:
+        if not force and state_file.read_text() == state:
+            return False
+    except FileNotFoundError:
+        pass
+    write_pages([path], handler)
+    write_file(Path(settings.SNAPSHOT_ROOT), state_name, state.encode())
+    return True
+
+
+def write_home(handler=None, force=False) -> bool:
+    """Write the home page if the number of members changed since it was written last."""
+
+    return write_if_changed(
+        reverse("home:index"), MEMBERS_FILE, str(member_count()), handler, force
+    )
+
+
+def write_trending(handler=None, force=False) -> bool:
+    """Write the guide list if the trending guides changed since it was written last."""
+
+    trending = ' '.join(
+        f'{popularity.guide_id}:{popularity.view_count}'
+        for popularity in viewcounts.trending_guides()
+    )
+    return write_if_changed(reverse("guides:index"), TRENDING_FILE, trending, handler, force)
+
+
+class Regenerator:
+    """Collects stale pages, and writes them again once the response was sent. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stale = set()
+
+    def mark_stale(self, paths):
+        """Delete the snapshots of the given pages at once, and remember to write them again."""
+
+        paths = set(paths)
+        remove_pages(paths)
+        with self._lock:
+            self._stale |= paths
+
+    def clear(self):
+        with self._lock:
+            self._stale.clear()
+
+    def regenerate(self, limit=None) -> int:
+        """
+        Write the stale pages again, and return how many were written.
+
+        If there are more than `limit` stale pages, none are written, and
+        they are served by Django until `writesnapshots` writes them.
+        """
+
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        if not stale:
+            return 0
+        if limit is not None and len(stale) > limit:
+            log.warning(
+                "Not writing the snapshots of %d pages, run `writesnapshots` to write them.",
+                len(stale)
+            )
+            return 0
+        try:
+            return write_pages(sorted(stale))
+        except Exception:
+            log.exception("Could not write the snapshots of %d pages.", len(stale))
+            return 0
+
+
+regenerator = Regenerator()
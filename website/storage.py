@@ -0,0 +1,89 @@
+"""
+A static files storage writing fingerprinted and precompressed files.
+
+`collectstatic` copies every static file to a name containing the hash
+of its content, like Django's `ManifestStaticFilesStorage`, so the web
+server can let browsers cache them forever. Next to every hashed text
+file, a gzip compressed `.gz` variant is written, and a brotli
+compressed `.br` variant if the optional `brotli` package is installed.
+A web server configured to serve precompressed files (for example
+nginx's `gzip_static` and `brotli_static`) then never compresses them on
+the fly.
+"""
+
+import gzip
+import io
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Only files with these extensions are worth compressing,
+# images and fonts are compressed by their formats already.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml')
+
+# Files smaller than this many bytes are not compressed.
+MIN_COMPRESS_SIZE = 256
+
+
+def gzip_compress(content: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # A fixed modification time keeps the output identical across deployments.
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as compressed:
+        compressed.write(content)
+    return buffer.getvalue()
+
+
+def brotli_compress(content: bytes) -> bytes:
+    return brotli.compress(content, quality=11)
+
+
+def compressors() -> list:
+    """Return the available `(suffix, compress)` pairs."""
+
+    available = [('.gz', gzip_compress)]
+    if brotli is not None:
+        available.append(('.br', brotli_compress))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """A `ManifestStaticFilesStorage` which also writes compressed variants of hashed files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name is not None and not isinstance(processed, Exception):
+                hashed_names[hashed_name] = name
+
+        if dry_run:
+            return
+        for hashed_name, name in hashed_names.items():
+            for compressed_name in self.compress(hashed_name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Write the compressed variants of a file smaller than it, and yield their names."""
+
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        for suffix, compress in compressors():
+            compressed = compress(content)
+            if len(compressed) >= len(content):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            yield compressed_name
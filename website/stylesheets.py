@@ -0,0 +1,214 @@
+"""
+Removal of unused CSS rules and extraction of critical CSS.
+
+Kube ships styles for far more components than the templates use.
+`purge` keeps only the rules whose selectors may match something in the
+templates: a selector is kept if every class and ID it names appears as
+a word in a template, a script or the safelist. Rules selecting only by
+element, like the typography of rendered guides, are always kept.
+
+`critical` further keeps only the rules that apply to the elements and
+classes of a single template, which for `base.html` is the page frame
+visible before anything else. It is inlined into the page, so the first
+paint does not wait for the full stylesheet.
+
+The parser understands just enough CSS for this: comments, strings,
+style rules, nesting at-rules like `@media`, and other at-rules, which
+are kept as a whole.
+"""
+
+import re
+from collections import namedtuple
+
+
+# At-rules containing style rules, which are purged like top-level rules.
+NESTING_AT_RULES = ('@media', '@supports', '@document')
+
+WORD_PATTERN = re.compile(r'[A-Za-z_][\w-]*')
+TAG_PATTERN = re.compile(r'<([A-Za-z][\w-]*)')
+COMMENT_OR_STRING_PATTERN = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL
+)
+# Attribute selectors and pseudo-classes may contain anything, and neither
+# decide whether a selector can match the used classes and elements.
+IGNORED_SELECTOR_PARTS_PATTERN = re.compile(r'\[[^\]]*\]|::?[\w-]+(?:\([^)]*\))?')
+CLASS_OR_ID_PATTERN = re.compile(r'[.#](-?[A-Za-z_][\w-]*)')
+ELEMENT_PATTERN = re.compile(r'(?:^|(?<=[\s>+~(]))([A-Za-z][\w-]*)')
+
+StyleRule = namedtuple('StyleRule', ('selectors', 'declarations'))
+AtRule = namedtuple('AtRule', ('prelude', 'rules'))
+# At-rules which are kept or dropped as a whole, with or without a block.
+OpaqueRule = namedtuple('OpaqueRule', ('text',))
+
+
+class CSSSyntaxError(ValueError):
+    pass
+
+
+def strip_comments(css: str) -> str:
+    return COMMENT_OR_STRING_PATTERN.sub(lambda match: match.group(1) or '', css)
+
+
+def scan_to(css: str, position: int, stops: str) -> int:
+    """Return the position of the next character in `stops`, skipping strings and parentheses."""
+
+    depth = 0
+    while position < len(css):
+        char = css[position]
+        if char in '"\'':
+            end = css.find(char, position + 1)
+            while end != -1 and css[end - 1] == '\\':
+                end = css.find(char, end + 1)
+            if end == -1:
+                raise CSSSyntaxError("Unterminated string.")
+            position = end
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char in stops:
+            return position
+        position += 1
+    return position
+
+
+def matching_brace(css: str, position: int) -> int:
+    """Return the position of the brace closing the block opened at `position`."""
+
+    depth = 0
+    while True:
+        position = scan_to(css, position, '{}')
+        if position >= len(css):
+            raise CSSSyntaxError("Unterminated block.")
+        depth += 1 if css[position] == '{' else -1
+        if depth == 0:
+            return position
+        position += 1
+
+
+def split_selectors(selectors: str) -> list:
+    parts = []
+    start = 0
+    while start <= len(selectors):
+        end = scan_to(selectors, start, ',')
+        parts.append(' '.join(selectors[start:end].split()))
+        start = end + 1
+    return [part for part in parts if part]
+
+
+def parse(css: str) -> list:
+    """Parse a stylesheet into a list of `StyleRule`, `AtRule` and `OpaqueRule`s."""
+
+    css = strip_comments(css)
+    rules, position = parse_block(css, 0)
+    if position < len(css):
+        raise CSSSyntaxError("Unexpected closing brace.")
+    return rules
+
+
+def parse_block(css: str, position: int) -> tuple:
+    rules = []
+    while True:
+        while position < len(css) and css[position].isspace():
+            position += 1
+        if position >= len(css) or css[position] == '}':
+            return rules, position
+
+        end = scan_to(css, position, '{;}')
+        prelude = ' '.join(css[position:end].split())
+        if end >= len(css) or css[end] != '{':
+            # A statement at-rule like `@import` or `@charset`.
+            rules.append(OpaqueRule(prelude + ';'))
+            position = end + 1
+            continue
+
+        if prelude.startswith(NESTING_AT_RULES):
+            children, close = parse_block(css, end + 1)
+            if close >= len(css):
+                raise CSSSyntaxError("Unterminated block.")
+            rules.append(AtRule(prelude, children))
+        else:
+            close = matching_brace(css, end)
+            body = ' '.join(css[end + 1:close].split())
+            if prelude.startswith('@'):
+                rules.append(OpaqueRule(f'{prelude}{{{body}}}'))
+            else:
+                rules.append(StyleRule(tuple(split_selectors(prelude)), body))
+        position = close + 1
+
+
+def serialize(rules) -> str:
+    """Write rules back as a compact stylesheet, one rule per line."""
+
+    lines = []
+    for rule in rules:
+        if isinstance(rule, StyleRule):
+            lines.append(f"{','.join(rule.selectors)}{{{rule.declarations}}}")
+        elif isinstance(rule, AtRule):
+            lines.append(f'{rule.prelude}{{\n{serialize(rule.rules)}}}')
+        else:
+            lines.append(rule.text)
+    return ''.join(line + '\n' for line in lines)
+
+
+def selector_names(selector: str) -> tuple:
+    """Return the classes and IDs, and the elements named by a selector."""
+
+    selector = IGNORED_SELECTOR_PARTS_PATTERN.sub(' ', selector)
+    names = set(CLASS_OR_ID_PATTERN.findall(selector))
+    elements = {element.lower() for element in ELEMENT_PATTERN.findall(selector)}
+    return names, elements
+
+
+def filter_rules(rules, keep_selector, keep_opaque: bool) -> list:
+    kept = []
+    for rule in rules:
+        if isinstance(rule, StyleRule):
+            selectors = tuple(selector for selector in rule.selectors if keep_selector(selector))
+            if selectors:
+                kept.append(rule._replace(selectors=selectors))
+        elif isinstance(rule, AtRule):
+            children = filter_rules(rule.rules, keep_selector, keep_opaque)
+            if children:
+                kept.append(rule._replace(rules=children))
+        elif keep_opaque:
+            kept.append(rule)
+    return kept
+
+
+def used_words(sources) -> set:
+    """Return every word in the given texts, any of which may be a class or ID."""
+
+    words = set()
+    for source in sources:
+        words.update(WORD_PATTERN.findall(source))
+    return words
+
+
+def purge(css: str, words: set) -> str:
+    """Remove the rules of `css` whose selectors name classes or IDs not in `words`."""
+
+    def keep(selector):
+        names, _ = selector_names(selector)
+        return names <= words
+
+    return serialize(filter_rules(parse(css), keep, keep_opaque=True))
+
+
+def critical(css: str, template: str, words=()) -> str:
+    """
+    Keep the rules of `css` applying to the given template only.
+
+    A selector is kept if every class and ID it names is a word of the
+    template or in `words`, and every element it names is used in it.
+    At-rules like `@font-face` and `@keyframes` are left to the full stylesheet.
+    """
+
+    template_words = used_words([template]) | set(words)
+    elements = {tag.lower() for tag in TAG_PATTERN.findall(template)} | {'html', 'body'}
+
+    def keep(selector):
+        names, selector_elements = selector_names(selector)
+        return names <= template_words and selector_elements <= elements
+
+    return serialize(filter_rules(parse(css), keep, keep_opaque=False))
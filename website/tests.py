@@ -0,0 +1,826 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import bleach
+import markdown
+from allauth.socialaccount.models import SocialAccount
+from bleach_whitelist import markdown_attrs, markdown_tags
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+from markdown.extensions.codehilite import CodeHiliteExtension
+from markdown.extensions.fenced_code import FencedCodeExtension
+from markdown.extensions.toc import TocExtension
+
+from guides import viewcounts
+from guides.models import Guide
+from profiles.models import RestrictProcessing
+from website import (
+    artifacts,
+    converters,
+    highlighting,
+    middleware,
+    preview,
+    sitemaps,
+    snapshots,
+    storage,
+    stylesheets,
+    workers
+)
+from website.lru import LRUCache
+
+
+DOCUMENT = """
+[TOC]
+
+# Introduction
+Some *emphasised* text and <script>alert(1)</script>.
+
+```python
+print("Hello, World!")
+```
+
+    :::c
+    int main(void) { return 0; }
+"""
+
+
+class MarkdownifyTests(SimpleTestCase):
+    """
+    Scenario:
+        - markdown is rendered through the worker pool and render cache
+    """
+
+    def setUp(self):
+        converters.render_cache.clear()
+
+    def test_output_matches_one_shot_rendering(self):
+        extensions = [CodeHiliteExtension(), FencedCodeExtension(), TocExtension()]
+        expected = bleach.clean(
+            markdown.markdown(DOCUMENT, extensions=extensions), markdown_tags, markdown_attrs
+        )
+        self.assertEqual(converters.markdownify(DOCUMENT), expected)
+
+    def test_unchanged_content_is_served_from_cache(self):
+        first = converters.markdownify(DOCUMENT)
+        second = converters.markdownify(DOCUMENT)
+        self.assertEqual(first, second)
+
+        info = converters.render_cache.info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 1)
+
+    def test_table_of_contents_does_not_leak_between_documents(self):
+        converters.markdownify(DOCUMENT)
+        rendered = converters.markdownify("[TOC]\n\nNo headings here.")
+        self.assertNotIn("Introduction", rendered)
+
+    def test_many_documents_are_rendered_once_each(self):
+        rendered = converters.markdownify_many([DOCUMENT, "*other*", DOCUMENT])
+        self.assertEqual(rendered, [
+            converters.markdownify(DOCUMENT),
+            converters.markdownify("*other*"),
+            converters.markdownify(DOCUMENT),
+        ])
+        self.assertEqual(converters.render_cache.info().misses, 2)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.info().size, 2)
+
+    def test_concurrent_rendering_is_consistent(self):
+        documents = [f"# Heading {number}\n\n[TOC]\n\nBody {number}" for number in range(32)]
+        expected = [converters.MarkdownPipeline().render(document) for document in documents]
+        converters.render_cache.clear()
+        results = [None] * len(documents)
+
+        def render(index):
+            results[index] = converters.markdownify(documents[index])
+
+        threads = [
+            threading.Thread(target=render, args=(index,)) for index in range(len(documents))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, expected)
+
+
+def command_handler():
+    """Build the handler of the worker pools under test, which does as it is told."""
+
+    def handle(command):
+        action, argument = command
+        if action == 'spin':
+            while True:
+                pass
+        elif action == 'sleep':
+            time.sleep(argument)
+        elif action == 'raise':
+            raise ValueError(argument)
+        elif action == 'exit':
+            os._exit(1)
+        return os.getpid()
+
+    return handle
+
+
+class WorkerPoolTests(SimpleTestCase):
+    """
+    Scenario:
+        - calls run in a pool of one worker, with limited time
+        - some calls spin, sleep, fail or exit the worker
+    """
+
+    def setUp(self):
+        self.pool = workers.WorkerPool(command_handler, size=1, timeout=1.0, cpu_limit=0.2)
+        self.addCleanup(self.pool.close)
+
+    def test_calls_run_in_a_reused_worker_process(self):
+        pid = self.pool.call(('pid', None))
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(self.pool.call(('pid', None)), pid)
+
+    def test_cpu_limit_interrupts_the_call_and_keeps_the_worker(self):
+        pid = self.pool.call(('pid', None))
+        with self.assertRaisesRegex(workers.WorkerError, "CPU time limit"):
+            self.pool.call(('spin', None))
+        self.assertEqual(self.pool.call(('pid', None)), pid)
+
+    def test_errors_are_raised_and_keep_the_worker(self):
+        pid = self.pool.call(('pid', None))
+        with self.assertRaisesRegex(workers.WorkerError, "ValueError: broken"):
+            self.pool.call(('raise', "broken"))
+        self.assertEqual(self.pool.call(('pid', None)), pid)
+
+    def test_timed_out_or_exited_workers_are_replaced(self):
+        failures = (
+            (('sleep', 10), workers.WorkerTimeout),
+            (('exit', None), workers.WorkerExited),
+        )
+        for command, error in failures:
+            with self.subTest(command=command[0]):
+                pid = self.pool.call(('pid', None))
+                with self.assertRaises(error):
+                    self.pool.call(command)
+                self.assertNotEqual(self.pool.call(('pid', None)), pid)
+
+
+class RenderIsolationTests(SimpleTestCase):
+    """
+    Scenario:
+        - documents too long or failing to render are shown as plain text
+    """
+
+    def setUp(self):
+        converters.render_cache.clear()
+
+    def test_long_documents_are_escaped_instead_of_rendered(self):
+        with mock.patch.object(converters, 'RENDER_MAX_LENGTH', 20):
+            document = converters.render_document("# Title\n\n<script>x</script>\nmore *text*")
+        self.assertEqual(
+            document.html, "<p># Title</p>\n<p>&lt;script&gt;x&lt;/script&gt;<br>more *text*</p>\n"
+        )
+        self.assertEqual(document.artifacts.word_count, 6)
+
+    def test_failed_renders_are_cached_as_plain_text(self):
+        with mock.patch.object(
+            converters.render_pool, 'call', side_effect=workers.WorkerTimeout("too slow")
+        ) as call:
+            converters.markdownify("*slow*")
+            self.assertEqual(converters.markdownify("*slow*"), "<p>*slow*</p>\n")
+        self.assertEqual(call.call_count, 1)
+
+    def test_renders_without_a_free_worker_are_not_cached(self):
+        with mock.patch.object(
+            converters.render_pool, 'call', side_effect=workers.PoolBusy("busy")
+        ):
+            self.assertEqual(converters.markdownify("*busy*"), "<p>*busy*</p>\n")
+        self.assertEqual(converters.markdownify("*busy*"), "<p><em>busy</em></p>")
+
+    def test_stored_content_is_never_plain_text(self):
+        with mock.patch.object(converters, 'RENDER_MAX_LENGTH', 5):
+            converters.markdownify("*long text*")
+            with self.assertRaises(converters.RenderError):
+                converters.markdownify_strict("*long text*")
+        for error in (workers.WorkerTimeout("too slow"), workers.PoolBusy("busy")):
+            with self.subTest(error=error), mock.patch.object(
+                converters.render_pool, 'call', side_effect=error
+            ):
+                with self.assertRaises(converters.RenderError):
+                    converters.markdownify_strict("*failed*")
+        # Plain text cached for pages is rendered again when storing.
+        with mock.patch.object(
+            converters.render_pool, 'call', side_effect=workers.WorkerTimeout("too slow")
+        ):
+            converters.markdownify("*slow*")
+        self.assertEqual(converters.markdownify_strict("*slow*"), "<p><em>slow</em></p>")
+
+
+class RenderArtifactsTests(SimpleTestCase):
+    """
+    Scenario:
+        - a document with a table of contents, headings and code blocks is rendered
+    """
+
+    def setUp(self):
+        cache.clear()
+        converters.render_cache.clear()
+        highlighting.highlight_cache.clear()
+
+    def test_artifacts_are_collected_while_rendering(self):
+        document = converters.render_document(DOCUMENT + "\n## Second *part*\n\nMore words.")
+        self.assertEqual(document.artifacts.headings, (
+            (1, 'introduction', 'Introduction'), (2, 'second-part', 'Second part')
+        ))
+        self.assertIn('id="second-part"', document.html)
+        self.assertEqual(document.artifacts.code_languages, ('python', 'c'))
+        # Neither the code blocks nor the table of contents are counted.
+        self.assertEqual(document.artifacts.word_count, 11)
+
+    def test_cached_code_blocks_keep_their_language(self):
+        pipeline = converters.MarkdownPipeline()
+        pipeline.render_document(DOCUMENT)
+        self.assertEqual(
+            pipeline.render_document(DOCUMENT).artifacts.code_languages, ('python', 'c')
+        )
+        self.assertEqual(highlighting.highlight_cache.info().hits, 2)
+
+    def test_artifacts_do_not_leak_between_documents(self):
+        converters.render_documents([DOCUMENT, "Just *one* line."])
+        self.assertEqual(
+            converters.render_document("Just *one* line.").artifacts,
+            artifacts.RenderArtifacts(headings=(), word_count=3, code_languages=())
+        )
+
+    def test_reading_minutes(self):
+        self.assertEqual(artifacts.reading_minutes(0), 1)
+        self.assertEqual(artifacts.reading_minutes(artifacts.WORDS_PER_MINUTE + 1), 2)
+
+
+class PreviewTests(SimpleTestCase):
+    """
+    Scenario:
+        - an author edits a guide while its preview is rendered block by block
+    """
+
+    TEXT = (
+        "# Title\nSome *text*\n\n- one\n- two\n\n- three\n\n    more of three\n\n"
+        "```python\nx = 1\n\ny = 2\n```\n\nThe end."
+    )
+
+    def setUp(self):
+        converters.render_cache.clear()
+        preview.block_cache.clear()
+
+    def test_blocks_are_split_at_blank_lines_outside_of_code_and_lists(self):
+        self.assertEqual(preview.split_blocks(self.TEXT), [
+            "# Title\nSome *text*",
+            "- one\n- two\n\n- three\n\n    more of three",
+            "```python\nx = 1\n\ny = 2\n```",
+            "The end.",
+        ])
+
+    def test_preview_matches_rendering_the_whole_document(self):
+        pipeline = converters.MarkdownPipeline()
+        self.assertEqual(
+            preview.render_preview(self.TEXT).replace('\n', ''),
+            pipeline.render(self.TEXT).replace('\n', '')
+        )
+
+    def test_only_changed_blocks_are_rendered_again(self):
+        preview.render_preview(self.TEXT)
+        self.assertEqual(preview.block_cache.info().misses, 4)
+
+        edited = preview.render_preview(self.TEXT.replace("The end.", "The *end*."))
+        self.assertEqual(preview.block_cache.info().misses, 5)
+        self.assertTrue(edited.endswith("<p>The <em>end</em>.</p>"))
+
+    def test_documents_with_references_between_blocks_are_rendered_whole(self):
+        text = "See [the docs][docs].\n\n[docs]: https://example.com"
+        self.assertIn('href="https://example.com"', preview.render_preview(text))
+        self.assertEqual(preview.block_cache.info().misses, 0)
+
+
+class HighlightCacheTests(SimpleTestCase):
+    """
+    Scenario:
+        - guides sharing code blocks are rendered by a pipeline in this process
+          and by the worker processes of the render pool
+        - the prose around a code block is edited
+    """
+
+    def setUp(self):
+        cache.clear()
+        converters.render_cache.clear()
+        highlighting.highlight_cache.clear()
+        self.pipeline = converters.MarkdownPipeline()
+
+    def test_unchanged_code_blocks_are_not_highlighted_again(self):
+        self.pipeline.render(DOCUMENT)
+        info = highlighting.highlight_cache.info()
+        self.assertEqual((info.hits, info.misses), (0, 2))
+
+        edited = self.pipeline.render(DOCUMENT.replace("Some", "Edited"))
+        info = highlighting.highlight_cache.info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+        self.assertGreater(info.seconds_spent, 0)
+        self.assertGreater(info.seconds_saved, 0)
+        self.assertIn('print', edited)
+
+    def test_changed_code_block_is_highlighted_again(self):
+        self.pipeline.render(DOCUMENT)
+        self.pipeline.render(DOCUMENT.replace("Hello", "Goodbye"))
+        info = highlighting.highlight_cache.info()
+        self.assertEqual((info.hits, info.misses), (1, 3))
+
+    def test_blocks_are_shared_between_processes(self):
+        self.pipeline.render(DOCUMENT)
+        # Like another process, which only shares the Django cache.
+        highlighting.highlight_cache.local.clear()
+        self.pipeline.render(DOCUMENT.replace("Some", "Edited"))
+        info = highlighting.highlight_cache.info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    def test_workers_report_their_hits_to_this_process(self):
+        converters.render_document(DOCUMENT)
+        converters.render_document(DOCUMENT.replace("Some", "Edited"))
+        info = highlighting.highlight_cache.info()
+        self.assertEqual(info.hits + info.misses, 4)
+        self.assertGreaterEqual(info.hits, 2)
+        self.assertGreater(info.seconds_spent + info.seconds_saved, 0)
+
+    def test_language_is_part_of_cache_key(self):
+        python = self.pipeline.render('```python\nx = "a"\n```')
+        text = self.pipeline.render('```text\nx = "a"\n```')
+        self.assertNotEqual(python, text)
+        self.assertEqual(highlighting.highlight_cache.info().misses, 2)
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+    """
+    Scenario:
+        - static files are collected for production
+    """
+
+    def collect(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        with override_settings(
+            STATIC_ROOT=static_root.name,
+            STATICFILES_STORAGE='website.storage.CompressedManifestStaticFilesStorage'
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(static_root.name, 'staticfiles.json')) as manifest:
+                paths = json.load(manifest)['paths']
+            return static_root.name, paths
+
+    def test_files_are_hashed_and_precompressed(self):
+        static_root, paths = self.collect()
+        hashed_name = paths['css/base.css']
+        self.assertRegex(hashed_name, r'^css/base\.[0-9a-f]{12}\.css$')
+
+        with open(os.path.join(static_root, hashed_name), 'rb') as original:
+            content = original.read()
+        with gzip.open(os.path.join(static_root, hashed_name + '.gz')) as compressed:
+            self.assertEqual(compressed.read(), content)
+        self.assertEqual(
+            os.path.exists(os.path.join(static_root, hashed_name + '.br')),
+            storage.brotli is not None
+        )
+
+    def test_images_are_not_compressed(self):
+        static_root, paths = self.collect()
+        logo = os.path.join(static_root, paths['assets/logo.png'])
+        self.assertTrue(os.path.exists(logo))
+        self.assertFalse(os.path.exists(logo + '.gz'))
+
+    def test_compression_is_reproducible(self):
+        content = b"body { color: black; }" * 100
+        self.assertEqual(storage.gzip_compress(content), storage.gzip_compress(content))
+        self.assertEqual(gzip.decompress(storage.gzip_compress(content)), content)
+
+
+class PreloadLinkMiddlewareTests(TestCase):
+    """
+    Scenario:
+        - Anonymous user requests pages and other resources
+    """
+
+    multi_db = True
+
+    def test_pages_preload_stylesheets(self):
+        resp = self.client.get(reverse("guides:index"))
+        url = staticfiles_storage.url("css/kube.purged.css")
+        self.assertEqual(resp['Link'], f'<{url}>; rel=preload; as=style')
+
+    def test_other_responses_have_no_preload_links(self):
+        resp = self.client.get(reverse("guides:autocomplete"), {'term': "test"})
+        self.assertFalse(resp.has_header('Link'))
+        resp = self.client.get(reverse("guides:detail", kwargs={"pk": 1}))
+        self.assertEqual(resp.status_code, 404)
+        self.assertFalse(resp.has_header('Link'))
+
+
+class CompressionMiddlewareTests(TestCase):
+    """
+    Scenario:
+        - an existing Guide with enough content to be worth compressing
+        - Anonymous user and Member request pages accepting compressed responses
+    """
+
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testuser', password='testpass')
+        cls.guide = Guide.objects.create(
+            title="test guide",
+            overview="test overview",
+            content="Some words worth compressing. " * 100,
+            author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_detail(self, **headers):
+        return self.client.get(reverse("guides:detail", kwargs={"pk": self.guide.id}), **headers)
+
+    def test_pages_are_compressed_with_accepted_encodings(self):
+        plain = self.get_detail()
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        resp = self.get_detail(HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp.content), plain.content)
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        self.assertEqual(resp['ETag'], 'W/' + plain['ETag'])
+
+        resp = self.get_detail(HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(resp.has_header('Content-Encoding'))
+
+    def test_compressed_variants_of_shared_responses_are_cached(self):
+        with mock.patch.object(
+            storage, 'gzip_compress', side_effect=storage.gzip_compress
+        ) as compress:
+            first = self.get_detail(HTTP_ACCEPT_ENCODING='gzip')
+            second = self.get_detail(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+        # Pages of logged in users are compressed for every request.
+        self.client.force_login(self.user)
+        with mock.patch.object(middleware, 'gzip_compress', side_effect=middleware.gzip_compress):
+            resp = self.get_detail(HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(middleware.gzip_compress.call_count, 1)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+
+    def test_brotli_is_preferred_if_available(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        compression = middleware.CompressionMiddleware(None)
+        with mock.patch.object(storage, 'brotli', None):
+            self.assertEqual(compression.encoding(request), 'gzip')
+        with mock.patch.object(storage, 'brotli', mock.Mock()):
+            self.assertEqual(compression.encoding(request), 'br')
+
+    def test_quality_values_are_respected(self):
+        compression = middleware.CompressionMiddleware(None)
+        expected = (
+            ('gzip;q=1.0, br;q=0.5', 'gzip'),
+            ('br;q=0.2, gzip;q=0.1', 'br'),
+            ('gzip;q=0, *', 'br'),
+            ('br;q=0, gzip;q=0, *', None),
+            ('*;q=0.5, br;q=0.1', 'gzip'),
+            ('gzip;q=0.5, identity', None),
+            ('gzip;q=0.5.1', None),
+        )
+        with mock.patch.object(storage, 'brotli', mock.Mock()):
+            for header, encoding in expected:
+                with self.subTest(header=header):
+                    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+                    self.assertEqual(compression.encoding(request), encoding)
+        with mock.patch.object(storage, 'brotli', None):
+            request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip;q=0, *')
+            self.assertIsNone(compression.encoding(request))
+
+    def test_small_and_precompressed_responses_are_not_compressed(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        large = b'x' * middleware.MIN_COMPRESS_SIZE
+        responses = (
+            HttpResponse(b'x' * (middleware.MIN_COMPRESS_SIZE - 1)),
+            HttpResponse(large, content_type='image/png'),
+            HttpResponse(large, status=404),
+        )
+        for response in responses:
+            with self.subTest(response=response):
+                compressed = middleware.CompressionMiddleware(lambda request: response)(request)
+                self.assertFalse(compressed.has_header('Content-Encoding'))
+
+
+class StylesheetTests(SimpleTestCase):
+    """
+    Scenario:
+        - a stylesheet is purged of the rules unused by the templates
+    """
+
+    CSS = """
+        /* A comment with .unused { braces } */
+        a, .used, .unused:hover { color: red; }
+        @media (max-width: 768px) {
+            .unused > p { display: none; }
+            .used p[data-x=".unused"] { content: "}"; }
+        }
+        @font-face { font-family: "Kube"; src: url(kube.woff); }
+        input[type="text"] { border: 0; }
+    """
+
+    def test_purge_keeps_rules_naming_used_classes(self):
+        self.assertEqual(stylesheets.purge(self.CSS, {'used'}), (
+            'a,.used{color: red;}\n'
+            '@media (max-width: 768px){\n'
+            '.used p[data-x=".unused"]{content: "}";}\n'
+            '}\n'
+            '@font-face{font-family: "Kube"; src: url(kube.woff);}\n'
+            'input[type="text"]{border: 0;}\n'
+        ))
+
+    def test_critical_keeps_rules_for_template_elements(self):
+        template = '<nav class="used"><a href="#">Home</a></nav>'
+        self.assertEqual(
+            stylesheets.critical(self.CSS, template), 'a,.used{color: red;}\n'
+        )
+
+    def test_unbalanced_stylesheets_are_rejected(self):
+        for css in ("a { color: red;", "a { color: red; } }", 'a { content: "; }'):
+            with self.subTest(css=css), self.assertRaises(stylesheets.CSSSyntaxError):
+                stylesheets.parse(css)
+
+    def test_generated_stylesheets_are_up_to_date(self):
+        call_command('buildcss', '--check', stdout=io.StringIO())
+
+
+class CriticalCSSTests(TestCase):
+    """
+    Scenario:
+        - Anonymous user requests a page
+    """
+
+    multi_db = True
+
+    def test_page_inlines_critical_css_and_loads_purged_stylesheet(self):
+        resp = self.client.get(reverse("guides:index"))
+        self.assertContains(resp, ".navbar{display: flex;}")
+        self.assertContains(resp, 'rel="preload" href="/static/css/kube.purged.css" as="style"')
+        self.assertNotContains(resp, "css/kube.css")
+        self.assertNotContains(resp, "verbatim")
+
+
+class SitemapTests(TransactionTestCase):
+    """
+    Scenario:
+        - 3 existing Guides by 1 Author with a Discord account
+        - 1 Member with a Discord account who restricts processing
+        - Crawler requests the sitemap
+    """
+
+    multi_db = True
+    # The groups created by migrations are kept.
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('testauthor', password='testpass')
+        SocialAccount.objects.create(
+            user=self.author, uid=42, provider='discoauth', extra_data={'guild': None}
+        )
+        self.member = User.objects.create_user('testmember', password='testpass')
+        SocialAccount.objects.create(
+            user=self.member, uid=43, provider='discoauth', extra_data={'guild': None}
+        )
+        RestrictProcessing.objects.filter(user=self.member).update(restrict_processing=True)
+        self.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content="test guide content",
+                author=self.author
+            )
+            for number in range(3)
+        ]
+
+    def get_sitemap(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'application/xml')
+        if resp.streaming:
+            return b''.join(resp.streaming_content).decode()
+        return resp.content.decode()
+
+    def test_sitemap_lists_guides_and_public_profiles(self):
+        content = self.get_sitemap(reverse("sitemap"))
+        self.assertIn('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">', content)
+        for guide in self.guides:
+            location = "http://testserver" + reverse("guides:detail", kwargs={"pk": guide.id})
+            lastmod = guide.edit_datetime.replace(microsecond=0).isoformat()
+            self.assertIn(f"<loc>{location}</loc><lastmod>{lastmod}</lastmod>", content)
+        self.assertIn(f"<loc>http://testserver{reverse('profiles:detail', args=[42])}", content)
+        self.assertNotIn(reverse("profiles:detail", args=[43]), content)
+
+    def test_sitemap_is_streamed_then_served_from_the_cache(self):
+        first = self.client.get(reverse("sitemap"))
+        self.assertTrue(first.streaming)
+        content = b''.join(first.streaming_content)
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("sitemap"))
+        self.assertFalse(second.streaming)
+        self.assertEqual(second.content, content)
+
+    def test_saving_a_guide_or_profile_discards_the_cached_sitemap(self):
+        self.get_sitemap(reverse("sitemap"))
+        guide = Guide.objects.create(
+            title="test guide 3",
+            overview="test overview",
+            content="test guide content",
+            author=self.author
+        )
+        self.assertIn(
+            reverse("guides:detail", kwargs={"pk": guide.id}), self.get_sitemap(reverse("sitemap"))
+        )
+
+        restrict_processing = RestrictProcessing.objects.get(user=self.member)
+        restrict_processing.restrict_processing = False
+        restrict_processing.save()
+        self.assertIn(reverse("profiles:detail", args=[43]), self.get_sitemap(reverse("sitemap")))
+
+    def test_large_sitemap_becomes_an_index_of_section_sitemaps(self):
+        with mock.patch.object(sitemaps, 'URLS_PER_SITEMAP', 2):
+            index = self.get_sitemap(reverse("sitemap"))
+            self.assertIn(
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">', index
+            )
+            names = [("guides", 1), ("guides", 2), ("profiles", 1)]
+            for section, page in names:
+                url = reverse("sitemap_section", kwargs={"section": section, "page": page})
+                self.assertIn(f"<loc>http://testserver{url}</loc>", index)
+            self.assertNotIn("sitemap-guides-3.xml", index)
+
+            second_page = self.get_sitemap(
+                reverse("sitemap_section", kwargs={"section": "guides", "page": 2})
+            )
+            guide_urls = [
+                reverse("guides:detail", kwargs={"pk": guide.id}) for guide in self.guides
+            ]
+            self.assertIn(guide_urls[2], second_page)
+            self.assertNotIn(guide_urls[1], second_page)
+
+            for section, page in (("guides", 3), ("users", 1)):
+                url = reverse("sitemap_section", kwargs={"section": section, "page": page})
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(DISCORD_GUILD_ID=55555, SNAPSHOT_ORIGIN='http://testserver')
+class SnapshotTests(TransactionTestCase):
+    """
+    Scenario:
+        - 2 existing Guides
+        - the pages shown to visitors without a session are written to disk
+        - a Guide is edited, deleted, and the number of members changes
+    """
+
+    multi_db = True
+    # The groups created by migrations are kept.
+    serialized_rollback = True
+
+    def setUp(self):
+        self.author = User.objects.create_user('testauthor', password='testpass')
+        self.guides = [
+            Guide.objects.create(
+                title=f"test guide {number}",
+                overview="test overview",
+                content=f"test guide content {number}",
+                author=self.author
+            )
+            for number in range(2)
+        ]
+        cache.clear()
+        snapshots.regenerator.clear()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        settings = override_settings(SNAPSHOT_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def read(self, name) -> str:
+        with open(os.path.join(self.root, name), encoding='utf-8') as page:
+            return page.read()
+
+    def exists(self, name) -> bool:
+        return os.path.exists(os.path.join(self.root, name))
+
+    def test_command_writes_the_anonymous_pages(self):
+        call_command('writesnapshots', stdout=io.StringIO())
+        self.assertIn("members and counting", self.read('index.html'))
+        self.assertIn("test guide 1", self.read('guides/index.html'))
+        self.assertIn("test guide content 0", self.read(f'guides/{self.guides[0].id}.html'))
+        self.assertIn("<rss", self.read('guides/feed/rss.xml'))
+        self.assertIn("<feed", self.read('guides/feed/atom.xml'))
+        self.assertNotIn("csrfmiddlewaretoken", self.read(f'guides/{self.guides[0].id}.html'))
+
+    def test_changed_pages_are_deleted_and_written_after_the_response(self):
+        call_command('writesnapshots', stdout=io.StringIO())
+        guide = Guide.objects.get(id=self.guides[0].id)
+        guide.title = "edited test guide"
+        guide.save()
+
+        detail = f'guides/{guide.id}.html'
+        self.assertFalse(self.exists(detail))
+        self.assertFalse(self.exists('guides/index.html'))
+        self.assertTrue(self.exists('index.html'))
+
+        # The pages are written again once the response of the request was sent.
+        self.client.get(reverse("guides:autocomplete"))
+        self.assertIn("edited test guide", self.read(detail))
+        self.assertIn("edited test guide", self.read('guides/feed/rss.xml'))
+
+    def test_too_many_changed_pages_are_left_to_django_after_a_response(self):
+        call_command('writesnapshots', stdout=io.StringIO())
+        guide = Guide.objects.get(id=self.guides[0].id)
+        guide.title = "edited test guide"
+        guide.save()
+
+        with mock.patch.object(snapshots, 'MAX_REGENERATED_PAGES', 2):
+            self.client.get(reverse("guides:autocomplete"))
+        self.assertFalse(self.exists(f'guides/{guide.id}.html'))
+        self.assertFalse(self.exists('guides/index.html'))
+
+    def test_imported_guides_are_written_by_the_command(self):
+        call_command('writesnapshots', stdout=io.StringIO())
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as export:
+            export.write(json.dumps({
+                "title": "imported guide", "overview": "test overview",
+                "content": "imported guide content", "author": "testauthor"
+            }))
+        self.addCleanup(os.remove, export.name)
+
+        call_command('importguides', export.name, stdout=io.StringIO())
+        guide = Guide.objects.get(title="imported guide")
+        self.assertIn("imported guide content", self.read(f'guides/{guide.id}.html'))
+        self.assertIn("imported guide", self.read('guides/index.html'))
+
+    def test_deleted_guides_are_not_written_again(self):
+        call_command('writesnapshots', stdout=io.StringIO())
+        Guide.objects.filter(id=self.guides[1].id).delete()
+        snapshots.regenerator.regenerate()
+        self.assertFalse(self.exists(f'guides/{self.guides[1].id}.html'))
+        self.assertNotIn("test guide 1", self.read('guides/index.html'))
+
+    def test_home_page_is_written_again_when_the_members_change(self):
+        with mock.patch.object(snapshots, 'member_count', return_value=10):
+            self.assertTrue(snapshots.write_home())
+            self.assertFalse(snapshots.write_home())
+        with mock.patch.object(snapshots, 'member_count', return_value=11):
+            self.assertTrue(snapshots.write_home())
+        self.assertTrue(self.exists('index.html'))
+
+    def test_guide_list_is_written_again_when_the_trending_guides_change(self):
+        popularity = mock.Mock(guide_id=self.guides[0].id, view_count=3)
+        with mock.patch.object(viewcounts, 'trending_guides', return_value=[popularity]):
+            self.assertTrue(snapshots.write_trending())
+            self.assertFalse(snapshots.write_trending())
+            popularity.view_count = 4
+            self.assertTrue(snapshots.write_trending())
+        self.assertTrue(self.exists('guides/index.html'))
+
+    def test_rendering_snapshots_records_no_views(self):
+        with mock.patch.object(viewcounts, 'record_view') as record_view:
+            call_command('writesnapshots', stdout=io.StringIO())
+            self.assertFalse(record_view.called)
+            self.client.get(reverse("guides:detail", kwargs={"pk": self.guides[0].id}))
+        record_view.assert_called_once_with(self.guides[0].id)
@@ -16,6 +16,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from website import sitemaps
+
 urlpatterns = [
     path("", include("home.urls", namespace="home")),
     path("accounts/", include("oauth.urls")),
@@ -23,4 +25,10 @@ urlpatterns = [
     path("guides/", include("guides.urls", namespace="guides")),
     path("profile/", include("profiles.urls", namespace="profiles")),
     path("stats/", include("stats.urls", namespace="stats")),
+    path("sitemap.xml", sitemaps.sitemap, name="sitemap"),
+    path(
+        "sitemap-<slug:section>-<int:page>.xml",
+        sitemaps.section_sitemap,
+        name="sitemap_section"
+    ),
 ]
@@ -0,0 +1,158 @@
+"""
+A bounded pool of worker processes running untrusted work under limits.
+
+Every worker process builds a handler once, and then calls it with the
+payloads it is sent, one at a time. A call may use at most `cpu_limit`
+seconds of CPU time, after which it is interrupted inside the worker,
+and the caller waits at most `timeout` seconds for its result, after
+which the worker is killed and replaced. No more than `size` calls run
+at once, and callers wait at most `timeout` seconds for a free worker.
+All of these failures are raised as `WorkerError`, so a caller can
+fall back to something cheap instead of occupying its thread.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerTimeout(WorkerError):
+    pass
+
+
+class WorkerExited(WorkerError):
+    pass
+
+
+class PoolBusy(WorkerError):
+    pass
+
+
+class CPULimitExceeded(BaseException):
+    """Raised inside a worker when a call exceeds its CPU time, past any `except Exception`."""
+
+
+def raise_cpu_limit_exceeded(signum, frame):
+    raise CPULimitExceeded()
+
+
+def serve(connection, factory, cpu_limit: float):
+    """Answer the payloads received on `connection` with the results of calling the handler."""
+
+    # Signal handlers inherited from the parent, like those of a gunicorn
+    # worker, must not keep the worker alive when it is told to exit.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGPROF, raise_cpu_limit_exceeded)
+    handle = factory()
+    while True:
+        try:
+            payload = connection.recv()
+        except EOFError:
+            return
+
+        signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+        try:
+            result = (True, handle(payload))
+        except CPULimitExceeded:
+            result = (False, f"Exceeded the CPU time limit of {cpu_limit} seconds.")
+        except Exception as error:
+            result = (False, f"{type(error).__name__}: {error}")
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        connection.send(result)
+
+
+class Worker:
+    """A worker process and the connection to it."""
+
+    def __init__(self, factory, cpu_limit: float):
+        context = multiprocessing.get_context()
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=serve, args=(child_connection, factory, cpu_limit), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def call(self, payload, timeout: float):
+        try:
+            self.connection.send(payload)
+            if not self.connection.poll(timeout):
+                raise WorkerTimeout(f"No result within {timeout} seconds.")
+            succeeded, result = self.connection.recv()
+        except (EOFError, OSError) as error:
+            raise WorkerExited(f"The worker exited: {error!r}") from error
+        if not succeeded:
+            raise WorkerError(result)
+        return result
+
+    def kill(self):
+        self.connection.close()
+        if self.process.is_alive():
+            os.kill(self.process.pid, signal.SIGKILL)
+        self.process.join()
+
+
+class WorkerPool:
+    """
+    Runs calls of the handlers built by `factory()` in at most `size` worker processes.
+
+    Workers are started when first needed and reused afterwards.
+    The pool is thread-safe, and processes forked from the one which
+    started its workers start their own instead of sharing them.
+    """
+
+    def __init__(self, factory, size: int, timeout: float, cpu_limit: float):
+        self.factory = factory
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+
+    def call(self, payload):
+        """Return the result of calling a handler with `payload` in a worker."""
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolBusy(f"No worker became available within {self.timeout} seconds.")
+        try:
+            worker = self._acquire_worker()
+            try:
+                result = worker.call(payload, self.timeout)
+            except (WorkerTimeout, WorkerExited):
+                # The worker may still be busy, or cannot be used anymore.
+                worker.kill()
+                raise
+            except WorkerError:
+                self._idle.put(worker)
+                raise
+            self._idle.put(worker)
+            return result
+        finally:
+            self._slots.release()
+
+    def _acquire_worker(self) -> Worker:
+        if os.getpid() != self._pid:
+            # The idle workers belong to the process this one was forked from.
+            self._idle = queue.LifoQueue()
+            self._pid = os.getpid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return Worker(self.factory, self.cpu_limit)
+
+    def close(self):
+        """Stop all idle workers."""
+
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return